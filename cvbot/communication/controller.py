@@ -1,11 +1,21 @@
+import asyncio
+import time
 from abc import abstractmethod
 from collections.abc import AsyncGenerator
-from typing import Any, Dict, List, Optional, Type
+from typing import Any, Dict, Hashable, List, Optional, Tuple, Type
 
 import numpy as np
 
+from cvbot.communication.setpoint_cache import SetpointCache
+from cvbot.concurrency.latest_value_queue import LatestValueQueue
+from cvbot.model.camera import Camera
 from cvbot.model.counter_motor import CounterMotor
 from cvbot.model.device import Device
+from cvbot.model.frame import Frame
+from cvbot.model.motor import Motor
+from cvbot.model.motor_state import MotorState
+from cvbot.model.motor_state_table import MotorStateTable
+from cvbot.model.named_device import NamedDevice
 from cvbot.model.sensor import Sensor
 from cvbot.model.servomotor import Servomotor
 
@@ -21,11 +31,51 @@ class Controller:
     _devices_by_type: Dict[Type[Device], Dict[int, Device]]
     """Dictionary of devices, known and managed by the controller, grouped by type."""
 
-    def __init__(self, **kwargs: Any) -> None:
-        """Initialize the CommunicationController with the given parameters."""
+    _devices_by_name: Dict[str, Device]
+    """Dictionary of named devices, known and managed by the controller, keyed by their name."""
+
+    _devices_by_api_id: Dict[Hashable, Device]
+    """Dictionary of devices, known and managed by the controller, keyed by their id in the communication api."""
+
+    _motor_states: Dict[int, MotorState]
+    """Runtime states of the motors, keyed by device id. Used on the hot path instead of the device models.
+    Views on the rows of the motor table."""
+
+    _motor_table: MotorStateTable
+    """Runtime states of all motors as contiguous arrays."""
+
+    _motor_order: Tuple[str, ...]
+    """Names of the motors which come first in the motor table, in this order."""
+
+    _next_id: int
+    """Smallest id which was not yet allocated or used by a device."""
+
+    devices_version: int
+    """Counter which is incremented whenever devices are added or removed, to invalidate caches derived from the devices."""
+
+    setpoints: SetpointCache
+    """Last acknowledged setpoints of the actuators, used to skip sending unchanged values."""
+
+    def __init__(self, keep_alive_interval: Optional[float] = 1.0, **kwargs: Any) -> None:
+        """Initialize the CommunicationController with the given parameters.
+
+        Parameters
+        ----------
+        keep_alive_interval : Optional[float], optional
+            Time in seconds after which unchanged actuator setpoints are sent again, by default 1.0.
+            None to never resend unchanged setpoints.
+        """
         self._devices = dict()
         self._devices_by_type = dict()
+        self._devices_by_name = dict()
+        self._devices_by_api_id = dict()
+        self._motor_states = dict()
+        self._motor_table = MotorStateTable(())
+        self._motor_order = ()
+        self._next_id = 0
         self._initialized = False
+        self.devices_version = 0
+        self.setpoints = SetpointCache(keep_alive_interval)
 
     def add_devices(self, *devices: Device) -> None:
         """Adds device to the controller.
@@ -36,10 +86,25 @@ class Controller:
             List of devices to be added to the controller.
         """
         for device in devices:
+            existing = self._devices.get(device.id, None)
+            if existing is not None:
+                # The new model replaces the runtime state, e.g. after a rediscovery it holds the fresh values.
+                self._unindex_device(existing, sync_state=False)
+                self.setpoints.invalidate(device.id)
             self._devices[device.id] = device
             if type(device) not in self._devices_by_type:
                 self._devices_by_type[type(device)] = dict()
             self._devices_by_type[type(device)][device.id] = device
+            if isinstance(device, NamedDevice):
+                self._devices_by_name[device.name] = device
+            api_id = self.get_api_id(device)
+            if api_id is not None:
+                self._devices_by_api_id[api_id] = device
+            if isinstance(device, Motor):
+                self._motor_states[device.id] = MotorState.from_motor(device)
+            self._next_id = max(self._next_id, device.id + 1)
+        self._rebuild_motor_table()
+        self.devices_version += 1
 
     def remove_devices(self, *devices: Device) -> None:
         """Removes device from the controller.
@@ -50,10 +115,97 @@ class Controller:
             List of devices to be removed from the controller.
         """
         for device in devices:
-            if device.id in self._devices:
-                if type(device) in self._devices_by_type:
-                    del self._devices_by_type[type(device)][device.id]
-                del self._devices[device.id]
+            existing = self._devices.pop(device.id, None)
+            if existing is not None:
+                self._unindex_device(existing)
+                self.setpoints.invalidate(device.id)
+        self._rebuild_motor_table()
+        self.devices_version += 1
+
+    def _unindex_device(self, device: Device, sync_state: bool = True) -> None:
+        """Removes a device from the type, name and api id indexes, and if sync_state, syncs its runtime state into it."""
+        state = self._motor_states.pop(device.id, None)
+        if state is not None and sync_state:
+            state.sync_to(device)
+        by_type = self._devices_by_type.get(type(device), None)
+        if by_type is not None:
+            by_type.pop(device.id, None)
+        if isinstance(device, NamedDevice) and self._devices_by_name.get(device.name, None) is device:
+            del self._devices_by_name[device.name]
+        api_id = self.get_api_id(device)
+        if api_id is not None and self._devices_by_api_id.get(api_id, None) is device:
+            del self._devices_by_api_id[api_id]
+
+    def _rebuild_motor_table(self) -> None:
+        """Moves the runtime states of all motors into a new motor table, ordered by the motor order and then by id."""
+        order = {name: row for row, name in enumerate(self._motor_order)}
+        states = sorted(
+            self._motor_states.values(),
+            key=lambda state: (order.get(state.name, len(order)), state.device_id),
+        )
+        table = MotorStateTable.from_states(states)
+        self._motor_table = table
+        self._motor_states = {
+            state.device_id: MotorState(state.device_id, state.name, table, row)
+            for row, state in enumerate(states)
+        }
+
+    @property
+    def motor_table(self) -> MotorStateTable:
+        """Runtime states of all motors as contiguous arrays.
+
+        The table is replaced when devices are added or removed, so do not keep it across changes of devices_version.
+        """
+        return self._motor_table
+
+    def set_motor_order(self, *names: str) -> None:
+        """Sets which motors come first in the motor table, e.g. the drive motors in the order of the configuration,
+        so their rows can be written with a single array operation.
+
+        Parameters
+        ----------
+        names : str
+            Names of the motors, in the order of their rows.
+        """
+        self._motor_order = tuple(names)
+        self._rebuild_motor_table()
+        self.devices_version += 1
+
+    def allocate_id(self, min_id: Optional[int] = None) -> int:
+        """Allocates a new, unique device id.
+
+        Ids are allocated monotonically and never reused, also not after the device was removed.
+
+        Parameters
+        ----------
+        min_id : Optional[int], optional
+            The smallest acceptable id, by default None.
+
+        Returns
+        -------
+        int
+            The new id.
+        """
+        if min_id is not None:
+            self._next_id = max(self._next_id, min_id)
+        new_id = self._next_id
+        self._next_id += 1
+        return new_id
+
+    def get_api_id(self, device: Device) -> Optional[Hashable]:
+        """Returns the id of the device in the communication api, used to resolve api responses to devices.
+
+        Parameters
+        ----------
+        device : Device
+            The device.
+
+        Returns
+        -------
+        Optional[Hashable]
+            The api id, None if the device has no api id. Not supported by default.
+        """
+        return None
 
     def get_device(self, value: int) -> Optional[Device]:
         """
@@ -72,17 +224,95 @@ class Controller:
         """
         return self._devices.get(value, None)
 
+    def get_motor_state(self, device: Motor) -> MotorState:
+        """
+        Returns the runtime state of a motor.
+
+        Speed setpoints and counter values are kept in the runtime state on the hot path,
+        the device model is only updated by sync_devices.
+
+        Parameters
+        ----------
+        device : Motor
+            The motor device, known by the controller.
+
+        Returns
+        -------
+        MotorState
+            The runtime state of the motor.
+        """
+        return self._motor_states[device.id]
+
+    def sync_devices(self, *devices: Device) -> List[Device]:
+        """
+        Writes the runtime states of the motors into their device models, e.g. before serializing them.
+
+        Parameters
+        ----------
+        devices : Device
+            The devices to sync. If none are given, all devices are synced.
+
+        Returns
+        -------
+        List[Device]
+            The synced devices.
+        """
+        if not devices:
+            devices = tuple(self._devices.values())
+        for device in devices:
+            state = self._motor_states.get(device.id, None)
+            if state is not None:
+                state.sync_to(device)
+        return list(devices)
+
+    def get_device_by_name(self, name: str) -> Optional[Device]:
+        """
+        Returns the named device with the given name.
+
+        Parameters
+        ----------
+        name : str
+            The name of the device.
+
+        Returns
+        -------
+        Optional[Device]
+            The device with the given name.
+            None if the device is not found.
+        """
+        return self._devices_by_name.get(name, None)
+
+    def get_device_by_api_id(self, api_id: Hashable) -> Optional[Device]:
+        """
+        Returns the device with the given id in the communication api.
+
+        Parameters
+        ----------
+        api_id : Hashable
+            The api id of the device, as returned by get_api_id.
+
+        Returns
+        -------
+        Optional[Device]
+            The device with the given api id.
+            None if the device is not found.
+        """
+        return self._devices_by_api_id.get(api_id, None)
+
     def set_devices(self, *devices: Device) -> None:
         """Sets the devices of the controller.
 
         Existing devices will be removed and the new devices will be added.
+        The runtime states of devices which are set again, e.g. after a rediscovery, are initialized
+        from the new models, so their fresh values are kept.
 
         Parameters
         ----------
         devices : List[Device]
             List of devices to be set to the controller.
         """
-        self.remove_devices(*self._devices.values())
+        ids = set(device.id for device in devices)
+        self.remove_devices(*[device for device in self._devices.values() if device.id not in ids])
         self.add_devices(*devices)
 
     @abstractmethod
@@ -114,10 +344,61 @@ class Controller:
         """
         pass
 
+    async def open_camera_frames(self, camera: Camera, reduction: int = 1) -> AsyncGenerator[Frame, None]:
+        """Streams the newest images of the camera together with their sequence number and arrival time.
+
+        If the consumer is slower than the camera, images are skipped, so the consumer always gets the newest one.
+        By default, the images of open_camera are read in a background task and numbered in order of arrival,
+        the reduction is not supported and ignored.
+
+        Parameters
+        ----------
+        camera : Camera
+            The camera device.
+        reduction : int, optional
+            Factor by which the images are scaled down while decoding, if supported, by default 1.
+
+        Returns
+        -------
+        AsyncGenerator[Frame, None]
+            A generator that yields the newest frames.
+        """
+        frames = LatestValueQueue(1)
+
+        async def read() -> None:
+            sequence = 0
+            async for image in self.open_camera(camera):
+                sequence += 1
+                frames.put_nowait(Frame(image, sequence, time.monotonic()))
+
+        reader = asyncio.create_task(read())
+        try:
+            while True:
+                get = asyncio.ensure_future(frames.get())
+                await asyncio.wait({get, reader}, return_when=asyncio.FIRST_COMPLETED)
+                if not get.done():
+                    # The stream ended.
+                    get.cancel()
+                    reader.result()
+                    return
+                yield get.result()
+        finally:
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+
+    @property
+    def dropped_camera_frames(self) -> int:
+        """Number of camera images dropped by open_camera_frames before they got a sequence number,
+        e.g. images replaced by a newer one before they were decoded. 0 by default, as every image is numbered.
+        """
+        return 0
+
     @abstractmethod
     async def update_motors(self, *device: CounterMotor) -> None:
         """
-        Updates the speed of the motors in the api.
+        Updates the speed of the motors in the api to the speeds of the device models.
+
+        Implementations keep the runtime motor states in line with the sent speeds.
 
         Parameters
         ----------
@@ -126,6 +407,22 @@ class Controller:
         """
         pass
 
+    async def update_motor_states(self, *device: CounterMotor) -> None:
+        """
+        Updates the speed of the motors in the api to the speeds of their runtime motor states,
+        e.g. written into the motor table by the kinematics.
+
+        Unlike update_motors, the speeds of the device models are not used. Implementations may skip
+        updating the models on this hot path, sync_devices writes the runtime states into them.
+        By default, the states are synced into the models and update_motors is called.
+
+        Parameters
+        ----------
+        device : Device
+            The device to update.
+        """
+        await self.update_motors(*self.sync_devices(*device))
+
     @abstractmethod
     async def update_servomotors(self, *device: Servomotor) -> None:
         """
@@ -162,6 +459,26 @@ class Controller:
         """
         pass
 
+    async def refresh_counters(self, *device: CounterMotor) -> None:
+        """
+        Reads the count of the counters in the api into the runtime motor states.
+
+        Unlike read_counters, implementations may skip updating the device models.
+        By default, read_counters is used and its results are copied into the runtime states.
+
+        Parameters
+        ----------
+        device : Device
+            The device to update.
+        """
+        for motor in await self.read_counters(*device):
+            state = self._motor_states.get(motor.id, None)
+            if state is not None:
+                state.count = motor.count
+                state.recorded_at = motor.recorded_at
+                state.last_count = motor.last_count
+                state.last_recorded_at = motor.last_recorded_at
+
     def get_devices_by_type(self, device_type: Type[Device]) -> List[Device]:
         """
         Returns the devices of the controller by type.
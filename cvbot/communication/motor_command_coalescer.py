@@ -0,0 +1,86 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class MotorCommandCoalescer:
+    """Coalesces motor setpoints into batches.
+
+    Only the latest pending setpoint per motor is kept. While a batch is sent, newly submitted setpoints
+    are collected and sent together in the next batch, so concurrent callers share round trips
+    instead of queueing one request per motor and command.
+    """
+
+    _send: Callable[[Dict[Hashable, Any]], Awaitable[None]]
+    """Function sending a batch of setpoints, keyed by motor."""
+
+    _pending: Dict[Hashable, Any]
+    """Setpoints waiting for the next batch, keyed by motor."""
+
+    _pending_sent: Optional[asyncio.Future]
+    """Future which completes when the pending setpoints were sent."""
+
+    _flush_task: Optional[asyncio.Task]
+    """Task sending batches, while setpoints are pending."""
+
+    batches: int
+    """Number of batches sent."""
+
+    superseded: int
+    """Number of setpoints replaced by a newer one before they were sent."""
+
+    def __init__(self, send: Callable[[Dict[Hashable, Any]], Awaitable[None]]) -> None:
+        """Initialize the coalescer.
+
+        Parameters
+        ----------
+        send : Callable[[Dict[Hashable, Any]], Awaitable[None]]
+            Coroutine function sending a batch of setpoints, keyed by motor.
+        """
+        self._send = send
+        self._pending = dict()
+        self._pending_sent = None
+        self._flush_task = None
+        self.batches = 0
+        self.superseded = 0
+
+    async def submit(self, setpoints: Dict[Hashable, Any]) -> None:
+        """Submits setpoints and waits until the batch containing them was sent.
+
+        Parameters
+        ----------
+        setpoints : Dict[Hashable, Any]
+            The setpoints to send, keyed by motor.
+
+        Raises
+        ------
+        Exception
+            Any exception raised while sending the batch.
+        """
+        for key in setpoints:
+            if key in self._pending:
+                self.superseded += 1
+        self._pending.update(setpoints)
+        if self._pending_sent is None:
+            self._pending_sent = asyncio.get_running_loop().create_future()
+        sent = self._pending_sent
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush())
+        # Cancelling one caller must not cancel the batch shared with others.
+        await asyncio.shield(sent)
+
+    async def _flush(self) -> None:
+        while self._pending:
+            batch, sent = self._pending, self._pending_sent
+            self._pending, self._pending_sent = dict(), None
+            try:
+                await self._send(batch)
+            except asyncio.CancelledError:
+                sent.cancel()
+                raise
+            except Exception as e:
+                sent.set_exception(e)
+                # Mark as retrieved, in case all callers were cancelled meanwhile.
+                sent.exception()
+            else:
+                sent.set_result(None)
+            self.batches += 1
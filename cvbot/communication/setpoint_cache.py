@@ -0,0 +1,128 @@
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class SetpointCache:
+    """Remembers the last acknowledged setpoint per device, to skip sending unchanged values.
+
+    An unchanged setpoint is still resent after the keep-alive interval, so watchdogs on the robot are fed.
+    While a setpoint is submitted but not yet acknowledged, new values are compared with it instead,
+    e.g. 50 acknowledged, 0 in flight, then 50 again has to be sent, or the motor would stay at 0.
+    """
+
+    keep_alive_interval: Optional[float]
+    """Time in seconds after which an unchanged setpoint is sent again. None to never resend."""
+
+    _acknowledged: Dict[Hashable, Tuple[Any, float]]
+    """Last acknowledged setpoint and the time it was sent, keyed by device."""
+
+    _submitted: Dict[Hashable, Any]
+    """Latest setpoint handed to the sender and not yet acknowledged, keyed by device."""
+
+    skipped: int
+    """Number of setpoints which did not need to be sent."""
+
+    def __init__(
+        self,
+        keep_alive_interval: Optional[float] = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize the cache.
+
+        Parameters
+        ----------
+        keep_alive_interval : Optional[float], optional
+            Time in seconds after which an unchanged setpoint is sent again, by default 1.0.
+            None to never resend unchanged setpoints.
+        clock : Callable[[], float], optional
+            Clock for the keep-alive, by default time.monotonic.
+        """
+        self.keep_alive_interval = keep_alive_interval
+        self.clock = clock
+        self._acknowledged = dict()
+        self._submitted = dict()
+        self.skipped = 0
+
+    def needs_update(self, key: Hashable, value: Any, now: Optional[float] = None) -> bool:
+        """Checks whether a setpoint has to be sent.
+
+        Parameters
+        ----------
+        key : Hashable
+            The device key, e.g. its id.
+        value : Any
+            The setpoint to send.
+        now : Optional[float], optional
+            The current time, by default read from the clock.
+
+        Returns
+        -------
+        bool
+            True if the setpoint differs from the submitted one, or if none is pending,
+            from the acknowledged one or the keep-alive interval elapsed.
+        """
+        if key in self._submitted:
+            # The acknowledged setpoint is about to be overwritten by the pending one.
+            if self._submitted[key] != value:
+                return True
+            self.skipped += 1
+            return False
+        acknowledged = self._acknowledged.get(key, None)
+        if acknowledged is None or acknowledged[0] != value:
+            return True
+        if self.keep_alive_interval is not None:
+            if now is None:
+                now = self.clock()
+            if now - acknowledged[1] >= self.keep_alive_interval:
+                return True
+        self.skipped += 1
+        return False
+
+    def submit(self, key: Hashable, value: Any) -> None:
+        """Records a setpoint as handed to the sender, until it is acknowledged or invalidated.
+
+        Parameters
+        ----------
+        key : Hashable
+            The device key, e.g. its id.
+        value : Any
+            The setpoint to send.
+        """
+        self._submitted[key] = value
+
+    def acknowledge(self, key: Hashable, value: Any, now: Optional[float] = None) -> None:
+        """Records a setpoint as successfully sent.
+
+        Parameters
+        ----------
+        key : Hashable
+            The device key, e.g. its id.
+        value : Any
+            The setpoint which was sent.
+        now : Optional[float], optional
+            The time the setpoint was sent, by default read from the clock.
+        """
+        if now is None:
+            now = self.clock()
+        self._acknowledged[key] = (value, now)
+        # Keep a newer pending setpoint, it still has to be acknowledged.
+        if key in self._submitted and self._submitted[key] == value:
+            del self._submitted[key]
+
+    def invalidate(self, *keys: Hashable) -> None:
+        """Forgets acknowledged and submitted setpoints, so they are sent on the next update.
+
+        Called if sending failed or was cancelled, the state of the devices is unknown then.
+
+        Parameters
+        ----------
+        keys : Hashable
+            The device keys to forget. If none are given, all setpoints are forgotten.
+        """
+        if not keys:
+            self._acknowledged.clear()
+            self._submitted.clear()
+            return
+        for key in keys:
+            self._acknowledged.pop(key, None)
+            self._submitted.pop(key, None)
@@ -0,0 +1,121 @@
+import time
+from collections.abc import AsyncIterator
+from typing import NamedTuple, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from cvbot.communication.controller import Controller
+from cvbot.concurrency.latest_value_queue import LatestValueQueue
+from cvbot.concurrency.periodic_poller import PeriodicPoller
+from cvbot.model.counter_motor import CounterMotor
+
+
+class TelemetrySnapshot(NamedTuple):
+    """Counter values of the polled motors at one point in time. The arrays are read-only copies."""
+
+    sequence: int
+    """Number of the poll, starting at 1."""
+
+    timestamp: float
+    """Time the counters were sampled in seconds of the monotonic clock."""
+
+    names: Tuple[str, ...]
+    """Names of the motors, in the order of the arrays."""
+
+    counts: np.ndarray
+    """Count values of the motors. Shape (N,)."""
+
+    velocities: np.ndarray
+    """Velocities of the motors in revolutions per minute (RPM). Shape (N,)."""
+
+
+class TelemetryPoller(PeriodicPoller):
+    """Polls the counters of the motors in the background and publishes timestamped snapshots.
+
+    Control code reads the latest snapshot without waiting for I/O, or subscribes to the snapshots
+    as an async iterator. A slow subscriber skips snapshots instead of building up a backlog.
+    """
+
+    latest: Optional[TelemetrySnapshot]
+    """The latest snapshot, None before the first successful poll."""
+
+    _subscribers: Set[LatestValueQueue]
+    """Queues of the active subscriptions."""
+
+    def __init__(
+        self,
+        control: Controller,
+        motors: Optional[Sequence[CounterMotor]] = None,
+        rate: float = 20.0,
+    ) -> None:
+        """Initialize the poller.
+
+        Parameters
+        ----------
+        control : Controller
+            The controller to read the counters from.
+        motors : Optional[Sequence[CounterMotor]], optional
+            The motors whose counters are polled, by default all counter motors of the controller.
+        rate : float, optional
+            Polling rate in Hz, by default 20.0.
+        """
+        super().__init__(rate)
+        self.control = control
+        self.latest = None
+        self._motors = tuple(motors) if motors is not None else None
+        self._subscribers = set()
+        self._sequence = 0
+
+    @property
+    def motors(self) -> Tuple[CounterMotor, ...]:
+        """The polled motors."""
+        if self._motors is not None:
+            return self._motors
+        return tuple(self.control.get_devices_by_type(CounterMotor))
+
+    async def poll(self) -> TelemetrySnapshot:
+        """Reads the counters once and publishes a snapshot.
+
+        Returns
+        -------
+        TelemetrySnapshot
+            The new snapshot.
+        """
+        motors = self.motors
+        start = time.monotonic()
+        await self.control.refresh_counters(*motors)
+        # The counters were sampled somewhere during the request, assume the middle.
+        timestamp = (start + time.monotonic()) / 2
+        table = self.control.motor_table
+        rows = np.array([self.control.get_motor_state(motor).row for motor in motors], dtype=np.intp)
+        counts = table.counts[rows]
+        velocities = table.velocities[rows]
+        counts.flags.writeable = False
+        velocities.flags.writeable = False
+        self._sequence += 1
+        snapshot = TelemetrySnapshot(
+            self._sequence, timestamp, tuple(motor.name for motor in motors), counts, velocities
+        )
+        self.latest = snapshot
+        for queue in self._subscribers:
+            queue.put_nowait(snapshot)
+        return snapshot
+
+    async def subscribe(self) -> AsyncIterator[TelemetrySnapshot]:
+        """Yields the snapshots as they are published.
+
+        A subscriber which is slower than the polling rate skips the snapshots published meanwhile
+        and continues with the newest one.
+
+        Returns
+        -------
+        AsyncIterator[TelemetrySnapshot]
+            An async iterator over the snapshots.
+        """
+        queue = LatestValueQueue(1)
+        self._subscribers.add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers.discard(queue)
@@ -1,11 +1,8 @@
-import io
 import time
 from collections.abc import AsyncGenerator
-from typing import Dict, List, Optional
+from typing import Any, Awaitable, Dict, Hashable, List, Optional, Sequence
 
 import numpy as np
-import PIL
-import PIL.Image
 from cvtools.logger.logging import logger
 from numpy import ndarray
 
@@ -13,6 +10,7 @@ from cvbot.communication.controller import Controller
 from cvbot.model.camera import Camera
 from cvbot.model.counter_motor import CounterMotor
 from cvbot.model.device import Device
+from cvbot.model.named_device import NamedDevice
 from cvbot.model.servomotor import Servomotor
 
 try:
@@ -29,7 +27,12 @@ except ImportError:
     ClientSession = None
 import asyncio
 
+from cvbot.communication.motor_command_coalescer import MotorCommandCoalescer
 from cvbot.communication.txtapiconverter import TxtApiConverter
+from cvbot.concurrency.latest_value_queue import LatestValueQueue
+from cvbot.model.frame import Frame
+from cvbot.telemetry.tracing import tracer
+from cvbot.vision.jpeg_decoder import JpegDecoder, decode_jpeg
 
 
 class TxtApiClient(Controller):
@@ -43,6 +46,9 @@ class TxtApiClient(Controller):
         api_base_path: str = "/api/v1",
         # type: ignore[valid-type]
         session: Optional[ClientSession] = None, # type: ignore
+        keep_alive_interval: Optional[float] = 1.0,
+        request_timeout: float = 1.0,
+        connection_limit: int = 5,
     ) -> None:
         """Initialize the TxtApiClient with the given parameters.
 
@@ -57,14 +63,137 @@ class TxtApiClient(Controller):
         api_base_path : str, optional
             The base path of the api, by default "/api/v1".
         session : Optional[ClientSession], optional
-            The aiohttp session to use for the requests, by default None. If None, a new session will be created.
+            The aiohttp session to use for the requests, by default None.
+            If None and an event loop is running, a tuned session is created by create_session and owned by the client,
+            so it is closed by close or when leaving the async context manager.
             To effectively use client pooling, its recommended to use a application wide session.
+        keep_alive_interval : Optional[float], optional
+            Time in seconds after which unchanged motor and servomotor setpoints are sent again, by default 1.0.
+            Should be shorter than the watchdog timeout of the controller. None to never resend unchanged setpoints.
+        request_timeout : float, optional
+            Deadline in seconds for each motor, servomotor and counter request, by default 1.0.
+        connection_limit : int, optional
+            Maximum number of connections to the controller of an owned session, by default 5.
+            One per drive motor, so a batch of motor updates is sent in parallel, plus one for the camera stream.
         """
-        super().__init__()
+        super().__init__(keep_alive_interval=keep_alive_interval)
         url = r"http://{}:{}{}".format(host, port, api_base_path)
         self._api_config = APIConfig(url, api_key)
+        self.request_timeout = request_timeout
+        self._owns_session = False
+        if session is None:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                logger.warning(
+                    "TxtApiClient created outside of an event loop, falling back to the default session of the api."
+                )
+            else:
+                session = self.create_session(connection_limit=connection_limit)
+                self._owns_session = True
+        self.session = session
         self.api = TxtApiControllerAPI(self._api_config, session=session)
         self.converter = TxtApiConverter(self)
+        self.motor_commands = MotorCommandCoalescer(self._send_motor_batch)
+        self.camera_decoder = None
+
+    @staticmethod
+    def create_session(
+        connection_limit: int = 5,
+        connect_timeout: float = 2.0,
+        read_timeout: float = 2.0,
+        keepalive_timeout: float = 60.0,
+    ) -> ClientSession: # type: ignore
+        """Creates an aiohttp session tuned for low latency requests to a single controller.
+
+        Connections are kept alive and reused, DNS lookups are cached, and aiohttp disables Nagle's algorithm
+        (TCP_NODELAY) on all its connections. The session has no total timeout, so the camera stream
+        is not interrupted, requests are bounded by the connect and read timeouts instead.
+        Must be called with a running event loop.
+
+        Parameters
+        ----------
+        connection_limit : int, optional
+            Maximum number of connections to the controller, by default 5.
+        connect_timeout : float, optional
+            Timeout in seconds to establish a connection, by default 2.0.
+        read_timeout : float, optional
+            Maximum time in seconds between two reads of a response, by default 2.0.
+        keepalive_timeout : float, optional
+            Time in seconds an idle connection is kept open, by default 60.0.
+
+        Returns
+        -------
+        ClientSession
+            The new session. The caller is responsible to close it.
+        """
+        connector = aiohttp.TCPConnector(
+            limit=connection_limit,
+            limit_per_host=connection_limit,
+            keepalive_timeout=keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=None,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=None, sock_connect=connect_timeout, sock_read=read_timeout
+        )
+        return ClientSession(connector=connector, timeout=timeout)
+
+    async def close(self) -> None:
+        """Closes the session, if it is owned by the client."""
+        if self._owns_session and self.session is not None and not self.session.closed:
+            await self.session.close()
+
+    async def __aenter__(self) -> "TxtApiClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+    async def _request(self, coro: Awaitable[Any], endpoint: str) -> Any:
+        """Awaits a request to the api within the request deadline.
+
+        The duration is traced per endpoint as "txt.<endpoint>", failed requests are counted as errors.
+
+        Parameters
+        ----------
+        coro : Awaitable[Any]
+            The request.
+        endpoint : str
+            Name of the endpoint, e.g. "motors".
+
+        Returns
+        -------
+        Any
+            The result of the request.
+
+        Raises
+        ------
+        asyncio.TimeoutError
+            If the request did not finish within the deadline.
+        """
+        with tracer.span("txt." + endpoint):
+            return await asyncio.wait_for(coro, timeout=self.request_timeout)
+
+    def get_api_id(self, device: Device) -> Optional[Hashable]:
+        """Returns the id of the device in the TxtAPI.
+
+        Parameters
+        ----------
+        device : Device
+            The device.
+
+        Returns
+        -------
+        Optional[Hashable]
+            Tuple of the port type letter and number, e.g. ("M", 1) for motor M1, or ("camera", 0) for the camera.
+            Counters share the id of the motor they belong to. None for unsupported devices.
+        """
+        if isinstance(device, Camera):
+            return ("camera", 0)
+        if isinstance(device, NamedDevice) and len(device.name) > 1 and device.name[1:].isdigit():
+            return (device.name[0], int(device.name[1:]))
+        return None
 
     async def discover_devices(self) -> Dict[int, Device]:
         """Triggers a device discovery process.
@@ -80,8 +209,6 @@ class TxtApiClient(Controller):
         from cvtxtclient.models.motor import Motor as TxtApiMotor
         from cvtxtclient.models.servomotor import Servomotor as TxtApiServoMotor
 
-        max_id = None
-        # Get the current max id from the devices in the controller.
         devices = dict()
 
         # Initialize controller
@@ -102,11 +229,7 @@ class TxtApiClient(Controller):
 
         for idx, api_motor in enumerate(api_motors):
             counter = counter_tasks[idx].result()
-            motor = self.converter.from_api((api_motor, counter), max_id=max_id)
-            if max_id is None:
-                max_id = motor.id
-            else:
-                max_id = max(max_id, motor.id)
+            motor = self.converter.from_api((api_motor, counter))
             devices[motor.id] = motor
 
         api_servo_motors = [
@@ -115,11 +238,7 @@ class TxtApiClient(Controller):
         ]
 
         for idx, smot in enumerate(api_servo_motors):
-            motor = self.converter.from_api(smot, max_id=max_id)
-            if max_id is None:
-                max_id = motor.id
-            else:
-                max_id = max(max_id, motor.id)
+            motor = self.converter.from_api(smot)
             devices[motor.id] = motor
 
         # Trigger motor updates in parallel
@@ -141,41 +260,183 @@ class TxtApiClient(Controller):
 
         ##### Discover sensors #####
         api_camera = TxtApiCameraConfig()
-        camera = self.converter.from_api(api_camera, max_id=max_id)
-        if max_id is None:
-            max_id = camera.id
-        else:
-            max_id = max(max_id, camera.id)
+        camera = self.converter.from_api(api_camera)
         devices[camera.id] = camera
         return devices
 
-    async def open_camera(self, camera: Camera) -> AsyncGenerator[ndarray, None]:
+    async def open_camera(self, camera: Camera, reduction: int = 1) -> AsyncGenerator[ndarray, None]:
+        """
+        Streams the images of the camera.
+
+        Every image is yielded, in order. The images are decoded with decode_jpeg on a worker thread, so the event loop
+        is not blocked, and are owned by the consumer, e.g. they can be stored. For a stream which skips to the newest image
+        without copying, see open_camera_frames.
+
+        Parameters
+        ----------
+        camera : Camera
+            The camera device.
+        reduction : int, optional
+            Factor by which the images are scaled down while decoding, 1, 2, 4 or 8, by default 1.
+
+        Returns
+        -------
+        AsyncGenerator[ndarray, None]
+            A generator that yields the RGB images of shape (H,W,3) and dtype uint8.
+        """
         try:
             await asyncio.wait_for(self.api.start_camera(self.converter.to_api(camera)), timeout=10)
             async for frame_bytes in self.api.camera_image_stream():
-                pil_image = PIL.Image.open(io.BytesIO(frame_bytes)).convert("RGB")
-                yield np.array(pil_image)
+                with tracer.span("camera.decode"):
+                    image = await asyncio.to_thread(decode_jpeg, frame_bytes, reduction)
+                if image is None:
+                    logger.warning("Skipping a camera image which could not be decoded.")
+                    continue
+                yield image
+        finally:
+            await asyncio.wait_for(self.api.stop_camera(), timeout=10)
+
+    @property
+    def dropped_camera_frames(self) -> int:
+        """Number of camera images which were replaced by a newer image before the decoder got to them."""
+        if self.camera_decoder is None:
+            return 0
+        return self.camera_decoder.dropped
+
+    async def open_camera_frames(self, camera: Camera, reduction: int = 1) -> AsyncGenerator[Frame, None]:
+        """
+        Streams the images of the camera together with their sequence number and arrival time.
+
+        The images are decoded on a background thread into reused buffers. If the consumer is slower
+        than the camera, images are dropped and the newest one is yielded next.
+        A yielded image is a read-only view, which stays valid until the consumer resumes the generator.
+
+        Parameters
+        ----------
+        camera : Camera
+            The camera device.
+        reduction : int, optional
+            Factor by which the images are scaled down while decoding, 1, 2, 4 or 8, by default 1.
+
+        Returns
+        -------
+        AsyncGenerator[Frame, None]
+            A generator that yields the newest decoded frames.
+        """
+        loop = asyncio.get_running_loop()
+        frames = LatestValueQueue(1)
+        decoder = JpegDecoder(
+            reduction, on_frame=lambda frame: loop.call_soon_threadsafe(frames.put_nowait, frame)
+        )
+        self.camera_decoder = decoder
+        reader = None
+        try:
+            await asyncio.wait_for(self.api.start_camera(self.converter.to_api(camera)), timeout=10)
+            reader = asyncio.create_task(self._read_camera_stream(decoder))
+            while True:
+                get = asyncio.ensure_future(frames.get())
+                await asyncio.wait({get, reader}, return_when=asyncio.FIRST_COMPLETED)
+                if not get.done():
+                    # The stream ended.
+                    get.cancel()
+                    reader.result()
+                    return
+                frame = get.result()
+                if not decoder.ring.pin(frame):
+                    # Already overwritten by newer frames.
+                    continue
+                # Time from the arrival of the image until the consumer gets it, decoding and queueing included.
+                tracer.record_since("camera.latency", frame.timestamp)
+                try:
+                    yield frame
+                finally:
+                    decoder.ring.unpin(frame)
         finally:
+            if reader is not None:
+                reader.cancel()
+                await asyncio.gather(reader, return_exceptions=True)
+            await asyncio.to_thread(decoder.close)
             await asyncio.wait_for(self.api.stop_camera(), timeout=10)
 
+    async def _read_camera_stream(self, decoder: JpegDecoder) -> None:
+        """Reads the images of the camera stream and submits them to the decoder, without waiting for decoding."""
+        async for frame_bytes in self.api.camera_image_stream():
+            decoder.submit(frame_bytes)
+
     async def update_motors(self, *device: CounterMotor) -> None:
         """
         Updates the speed of the motors in the api.
 
+        The speeds are taken from the device models and written into the runtime motor states.
+        Speeds equal to the last acknowledged ones are skipped, unless the keep-alive interval elapsed.
+        The remaining setpoints are coalesced with concurrent updates, only the latest setpoint per motor is sent.
+        The api has one endpoint per motor, so a batch is sent as concurrent requests, one per motor,
+        over the pooled connections.
+
         Parameters
         ----------
         device : Device
             The device to update.
         """
-        tasks = []
+        speeds = []
         for dev in device:
-            mot, cnt = self.converter.to_api(dev)
-            tasks.append(
-                asyncio.create_task(
-                    self.api.update_controller_motor_by_id(0, dev.name[-1], mot)
+            state = self._motor_states.get(dev.id, None)
+            if state is not None:
+                state.speed = dev.speed
+            speeds.append(dev.speed)
+        await self._submit_motor_speeds(device, speeds)
+
+    async def update_motor_states(self, *device: CounterMotor) -> None:
+        """
+        Updates the speed of the motors in the api to the speeds of their runtime motor states.
+
+        Used on the hot path, the device models are neither read nor updated. See update_motors.
+
+        Parameters
+        ----------
+        device : Device
+            The device to update.
+        """
+        await self._submit_motor_speeds(device, [self._motor_states[dev.id].speed for dev in device])
+
+    async def _submit_motor_speeds(self, device: Sequence[CounterMotor], speeds: Sequence[float]) -> None:
+        """Submits the changed speeds of the motors to the coalescer and waits until they were sent."""
+        now = time.monotonic()
+        setpoints = dict()
+        for dev, speed in zip(device, speeds):
+            if not self.setpoints.needs_update(dev.id, speed, now):
+                continue
+            self.setpoints.submit(dev.id, speed)
+            mot = self.converter.motor_to_api(dev.name, speed)
+            setpoints[dev.name[-1]] = (dev.id, speed, mot)
+        if setpoints:
+            await self.motor_commands.submit(setpoints)
+
+    async def _send_motor_batch(self, setpoints: Dict[str, Any]) -> None:
+        """
+        Sends a batch of motor setpoints to the api and acknowledges them in the setpoint cache.
+
+        One request per motor is sent, all of them concurrently.
+
+        Parameters
+        ----------
+        setpoints : Dict[str, Any]
+            Tuples of device id, speed and api motor, keyed by motor id.
+        """
+        sent_at = time.monotonic()
+        try:
+            await asyncio.gather(
+                *(
+                    self._request(self.api.update_controller_motor_by_id(0, motor_id, mot), "motor")
+                    for motor_id, (_, _, mot) in setpoints.items()
                 )
             )
-        return await asyncio.gather(*tasks)
+        except BaseException:
+            # The state of the motors is unknown, resend on the next update.
+            self.setpoints.invalidate(*(dev_id for dev_id, _, _ in setpoints.values()))
+            raise
+        for dev_id, speed, _ in setpoints.values():
+            self.setpoints.acknowledge(dev_id, speed, sent_at)
 
     async def update_servomotors(self, *device: Servomotor) -> None:
         """
@@ -186,15 +447,27 @@ class TxtApiClient(Controller):
         device : Device
             The device to update.
         """
+        now = time.monotonic()
+        devices = [dev for dev in device if self.setpoints.needs_update(dev.id, dev.position, now)]
+        positions = [dev.position for dev in devices]
+        for dev, position in zip(devices, positions):
+            self.setpoints.submit(dev.id, position)
         tasks = []
-        for dev in device:
+        for dev in devices:
             smot = self.converter.to_api(dev)
             tasks.append(
                 asyncio.create_task(
-                    self.api.update_controller_servomotor_by_id(0, dev.name[-1], smot)
+                    self._request(self.api.update_controller_servomotor_by_id(0, dev.name[-1], smot), "servomotor")
                 )
             )
-        await asyncio.gather(*tasks)
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # The state of the servomotors is unknown, resend on the next update.
+            self.setpoints.invalidate(*(dev.id for dev in devices))
+            raise
+        for dev, position in zip(devices, positions):
+            self.setpoints.acknowledge(dev.id, position, now)
 
     async def update_counters(self, *device: CounterMotor) -> None:
         """
@@ -210,45 +483,69 @@ class TxtApiClient(Controller):
             mot, cnt = self.converter.to_api(dev)
             tasks.append(
                 asyncio.create_task(
-                    self.api.update_controller_counter_by_id(0, dev.name[-1], cnt)
+                    self._request(self.api.update_controller_counter_by_id(0, dev.name[-1], cnt), "counter_update")
                 )
             )
         await asyncio.gather(*tasks)
+        for dev in device:
+            state = self._motor_states.get(dev.id, None)
+            if state is not None:
+                state.count = dev.count
 
     async def read_counters(self, *device: CounterMotor) -> List[CounterMotor]:
         """
         Reads the count of the counters in the api.
 
+        Updates the runtime motor states and syncs them into the returned device models.
+
         Parameters
         ----------
         device : Device
             The device to update.
         """
-        tasks = []
-        for dev in device:
-            tasks.append(
-                asyncio.create_task(
-                    self.api.get_controller_counter_by_id(0, dev.name[-1])
-                )
-            )
-        await asyncio.gather(*tasks)
+        return self.sync_devices(*await self._read_counter_states(*device))
+
+    async def refresh_counters(self, *device: CounterMotor) -> None:
+        """
+        Reads the count of the counters in the api into the runtime motor states, without updating the device models.
+
+        Parameters
+        ----------
+        device : Device
+            The device to update.
+        """
+        await self._read_counter_states(*device)
+
+    async def _read_counter_states(self, *device: CounterMotor) -> List[CounterMotor]:
+        """
+        Reads the count of the counters in the api into the runtime motor states.
+
+        One request per counter is sent, all of them concurrently.
+
+        Parameters
+        ----------
+        device : Device
+            The device to update.
+
+        Returns
+        -------
+        List[CounterMotor]
+            The motors whose counters were read.
+        """
+        counters = await asyncio.gather(
+            *(self._request(self.api.get_controller_counter_by_id(0, dev.name[-1]), "counter") for dev in device)
+        )
+        recorded_at = time.time()
+        requested = set(dev.id for dev in device)
         ret = []
-        for task in tasks:
-            cnt = task.result()
-            # Find corresponding motor
-            mname = cnt.name.replace("C", "M")
-            motor = next(
-                (
-                    m
-                    for m in self._devices.values()
-                    if m.name == mname and isinstance(m, CounterMotor)
-                ),
-                None,
-            )
-            if motor is not None:
-                motor.last_count = motor.count
-                motor.last_recorded_at = motor.recorded_at
-                motor.count = cnt.count
-                motor.recorded_at = time.time()
+        rows = []
+        counts = []
+        for cnt in counters:
+            # Find corresponding motor, counters share the api id of their motor.
+            motor = self.get_device_by_api_id(("M", int(cnt.name[1:])))
+            if isinstance(motor, CounterMotor) and motor.id in requested:
+                rows.append(self._motor_states[motor.id].row)
+                counts.append(cnt.count)
                 ret.append(motor)
+        self.motor_table.record_counts(np.array(rows, dtype=np.intp), counts, recorded_at)
         return ret
@@ -42,17 +42,40 @@ class TxtApiConverter:
         """
         Get a new id for the device.
 
+        Ids are allocated monotonically by the controller, so they stay unique also for devices not yet added to it.
+
+        Parameters
+        ----------
+        max_id : Optional[int], optional
+            An id already in use, the new id will be larger, by default None.
+
         Returns
         -------
         int
             The new id for the device.
         """
-        # Get the current max id from the devices in the controller.
-        if max_id is None:
-            max_id = max(self.client._devices.keys(), default=-1)
-        # Increment the max id by 1 to get a new id.
-        new_id = max_id + 1
-        return new_id
+        return self.client.allocate_id(None if max_id is None else max_id + 1)
+
+    def motor_to_api(self, name: str, speed: float) -> "TXTApiMotor":
+        """
+        Creates an api motor for the given speed.
+
+        Parameters
+        ----------
+        name : str
+            The name of the motor, e.g. "M1".
+        speed : float
+            The speed of the motor. Negative speeds turn the motor counter clockwise.
+
+        Returns
+        -------
+        TXTApiMotor
+            The api motor.
+        """
+        # Set the direction of the motor based on the speed.
+        # Passed to the constructor, so it is validated and does not cause serializer warnings.
+        return TXTApiMotor(
+            name=name, enabled=True, values=[int(abs(speed))], direction="CCW" if speed < 0 else "CW")
 
     def to_api(self, device: Device) -> Any:
         """
@@ -71,26 +94,14 @@ class TxtApiConverter:
         new_device = None
         if isinstance(device, CounterMotor):
             # Create a new TXTApiMotor object with the values from the cvbot CounterMotor object.
-            new_motor = TXTApiMotor(
-                name=device.name, enabled=True, values=[abs(device.speed)])
-            # Set the direction of the motor based on the speed.
-            if device.speed < 0:
-                new_motor.direction = "CCW"
-            else:
-                new_motor.direction = "CW"
+            new_motor = self.motor_to_api(device.name, device.speed)
             # Create a counter
             new_counter = TXTApiCounter(
                 name=device.name.replace("M", "C"), enabled=True, digital=True, count=device.count)
             new_device = (new_motor, new_counter)
         elif isinstance(device, Motor):
             # Create a new TXTApiMotor object with the values from the cvbot Motor object.
-            new_device = TXTApiMotor(
-                name=device.name, enabled=True, values=[abs(device.speed)])
-            # Set the direction of the motor based on the speed.
-            if device.speed < 0:
-                new_device.direction = "CCW"
-            else:
-                new_device.direction = "CW"
+            new_device = self.motor_to_api(device.name, device.speed)
         elif isinstance(device, Servomotor):
             # Create a new TXTApiServomotor object with the values from the cvbot Servomotor object.
             new_device = TXTApiServomotor(
@@ -103,9 +114,8 @@ class TxtApiConverter:
         mapped_device = None
         if isinstance(device, TXTApiMotor):
             # Check if there is a device with the same name, then use the id of the device.
-            mapped_device = next((x for x in self.client._devices if isinstance(
-                x, Motor) and x.name == device.name), None)
-            if not mapped_device:
+            mapped_device = self.client.get_device_by_name(device.name)
+            if not isinstance(mapped_device, Motor):
                 # Create a new device with a new id.
                 new_id = self.get_new_id(max_id)
                 mapped_device = Motor(id=new_id, name=device.name, speed=0)
@@ -120,9 +130,8 @@ class TxtApiConverter:
             # Check if there is a device with the same name, then use the id of the device.
             device_motor: TXTApiMotor = device[0]
             device_counter: TXTApiCounter = device[1]
-            mapped_device = next((x for x in self.client._devices if isinstance(
-                x, CounterMotor) and x.name == device_motor.name), None)
-            if not mapped_device:
+            mapped_device = self.client.get_device_by_name(device_motor.name)
+            if not isinstance(mapped_device, CounterMotor):
                 # Create a new device with a new id.
                 new_id = self.get_new_id(max_id)
                 mapped_device = CounterMotor(
@@ -142,9 +151,8 @@ class TxtApiConverter:
         elif isinstance(device, TXTApiServomotor):
             device: TXTApiServomotor
             # Check if there is a device with the same name, then use the id of the device.
-            mapped_device = next((x for x in self.client._devices if isinstance(
-                x, Servomotor) and x.name == device.name), None)
-            if not mapped_device:
+            mapped_device = self.client.get_device_by_name(device.name)
+            if not isinstance(mapped_device, Servomotor):
                 # Create a new device with a new id.
                 new_id = self.get_new_id(max_id)
                 mapped_device = Servomotor(id=new_id, name=device.name)
@@ -154,8 +162,8 @@ class TxtApiConverter:
         elif isinstance(device, TXTApiCameraConfig):
             device: TXTApiCameraConfig
             # Check if there is a device with the same name, then use the id of the device.
-            mapped_device = next((x for x in self.client._devices if isinstance(x, Camera)), None)
-            if not mapped_device:
+            mapped_device = self.client.get_device_by_api_id(("camera", 0))
+            if not isinstance(mapped_device, Camera):
                 # Create a new device with a new id.
                 new_id = self.get_new_id(max_id)
                 mapped_device = Camera(id=new_id, width=device.width, height=device.height, fps=device.fps)
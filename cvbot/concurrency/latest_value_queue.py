@@ -0,0 +1,102 @@
+import asyncio
+from collections import deque
+from typing import Callable, Deque, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class LatestValueQueue(Generic[T]):
+    """A bounded asyncio queue which always keeps the newest items.
+
+    Putting never blocks: if the queue is full, the oldest item is discarded to make room for the new one.
+    This is used to link the stages of a pipeline, so a slow consumer always works on the freshest value
+    instead of a backlog of outdated ones.
+    """
+
+    _items: Deque[T]
+    """The pending items, oldest first."""
+
+    _not_empty: asyncio.Event
+    """Event which is set while items are pending."""
+
+    dropped: int
+    """Number of items which were discarded because the queue was full."""
+
+    def __init__(self, maxsize: int = 1, on_discard: Optional[Callable[[T], None]] = None) -> None:
+        """Initialize the queue.
+
+        Parameters
+        ----------
+        maxsize : int, optional
+            Maximum number of pending items, by default 1.
+        on_discard : Optional[Callable[[T], None]], optional
+            Called with each item discarded because the queue was full, e.g. to release resources it holds.
+            By default None.
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1.")
+        self._items = deque(maxlen=maxsize)
+        self.on_discard = on_discard
+        self._not_empty = asyncio.Event()
+        self.dropped = 0
+
+    @property
+    def maxsize(self) -> int:
+        """Maximum number of pending items."""
+        return self._items.maxlen
+
+    def qsize(self) -> int:
+        """Returns the number of pending items."""
+        return len(self._items)
+
+    def empty(self) -> bool:
+        """Returns True if no items are pending."""
+        return not self._items
+
+    def put_nowait(self, item: T) -> None:
+        """Puts an item into the queue, discarding the oldest one if the queue is full.
+
+        Parameters
+        ----------
+        item : T
+            The item to put into the queue.
+        """
+        if len(self._items) == self._items.maxlen:
+            self.dropped += 1
+            discarded = self._items.popleft()
+            if self.on_discard is not None:
+                self.on_discard(discarded)
+        self._items.append(item)
+        self._not_empty.set()
+
+    def get_nowait(self) -> T:
+        """Removes and returns the oldest pending item.
+
+        Returns
+        -------
+        T
+            The oldest pending item.
+
+        Raises
+        ------
+        asyncio.QueueEmpty
+            If no item is pending.
+        """
+        if not self._items:
+            raise asyncio.QueueEmpty()
+        item = self._items.popleft()
+        if not self._items:
+            self._not_empty.clear()
+        return item
+
+    async def get(self) -> T:
+        """Waits for an item and removes and returns the oldest pending one.
+
+        Returns
+        -------
+        T
+            The oldest pending item.
+        """
+        while not self._items:
+            await self._not_empty.wait()
+        return self.get_nowait()
@@ -0,0 +1,72 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from typing import Any
+
+
+class PeriodicPoller(ABC):
+    """Base class of components which poll something at a fixed rate in a background task.
+
+    Subclasses implement poll. run calls it once per period, counts failed polls in errors and keeps polling,
+    and skips the missed periods instead of catching up with a burst if a poll took longer than a period.
+    """
+
+    rate: float
+    """Polling rate in Hz."""
+
+    errors: int
+    """Number of failed polls."""
+
+    def __init__(self, rate: float) -> None:
+        """Initialize the poller.
+
+        Parameters
+        ----------
+        rate : float
+            Polling rate in Hz.
+        """
+        self.rate = rate
+        self.errors = 0
+        self._task = None
+
+    @abstractmethod
+    async def poll(self) -> Any:
+        """Polls once."""
+
+    async def run(self) -> None:
+        """Polls at the configured rate until cancelled."""
+        period = 1.0 / self.rate
+        next_time = time.monotonic()
+        while True:
+            try:
+                await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.errors += 1
+            next_time += period
+            delay = next_time - time.monotonic()
+            if delay < 0.0:
+                # Polling fell behind, skip the missed periods.
+                next_time = time.monotonic()
+                delay = 0.0
+            await asyncio.sleep(delay)
+
+    def start(self) -> asyncio.Task:
+        """Starts polling in the background.
+
+        Returns
+        -------
+        asyncio.Task
+            The polling task.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self) -> None:
+        """Stops polling."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
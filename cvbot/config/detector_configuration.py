@@ -0,0 +1,37 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class DetectorConfiguration:
+    """Configuration of the object detector. Defines the model and the inference backend running it.
+
+    Supported backends:
+    - "ultralytics": The PyTorch model (.pt) run by the ultralytics package.
+    - "onnxruntime": An ONNX export of the model (.onnx), run by ONNX Runtime on the CPU.
+    - "openvino": An ONNX or OpenVINO IR export of the model (.onnx / .xml), run by OpenVINO on the CPU.
+    - "auto": Chosen by the file extension of the model, preferring ONNX Runtime over OpenVINO for .onnx files.
+
+    The ONNX and OpenVINO backends only import their runtime, not the ultralytics / torch stack.
+    """
+
+    model_path: str = "best.pt"
+    """Path of the model file."""
+
+    backend: str = "auto"
+    """The inference backend, one of "auto", "ultralytics", "onnxruntime", "openvino"."""
+
+    input_size: int = 640
+    """Side length of the square model input in pixels. Must match the export of the model."""
+
+    confidence_threshold: float = 0.25
+    """Minimal confidence of a detection."""
+
+    iou_threshold: float = 0.45
+    """Intersection over union above which overlapping detections are suppressed."""
+
+    channel_order: str = "bgr"
+    """Channel order of the images passed to the detector, "bgr" (OpenCV) or "rgb"."""
+
+    num_threads: Optional[int] = None
+    """Number of CPU threads used for inference. None for the default of the backend."""
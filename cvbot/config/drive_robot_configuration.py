@@ -37,12 +37,18 @@ class DriveRobotConfiguration:
     max_motor_speed: float = 255
     """Max speed of the motors in its control range."""
 
+    encoder_counts_per_revolution: float = 63.3
+    """Number of counts of the motor encoders per revolution of the motor shaft. Used for odometry."""
+
     dtype: np.dtype = np.float32
     """Data type of the positions."""
 
     _kinematic_matrix: Optional[np.ndarray] = field(default=None, init=False, repr=False, compare=False)
     """Kinematic matrix of the robot. Shape (4, 3)."""
 
+    _inverse_kinematic_matrix: Optional[np.ndarray] = field(default=None, init=False, repr=False, compare=False)
+    """Pseudo-inverse of the kinematic matrix. Shape (3, 4)."""
+
     @property
     def kinematic_matrix(self) -> np.ndarray:
         """Returns the kinematic matrix of the robot.
@@ -66,6 +72,81 @@ class DriveRobotConfiguration:
             self._kinematic_matrix = self.get_kinematic_matrix()
         return self._kinematic_matrix
 
+    @property
+    def inverse_kinematic_matrix(self) -> np.ndarray:
+        """Returns the pseudo-inverse of the kinematic matrix, computed once and cached.
+
+        Returns
+        -------
+        np.ndarray
+            Inverse kinematic matrix K+ of the robot. Shape (3, 4).
+            Maps the wheel speeds W = (w_1, w_2, w_3, w_4) to the vehicle speeds V = (v_x, v_z, w_v) in the least squares sense:
+            V = K+ @ W
+        """
+        if self._inverse_kinematic_matrix is None:
+            self._inverse_kinematic_matrix = np.linalg.pinv(
+                self.kinematic_matrix.astype(np.float64)).astype(self.dtype)
+        return self._inverse_kinematic_matrix
+
+    def body_to_wheel_speeds(self, velocities: np.ndarray, saturate: bool = True) -> np.ndarray:
+        """Converts vehicle velocities to wheel speeds, for a whole batch at once.
+
+        Parameters
+        ----------
+        velocities : np.ndarray
+            Vehicle velocities V = (v_x, v_z, w_v). Shape (N, 3) or (3,).
+        saturate : bool, optional
+            If True, each row whose largest wheel speed exceeds max_motor_speed is scaled down, so its largest wheel speed
+            equals max_motor_speed and the direction of motion is kept. By default True.
+
+        Returns
+        -------
+        np.ndarray
+            Wheel speeds W = (w_1, w_2, w_3, w_4) in the order of drive_motor_names. Shape (N, 4) or (4,). Of type dtype.
+        """
+        velocities = np.asarray(velocities, dtype=self.dtype)
+        wheel_speeds = velocities @ self.kinematic_matrix.T
+        if saturate:
+            wheel_speeds = self.saturate_wheel_speeds(wheel_speeds, out=wheel_speeds)
+        return wheel_speeds
+
+    def wheel_to_body_speeds(self, wheel_speeds: np.ndarray) -> np.ndarray:
+        """Converts wheel speeds to vehicle velocities, for a whole batch at once. E.g. for odometry.
+
+        Parameters
+        ----------
+        wheel_speeds : np.ndarray
+            Wheel speeds W = (w_1, w_2, w_3, w_4) in the order of drive_motor_names. Shape (N, 4) or (4,).
+
+        Returns
+        -------
+        np.ndarray
+            Least squares vehicle velocities V = (v_x, v_z, w_v). Shape (N, 3) or (3,). Of type dtype.
+        """
+        wheel_speeds = np.asarray(wheel_speeds, dtype=self.dtype)
+        return wheel_speeds @ self.inverse_kinematic_matrix.T
+
+    def saturate_wheel_speeds(self, wheel_speeds: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Scales down each row of wheel speeds whose largest magnitude exceeds max_motor_speed.
+
+        Parameters
+        ----------
+        wheel_speeds : np.ndarray
+            Wheel speeds. Shape (N, 4) or (4,).
+        out : Optional[np.ndarray], optional
+            Array to write the result to, may be wheel_speeds itself. By default a new array is allocated.
+
+        Returns
+        -------
+        np.ndarray
+            The saturated wheel speeds. Same shape as wheel_speeds. Of type dtype.
+        """
+        wheel_speeds = np.asarray(wheel_speeds, dtype=self.dtype)
+        peak = np.max(np.abs(wheel_speeds), axis=-1, keepdims=True)
+        scale = np.ones_like(peak)
+        np.divide(self.max_motor_speed, peak, out=scale, where=peak > self.max_motor_speed)
+        return np.multiply(wheel_speeds, scale, out=out)
+
     def get_kinematic_matrix(self) -> np.ndarray:
         """Returns the kinematic matrix of the robot.
 
@@ -0,0 +1,142 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Generic, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class DriveCommandScheduler(Generic[T]):
+    """Executes drive commands one at a time, always preferring the freshest command.
+
+    Each command is tagged with a deadline. A command which is not started before its deadline is dropped,
+    and a command which does not finish before its deadline is cancelled. A newly submitted command replaces
+    a command still waiting for execution and, if enabled, cancels the command in flight,
+    so the robot never works through a backlog of outdated steering decisions.
+
+    Cancelling a command in flight only stops waiting for it, requests already handed to the controller
+    are not aborted: TxtApiClient shields the motor batch shared by all callers, so its setpoints are still sent,
+    and the setpoints of the newer command follow in the next batch.
+    """
+
+    _pending: Optional[Tuple[T, float, asyncio.Future]]
+    """The command waiting for execution, with its deadline and the future of its caller."""
+
+    _in_flight: Optional[asyncio.Task]
+    """The task executing the current command."""
+
+    completed: int
+    """Number of commands executed successfully."""
+
+    superseded: int
+    """Number of commands replaced or cancelled by a newer command."""
+
+    expired: int
+    """Number of commands dropped or cancelled because their deadline passed."""
+
+    def __init__(
+        self,
+        execute: Callable[[T], Awaitable[None]],
+        max_age: Optional[float] = 0.25,
+        cancel_in_flight: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize the scheduler.
+
+        Parameters
+        ----------
+        execute : Callable[[T], Awaitable[None]]
+            Coroutine function executing a command.
+        max_age : Optional[float], optional
+            Default time in seconds after submission, until a command has to be executed, by default 0.25.
+            None to not limit commands submitted without an explicit deadline.
+        cancel_in_flight : bool, optional
+            If True, a new command cancels the command in flight, by default True.
+        clock : Callable[[], float], optional
+            Clock of the deadlines, by default time.monotonic.
+        """
+        self._execute = execute
+        self.max_age = max_age
+        self.cancel_in_flight = cancel_in_flight
+        self.clock = clock
+        self._pending = None
+        self._in_flight = None
+        self._worker = None
+        self.completed = 0
+        self.superseded = 0
+        self.expired = 0
+
+    @property
+    def dropped(self) -> int:
+        """Number of commands which were not executed, because they were superseded or expired."""
+        return self.superseded + self.expired
+
+    async def submit(self, command: T, deadline: Optional[float] = None) -> bool:
+        """Submits a command and waits until it was executed or dropped.
+
+        Parameters
+        ----------
+        command : T
+            The command to execute.
+        deadline : Optional[float], optional
+            Time of the scheduler clock until the command has to be executed, by default now + max_age.
+
+        Returns
+        -------
+        bool
+            True if the command was executed, False if it was superseded by a newer command or expired.
+
+        Raises
+        ------
+        Exception
+            Any exception raised while executing the command.
+        """
+        if deadline is None:
+            deadline = self.clock() + self.max_age if self.max_age is not None else float("inf")
+        if self._pending is not None:
+            _, _, future = self._pending
+            if not future.done():
+                future.set_result(False)
+            self.superseded += 1
+        if self.cancel_in_flight and self._in_flight is not None:
+            self._in_flight.cancel()
+        future = asyncio.get_running_loop().create_future()
+        self._pending = (command, deadline, future)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        # Cancelling the caller must not cancel the worker.
+        return await asyncio.shield(future)
+
+    async def _run(self) -> None:
+        while self._pending is not None:
+            command, deadline, future = self._pending
+            self._pending = None
+            remaining = deadline - self.clock()
+            if remaining <= 0.0:
+                self.expired += 1
+                future.set_result(False)
+                continue
+            task = asyncio.create_task(self._execute(command))
+            self._in_flight = task
+            try:
+                done, _ = await asyncio.wait({task}, timeout=remaining if remaining != float("inf") else None)
+                if not done:
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    self.expired += 1
+                    future.set_result(False)
+                elif task.cancelled():
+                    self.superseded += 1
+                    future.set_result(False)
+                elif task.exception() is not None:
+                    future.set_exception(task.exception())
+                    # Mark as retrieved, in case the caller was cancelled meanwhile.
+                    future.exception()
+                else:
+                    self.completed += 1
+                    future.set_result(True)
+            except asyncio.CancelledError:
+                task.cancel()
+                future.cancel()
+                raise
+            finally:
+                self._in_flight = None
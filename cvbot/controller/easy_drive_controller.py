@@ -1,20 +1,67 @@
+import math
+import time
 from collections.abc import AsyncGenerator
+from typing import Callable, Optional, Sequence, Tuple, Union
 
 import numpy as np
 
 from cvbot.communication.controller import Controller
 from cvbot.config.drive_robot_configuration import DriveRobotConfiguration
+from cvbot.controller.drive_command_scheduler import DriveCommandScheduler
 from cvbot.model.camera import Camera
 from cvbot.model.counter_motor import CounterMotor
+from cvbot.model.frame import Frame
+from cvbot.model.motor_state import MotorState
+from cvbot.telemetry.tracing import tracer
 
 
 class EasyDriveController:
     """This class is a wrapper around the controller to make it easier to use.
     """
 
-    def __init__(self, control: Controller, config: DriveRobotConfiguration):
+    def __init__(
+        self,
+        control: Controller,
+        config: DriveRobotConfiguration,
+        max_command_age: Optional[float] = 0.25,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize the drive controller.
+
+        Parameters
+        ----------
+        control : Controller
+            The controller communicating with the motors.
+        config : DriveRobotConfiguration
+            The configuration of the robot.
+        max_command_age : Optional[float], optional
+            Time in seconds after which a drive command, which was not executed yet, is dropped, by default 0.25.
+            None to never drop commands.
+        clock : Callable[[], float], optional
+            Clock of the command deadlines and frame timestamps, by default time.monotonic.
+            E.g. the clock of a simulator running faster than real time.
+        """
         self.control = control
         self.config = config
+        self.clock = clock
+        self.commands = DriveCommandScheduler(self._apply_speeds, max_age=max_command_age, clock=clock)
+        self._motors = ()
+        self._motor_states = ()
+        self._motor_rows = np.zeros(0, dtype=np.intp)
+        self._motors_version = -1
+        # Number of camera frames skipped by latest_frames, because the consumer was busy.
+        self.dropped_frames = 0
+        # Place the drive motors in the first rows of the motor table, in the order of the configuration.
+        control.set_motor_order(*config.drive_motor_names)
+        # Preallocated buffers of the kinematics kernel.
+        self._vehicle_speeds = np.zeros(3, dtype=config.dtype)
+        self._wheel_speeds = np.zeros(len(config.drive_motor_names), dtype=config.dtype)
+        self._abs_wheel_speeds = np.zeros_like(self._wheel_speeds)
+
+    @property
+    def dropped_commands(self) -> int:
+        """Number of drive commands which were not executed, because a newer command arrived or their deadline passed."""
+        return self.commands.dropped
 
     async def initialize(self) -> None:
         """
@@ -29,12 +76,81 @@ class EasyDriveController:
         await self.control.initialize()
 
         _ = self.config.kinematic_matrix
+        _ = self.motors
         return True
 
+    @property
+    def motors(self) -> Tuple[CounterMotor, ...]:
+        """The drive motors, ordered as in the configuration.
+
+        Resolved once and cached until the devices of the controller change.
+        """
+        if self._motors_version != self.control.devices_version:
+            motors = self.control.get_devices_by_type(CounterMotor)
+            # Sort according to the motor configuration.
+            self._motors = tuple(
+                sorted(motors, key=lambda x: self.config.drive_motor_names.index(x.name))
+            )
+            self._motor_states = tuple(self.control.get_motor_state(motor) for motor in self._motors)
+            rows = np.array([state.row for state in self._motor_states], dtype=np.intp)
+            if np.array_equal(rows, np.arange(len(rows))):
+                # Contiguous rows, index with a slice to get views instead of copies.
+                self._motor_rows = slice(0, len(rows))
+            else:
+                self._motor_rows = rows
+            self._motors_version = self.control.devices_version
+        return self._motors
+
+    @property
+    def motor_states(self) -> Tuple[MotorState, ...]:
+        """The runtime states of the drive motors, ordered as in the configuration."""
+        if self._motors_version != self.control.devices_version:
+            _ = self.motors
+        return self._motor_states
+
+    @property
+    def motor_rows(self) -> Union[slice, np.ndarray]:
+        """The rows of the drive motors in the motor table of the controller, ordered as in the configuration.
+
+        A slice if the rows are contiguous, e.g. `control.motor_table.speeds[drive.motor_rows]`.
+        """
+        if self._motors_version != self.control.devices_version:
+            _ = self.motors
+        return self._motor_rows
+
+    def compute_wheel_speeds(self, speeds: Sequence[float]) -> np.ndarray:
+        """
+        Computes the wheel speeds for given vehicle speeds and scales them down to the max motor speed.
+
+        Shared kernel of all motion commands. Works in preallocated buffers and does not allocate.
+
+        Parameters
+        ----------
+        speeds : Sequence[float]
+            The speed of the vehicle in (x - (right), z - (forward), w - (angular)) coordinates.
+
+        Returns
+        -------
+        np.ndarray
+            The wheel speeds in the order of the drive motors. Shape (4,).
+            The buffer is reused by the next call.
+        """
+        v = self._vehicle_speeds
+        v[0], v[1], v[2] = speeds[0], speeds[1], speeds[2]
+        w = self._wheel_speeds
+        np.matmul(self.config.kinematic_matrix, v, out=w)
+
+        # If any value is larger than the max speed, scale everything down.
+        peak = np.abs(w, out=self._abs_wheel_speeds).max()
+        if peak > self.config.max_motor_speed:
+            w *= self.config.max_motor_speed / peak
+        return w
+
     async def camera(self) -> AsyncGenerator[np.ndarray]:
         """
         Returns a stream of camera frames.
-        The frames are of shape (3,H,W) and of dtype float32 with values in [0,1].
+        Every image of the camera is yielded in order as an owned RGB array of shape (H,W,3) and dtype uint8,
+        so a slow consumer falls behind the camera, see latest_frames for a stream of the newest frames.
 
         Returns
         -------
@@ -46,6 +162,38 @@ class EasyDriveController:
         async for frame in self.control.open_camera(camera):
             yield frame
 
+    async def latest_frames(self, reduction: int = 1) -> AsyncGenerator[Frame, None]:
+        """
+        Returns a stream of the newest camera frames.
+
+        Unlike camera, frames which arrived while the consumer was busy are skipped, so the consumer always
+        works on the newest frame and the perception latency stays bounded however slow the processing is.
+        Each frame comes with its sequence number and capture time, skipped frames are counted in dropped_frames,
+        both the ones missing from the sequence and the ones the controller dropped before numbering them.
+        The images are read-only RGB arrays of shape (H,W,3) and dtype uint8, valid until the next frame is requested.
+
+        Parameters
+        ----------
+        reduction : int, optional
+            Factor by which the images are scaled down while decoding, 1, 2, 4 or 8, by default 1.
+
+        Returns
+        -------
+        AsyncGenerator[Frame, None]
+            A generator that yields the newest frames.
+        """
+        camera = self.control.get_devices_by_type(Camera)[0]
+        last_sequence = None
+        last_unnumbered = 0
+        async for frame in self.control.open_camera_frames(camera, reduction):
+            unnumbered = self.control.dropped_camera_frames
+            if last_sequence is not None and frame.sequence > last_sequence + 1:
+                self.dropped_frames += frame.sequence - last_sequence - 1
+            if unnumbered > last_unnumbered:
+                self.dropped_frames += unnumbered - last_unnumbered
+            last_sequence, last_unnumbered = frame.sequence, unnumbered
+            yield frame
+
     async def straight(self, speed: int) -> bool:
         """
         Drive straight with a given speed.
@@ -61,26 +209,7 @@ class EasyDriveController:
         bool
             True if the motors are set to the given speed, False otherwise.
         """
-        # Set all motors to the same speed.
-        motors = self.control.get_devices_by_type(CounterMotor)
-        # Sort according to the motor configuration.
-        motors = sorted(
-            motors, key=lambda x: self.config.drive_motor_names.index(x.name)
-        )
-
-        v = np.array([0.0, speed, 0], dtype=self.config.dtype)
-        K = self.config.kinematic_matrix
-
-        w = K @ v
-
-        # If any value is larger than the max speed, scale everything down.
-        if np.max(np.abs(w)) > self.config.max_motor_speed:
-            w = w / np.max(np.abs(w)) * self.config.max_motor_speed
-
-        for i, motor in enumerate(motors):
-            motor.speed = int(float(w[i]))
-        res = await self.control.update_motors(*motors)
-        return True
+        return await self.drive((0.0, speed, 0.0))
 
     async def side(self, speed: int) -> bool:
         """
@@ -98,26 +227,7 @@ class EasyDriveController:
         bool
             True if the motors are set to the given speed, False otherwise.
         """
-        # Set all motors to the same speed.
-        motors = self.control.get_devices_by_type(CounterMotor)
-        # Sort according to the motor configuration.
-        motors = sorted(
-            motors, key=lambda x: self.config.drive_motor_names.index(x.name)
-        )
-
-        v = np.array([speed, 0, 0], dtype=self.config.dtype)
-        K = self.config.kinematic_matrix
-
-        w = K @ v
-
-        # If any value is larger than the max speed, scale everything down.
-        if np.max(np.abs(w)) > self.config.max_motor_speed:
-            w = w / np.max(np.abs(w)) * self.config.max_motor_speed
-
-        for i, motor in enumerate(motors):
-            motor.speed = int(float(w[i]))
-        res = await self.control.update_motors(*motors)
-        return True
+        return await self.drive((speed, 0.0, 0.0))
 
     async def diagonal(self, speed_forward: int, speed_side: int) -> bool:
         """
@@ -138,26 +248,7 @@ class EasyDriveController:
         bool
             True if the motors are set to the given speed, False otherwise.
         """
-        # Set all motors to the same speed.
-        motors = self.control.get_devices_by_type(CounterMotor)
-        # Sort according to the motor configuration.
-        motors = sorted(
-            motors, key=lambda x: self.config.drive_motor_names.index(x.name)
-        )
-
-        v = np.array([speed_side, speed_forward, 0], dtype=self.config.dtype)
-        K = self.config.kinematic_matrix
-
-        w = K @ v
-
-        # If any value is larger than the max speed, scale everything down.
-        if np.max(np.abs(w)) > self.config.max_motor_speed:
-            w = w / np.max(np.abs(w)) * self.config.max_motor_speed
-
-        for i, motor in enumerate(motors):
-            motor.speed = int(float(w[i]))
-        res = await self.control.update_motors(*motors)
-        return True
+        return await self.drive((speed_side, speed_forward, 0.0))
 
     async def rotate(self, speed: int) -> bool:
         """
@@ -173,79 +264,69 @@ class EasyDriveController:
         bool
             True if the motors are set to the given speed, False otherwise.
         """
-        # Set all motors to the same speed.
-        motors = self.control.get_devices_by_type(CounterMotor)
-        # Sort according to the motor configuration.
-        motors = sorted(
-            motors, key=lambda x: self.config.drive_motor_names.index(x.name)
-        )
+        return await self.drive((0.0, 0.0, speed))
 
-        v = np.array([0.0, 0.0, speed], dtype=self.config.dtype)
-        K = self.config.kinematic_matrix
-
-        w = K @ v
-
-        # If any value is larger than the max speed, scale everything down.
-        if np.max(np.abs(w)) > self.config.max_motor_speed:
-            w = w / np.max(np.abs(w)) * self.config.max_motor_speed
-
-        for i, motor in enumerate(motors):
-            motor.speed = int(float(w[i]))
-        res = await self.control.update_motors(*motors)
-        return True
-
-    async def drive(self, speeds: np.ndarray) -> None:
+    async def drive(
+        self, speeds: Sequence[float], deadline: Optional[float] = None, captured_at: Optional[float] = None
+    ) -> bool:
         """
         Drive the robot by given speeds.
 
+        The command is scheduled, a newer drive or stop command supersedes it,
+        and it is dropped if it could not be executed before its deadline.
+        A superseded or expired command which already reached the controller is not aborted, see DriveCommandScheduler.
+        The time until the command was executed is traced as "drive.command".
 
         Parameters
         ----------
-        speed : np.ndarray
+        speed : Sequence[float]
             The speed of the vehicle in (x - (right), z - (forward), w - (angular)) coordinates.
+        deadline : Optional[float], optional
+            Time of the clock until the command has to be executed, by default now + max_command_age.
+            Relative to the capture time of a frame, every command would expire once capture and inference alone
+            take longer than the tolerated latency.
+        captured_at : Optional[float], optional
+            Capture time of the frame the command was computed from, in seconds of the clock.
+            If given, the time from capture until the motors were set is traced as "glass_to_motor".
 
         Returns
         -------
         bool
-            True if the motors are set to the given speed, False otherwise.
+            True if the motors are set to the given speed, False if the command was dropped.
         """
-        # Set all motors to the same speed.
-        motors = self.control.get_devices_by_type(CounterMotor)
-        # Sort according to the motor configuration.
-        motors = sorted(
-            motors, key=lambda x: self.config.drive_motor_names.index(x.name)
-        )
-        # Set the speed of each motor.
-        K = self.config.kinematic_matrix
-        w = K @ speeds
+        with tracer.span("drive.command"):
+            applied = await self.commands.submit(speeds, deadline)
+        if applied and captured_at is not None:
+            tracer.record("glass_to_motor", self.clock() - captured_at)
+        return applied
 
-        # If any value is larger than the max speed, scale everything down.
-        if np.max(np.abs(w)) > self.config.max_motor_speed:
-            w = w / np.max(np.abs(w)) * self.config.max_motor_speed
+    async def _apply_speeds(self, speeds: Sequence[float]) -> None:
+        """
+        Sets the motors to the given vehicle speeds.
 
-        for i, motor in enumerate(motors):
-            motor.speed = int(float(w[i]))
+        Parameters
+        ----------
+        speed : Sequence[float]
+            The speed of the vehicle in (x - (right), z - (forward), w - (angular)) coordinates.
+        """
+        motors = self.motors
+        w = self.compute_wheel_speeds(speeds)
+        # The motors take integer speeds, write all of them with a single array operation.
+        np.trunc(w, out=w)
+        self.control.motor_table.speeds[self._motor_rows] = w
 
-        res = await self.control.update_motors(*motors)
-        return True
+        with tracer.span("drive.apply"):
+            res = await self.control.update_motor_states(*motors)
 
-    async def stop(self) -> None:
+    async def stop(self) -> bool:
         """
         Stop the robot.
 
+        The stop command supersedes pending drive commands and never expires.
+
         Returns
         -------
         bool
-            True if the motors are set to 0, False otherwise.
-        """
-        # Set all motors to 0.
-        motors = self.control.get_devices_by_type(CounterMotor)
-        # Sort according to the motor configuration.
-        motors = sorted(
-            motors, key=lambda x: self.config.drive_motor_names.index(x.name)
-        )
-
-        for motor in motors:
-            motor.speed = 0
-        res = await self.control.update_motors(*motors)
-        return True
+            True if the motors are set to 0, False if a newer command superseded the stop.
+        """
+        return await self.commands.submit((0.0, 0.0, 0.0), deadline=math.inf)
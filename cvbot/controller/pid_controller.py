@@ -0,0 +1,149 @@
+import math
+import time
+from typing import Callable, Optional, Tuple
+
+
+class PIDController:
+    """A PID controller which measures the time between its updates.
+
+    The controller uses the real elapsed time (monotonic clock) as dt, so the gains stay valid when the loop period changes.
+    The derivative is computed on the measurement instead of the error, to avoid kicks on setpoint changes,
+    and is smoothed by a first-order low-pass filter.
+    The integral is clamped and only accumulated while the output is not saturated in the direction of the error (anti-windup).
+
+    The controller only works on floats and does not allocate on update, so it can be stepped at high rates.
+    """
+
+    __slots__ = (
+        "kp",
+        "ki",
+        "kd",
+        "output_min",
+        "output_max",
+        "integral_min",
+        "integral_max",
+        "derivative_time_constant",
+        "max_dt",
+        "clock",
+        "integral",
+        "derivative",
+        "output",
+        "_last_measurement",
+        "_last_time",
+    )
+
+    def __init__(
+        self,
+        kp: float,
+        ki: float = 0.0,
+        kd: float = 0.0,
+        output_limits: Tuple[float, float] = (-math.inf, math.inf),
+        integral_limits: Optional[Tuple[float, float]] = None,
+        derivative_time_constant: float = 0.0,
+        max_dt: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize the PID controller.
+
+        Parameters
+        ----------
+        kp : float
+            Proportional gain.
+        ki : float, optional
+            Integral gain, by default 0.0
+        kd : float, optional
+            Derivative gain, by default 0.0
+        output_limits : Tuple[float, float], optional
+            Lower and upper limit of the output, by default unlimited.
+        integral_limits : Optional[Tuple[float, float]], optional
+            Lower and upper limit of the integral term (error * seconds), by default None.
+            If None, the integral is only limited by the anti-windup of the output limits.
+        derivative_time_constant : float, optional
+            Time constant of the derivative low-pass filter in seconds, by default 0.0 (no filtering).
+        max_dt : float, optional
+            Upper bound for the time step in seconds, by default 0.5.
+            Protects the integral and derivative from jumps after a pause of the loop.
+        clock : Callable[[], float], optional
+            Clock used when no timestamp is passed to update, by default time.monotonic.
+        """
+        if output_limits[0] > output_limits[1]:
+            raise ValueError("Lower output limit must not be larger than the upper limit.")
+        self.kp = float(kp)
+        self.ki = float(ki)
+        self.kd = float(kd)
+        self.output_min, self.output_max = float(output_limits[0]), float(output_limits[1])
+        if integral_limits is None:
+            integral_limits = (-math.inf, math.inf)
+        self.integral_min, self.integral_max = float(integral_limits[0]), float(integral_limits[1])
+        self.derivative_time_constant = float(derivative_time_constant)
+        self.max_dt = float(max_dt)
+        self.clock = clock
+        self.reset()
+
+    def reset(self) -> None:
+        """Resets the state of the controller, e.g. after the target was lost."""
+        self.integral = 0.0
+        self.derivative = 0.0
+        self.output = 0.0
+        self._last_measurement = math.nan
+        self._last_time = math.nan
+
+    def update(self, measurement: float, setpoint: float = 0.0, now: Optional[float] = None) -> float:
+        """Steps the controller with a new measurement.
+
+        Parameters
+        ----------
+        measurement : float
+            The measured value of the process.
+        setpoint : float, optional
+            The desired value of the process, by default 0.0
+        now : Optional[float], optional
+            Timestamp of the measurement in seconds, by default None.
+            Should be from the same clock as previous updates. If None, the controller clock is used.
+
+        Returns
+        -------
+        float
+            The clamped controller output.
+        """
+        if now is None:
+            now = self.clock()
+        error = setpoint - measurement
+        dt = now - self._last_time
+
+        # The first update (nan) or a non advancing clock does not allow to integrate or differentiate.
+        if dt > 0.0:
+            if dt > self.max_dt:
+                dt = self.max_dt
+            # Derivative on measurement, smoothed by a first-order low-pass filter.
+            raw_derivative = (self._last_measurement - measurement) / dt
+            alpha = dt / (self.derivative_time_constant + dt)
+            self.derivative += alpha * (raw_derivative - self.derivative)
+
+            integral = self.integral + error * dt
+            if integral > self.integral_max:
+                integral = self.integral_max
+            elif integral < self.integral_min:
+                integral = self.integral_min
+        else:
+            integral = self.integral
+
+        if dt > 0.0 or math.isnan(self._last_time):
+            self._last_measurement = measurement
+            self._last_time = now
+
+        unclamped = self.kp * error + self.ki * integral + self.kd * self.derivative
+        if unclamped > self.output_max:
+            output = self.output_max
+            # Anti-windup: Only integrate if it drives the output out of saturation.
+            if error < 0.0:
+                self.integral = integral
+        elif unclamped < self.output_min:
+            output = self.output_min
+            if error > 0.0:
+                self.integral = integral
+        else:
+            output = unclamped
+            self.integral = integral
+        self.output = output
+        return output
@@ -0,0 +1,158 @@
+import itertools
+from typing import Iterator, Optional, Sequence, Tuple
+
+Speeds = Tuple[float, float, float]
+
+
+class SearchStrategy:
+    """Search behaviour of the robot while the target is not visible, as a non-blocking state machine.
+
+    The pattern is a sequence of phases, each driving with constant vehicle speeds for a duration.
+    Instead of sleeping through the phases, the caller asks for the speeds of the current phase
+    with every processed frame, so detection continues while the robot searches and the search
+    ends with the first frame showing the target.
+
+    Patterns:
+    - "pulse": Drive with the given speeds, then pause, repeatedly. Pauses give the camera still frames.
+    - "rotate": Rotate in place, with pauses.
+    - "sweep": Rotate back and forth around the heading where the search started, with growing amplitude.
+    - "spiral": Drive forward while rotating with decreasing angular speed, tracing a growing spiral.
+    """
+
+    PATTERNS = ("pulse", "rotate", "sweep", "spiral")
+
+    searching: bool
+    """Whether a search is running."""
+
+    searches: int
+    """Number of searches started."""
+
+    last_search_duration: Optional[float]
+    """Duration of the last finished search in seconds, i.e. the time to reacquire the target."""
+
+    def __init__(
+        self,
+        pattern: str = "rotate",
+        speeds: Sequence[float] = (0.0, 0.0, 50.0),
+        move_duration: float = 0.5,
+        pause_duration: float = 0.5,
+        sweep_growth: float = 1.5,
+        spiral_decay: float = 0.9,
+    ) -> None:
+        """Initialize the search strategy.
+
+        Parameters
+        ----------
+        pattern : str, optional
+            The search pattern, one of "pulse", "rotate", "sweep", "spiral", by default "rotate".
+        speeds : Sequence[float], optional
+            The speed of the vehicle in (x - (right), z - (forward), w - (angular)) coordinates while moving,
+            by default (0.0, 0.0, 50.0). "rotate" and "sweep" only use the angular speed,
+            "spiral" the forward and angular speed.
+        move_duration : float, optional
+            Duration of a moving phase in seconds, by default 0.5.
+        pause_duration : float, optional
+            Duration of a pause in seconds, by default 0.5. 0 to search without pausing.
+        sweep_growth : float, optional
+            Factor by which the duration of each sweep grows, by default 1.5.
+        spiral_decay : float, optional
+            Factor by which the angular speed of the spiral decreases per phase, by default 0.9.
+        """
+        if pattern not in self.PATTERNS:
+            raise ValueError(f"Unknown search pattern {pattern}, expected one of {self.PATTERNS}.")
+        if move_duration <= 0.0:
+            raise ValueError("move_duration must be positive.")
+        self.pattern = pattern
+        self.speeds = tuple(float(value) for value in speeds)
+        self.move_duration = move_duration
+        self.pause_duration = pause_duration
+        self.sweep_growth = sweep_growth
+        self.spiral_decay = spiral_decay
+        self.searching = False
+        self.searches = 0
+        self.last_search_duration = None
+        self._phases = None
+        self._phase = (0.0, 0.0, 0.0)
+        self._phase_end = 0.0
+        self._started_at = 0.0
+
+    def start(self, now: float) -> None:
+        """Starts a new search from the first phase.
+
+        Parameters
+        ----------
+        now : float
+            The current time in seconds.
+        """
+        self.searching = True
+        self.searches += 1
+        self._started_at = now
+        self._phases = self._pattern_phases()
+        self._phase_end = now
+        self._advance(now)
+
+    def stop(self, now: float) -> None:
+        """Ends the search, e.g. because the target was found.
+
+        Parameters
+        ----------
+        now : float
+            The current time in seconds.
+        """
+        if self.searching:
+            self.last_search_duration = now - self._started_at
+        self.searching = False
+        self._phases = None
+
+    def command(self, now: float) -> Speeds:
+        """Returns the vehicle speeds of the search at the given time, starting a search if none is running.
+
+        Parameters
+        ----------
+        now : float
+            The current time in seconds, e.g. the capture time of the frame without the target.
+
+        Returns
+        -------
+        Speeds
+            The speed of the vehicle in (x - (right), z - (forward), w - (angular)) coordinates.
+        """
+        if not self.searching:
+            self.start(now)
+        elif now >= self._phase_end:
+            self._advance(now)
+        return self._phase
+
+    def _advance(self, now: float) -> None:
+        # Skip phases which ended meanwhile, e.g. if frames arrive slower than the phases last.
+        while now >= self._phase_end:
+            speeds, duration = next(self._phases)
+            self._phase = speeds
+            self._phase_end += duration
+
+    def _pattern_phases(self) -> Iterator[Tuple[Speeds, float]]:
+        x, z, w = self.speeds
+        stop = (0.0, 0.0, 0.0)
+        if self.pattern == "pulse":
+            moves = itertools.repeat(((x, z, w), self.move_duration))
+        elif self.pattern == "rotate":
+            moves = itertools.repeat(((0.0, 0.0, w), self.move_duration))
+        elif self.pattern == "sweep":
+            # Half a sweep to one side first, then full sweeps across the start heading.
+            moves = (
+                ((0.0, 0.0, w if index % 2 == 0 else -w),
+                 self.move_duration * (0.5 if index == 0 else self.sweep_growth ** (index - 1)))
+                for index in itertools.count()
+            )
+        else:
+            moves = (
+                ((0.0, z, w * self.spiral_decay ** index), self.move_duration)
+                for index in itertools.count()
+            )
+        for move in moves:
+            yield move
+            if self.pause_duration > 0.0:
+                yield stop, self.pause_duration
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(pattern={self.pattern}, searching={self.searching})"
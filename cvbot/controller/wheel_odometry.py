@@ -0,0 +1,169 @@
+import math
+import time
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from cvbot.concurrency.periodic_poller import PeriodicPoller
+from cvbot.controller.easy_drive_controller import EasyDriveController
+
+
+class Pose(NamedTuple):
+    """Pose of the robot on the ground plane, relative to where the odometry started."""
+
+    timestamp: float
+    """Time of the pose in seconds of the monotonic clock."""
+
+    x: float
+    """Position to the right of the start pose in meters."""
+
+    z: float
+    """Position in front of the start pose in meters."""
+
+    heading: float
+    """Clockwise rotation around the y-axis (seen from above) in radians. Not wrapped, so it can be interpolated."""
+
+
+class WheelOdometry(PeriodicPoller):
+    """Estimates the pose of the robot from the encoder counts of the drive motors.
+
+    The counters are polled at a fixed rate in the background. The count increments of all wheels are mapped
+    to a vehicle displacement with the inverse kinematic matrix of the configuration and integrated into the pose.
+    The latest poses are kept in a ring buffer, so the pose at any recent time can be interpolated,
+    e.g. the pose at the capture time of a camera frame.
+
+    The TXT counters count pulses regardless of the direction, so the direction of each wheel is taken
+    from the sign of its commanded speed.
+    """
+
+    poses: np.ndarray
+    """Ring buffer of poses. Shape (history, 4) with columns (timestamp, x, z, heading)."""
+
+    def __init__(self, drive: EasyDriveController, rate: float = 20.0, history: int = 256) -> None:
+        """Initialize the odometry.
+
+        Parameters
+        ----------
+        drive : EasyDriveController
+            The drive controller, providing the controller, the configuration and the ordered drive motors.
+        rate : float, optional
+            Polling rate of the counters in Hz, by default 20.0.
+        history : int, optional
+            Number of poses kept for interpolation, by default 256.
+        """
+        super().__init__(rate)
+        self.drive = drive
+        self.poses = np.zeros((history, 4), dtype=np.float64)
+        config = drive.config
+        # Motor rotation in rad per encoder count.
+        self._radians_per_count = 2 * math.pi / config.encoder_counts_per_revolution
+        self._inverse_kinematic_matrix = config.inverse_kinematic_matrix.astype(np.float64)
+        self._delta_angles = np.zeros(len(config.drive_motor_names), dtype=np.float64)
+        self.reset()
+
+    def reset(self, timestamp: Optional[float] = None) -> None:
+        """Resets the pose to the origin.
+
+        Parameters
+        ----------
+        timestamp : Optional[float], optional
+            Time of the origin pose, by default now.
+        """
+        self._x = 0.0
+        self._z = 0.0
+        self._heading = 0.0
+        self._last_counts = None
+        self._size = 0
+        self._index = -1
+        self._append(time.monotonic() if timestamp is None else timestamp)
+
+    @property
+    def pose(self) -> Pose:
+        """The latest pose."""
+        return Pose(*self.poses[self._index].tolist())
+
+    def update(self, counts: np.ndarray, directions: np.ndarray, timestamp: float) -> Pose:
+        """Integrates new encoder counts into the pose.
+
+        Parameters
+        ----------
+        counts : np.ndarray
+            The counts of the drive motors, in the order of the configuration. Shape (4,).
+        directions : np.ndarray
+            The direction of each wheel, -1, 0 or 1, e.g. the sign of the commanded speed. Shape (4,).
+        timestamp : float
+            Time the counts were recorded in seconds of the monotonic clock.
+
+        Returns
+        -------
+        Pose
+            The updated pose.
+        """
+        counts = np.asarray(counts, dtype=np.float64)
+        if self._last_counts is None:
+            self._last_counts = counts.copy()
+            return self.pose
+        delta = self._delta_angles
+        np.subtract(counts, self._last_counts, out=delta)
+        # A decreasing count means the counter was reset, it then counted from zero.
+        np.copyto(delta, counts, where=delta < 0)
+        delta *= directions
+        delta *= self._radians_per_count
+        self._last_counts[:] = counts
+
+        dx, dz, dheading = (self._inverse_kinematic_matrix @ delta).tolist()
+        # Rotate the displacement into the odometry frame, using the heading in the middle of the step.
+        heading = self._heading + dheading / 2
+        cos, sin = math.cos(heading), math.sin(heading)
+        self._x += dx * cos + dz * sin
+        self._z += -dx * sin + dz * cos
+        self._heading += dheading
+        self._append(timestamp)
+        return self.pose
+
+    def pose_at(self, timestamp: float) -> Pose:
+        """Interpolates the pose at the given time.
+
+        Parameters
+        ----------
+        timestamp : float
+            The time in seconds of the monotonic clock.
+
+        Returns
+        -------
+        Pose
+            The interpolated pose. Times outside of the buffered history are clamped to the oldest or latest pose.
+        """
+        history = self.poses.shape[0]
+        order = np.arange(self._index - self._size + 1, self._index + 1) % history
+        poses = self.poses[order]
+        times = poses[:, 0]
+        return Pose(
+            timestamp,
+            float(np.interp(timestamp, times, poses[:, 1])),
+            float(np.interp(timestamp, times, poses[:, 2])),
+            float(np.interp(timestamp, times, poses[:, 3])),
+        )
+
+    async def poll(self) -> Pose:
+        """Reads the counters of the drive motors once and integrates them.
+
+        Returns
+        -------
+        Pose
+            The updated pose.
+        """
+        motors = self.drive.motors
+        rows = self.drive.motor_rows
+        table = self.drive.control.motor_table
+        directions = np.sign(table.speeds[rows])
+        start = time.monotonic()
+        await self.drive.control.refresh_counters(*motors)
+        # The counts were sampled somewhere during the request, assume the middle.
+        timestamp = (start + time.monotonic()) / 2
+        return self.update(table.counts[rows], directions, timestamp)
+
+    def _append(self, timestamp: float) -> None:
+        self._index = (self._index + 1) % self.poses.shape[0]
+        self._size = min(self._size + 1, self.poses.shape[0])
+        self.poses[self._index] = (timestamp, self._x, self._z, self._heading)
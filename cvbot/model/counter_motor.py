@@ -32,6 +32,10 @@ class CounterMotor(Motor, Sensor):
 
         TODO: Need to factor in the gear ratio of the motor.
 
+        Based on the counts of the model, which are only updated by read_counters and sync_devices of the controller,
+        not by refresh_counters or the telemetry poller. The runtime velocity is computed for all motors at once
+        by MotorStateTable.velocities, e.g. `control.get_motor_state(motor).velocity`.
+
         Returns
         -------
         float
@@ -0,0 +1,16 @@
+from typing import NamedTuple
+
+import numpy as np
+
+
+class Frame(NamedTuple):
+    """A camera image together with its sequence number and capture time, e.g. handed out by a FrameRing."""
+
+    image: np.ndarray
+    """The image, a read-only view if it lives in a ring buffer."""
+
+    sequence: int
+    """Sequence number of the frame, starting at 1 and increasing by one for each published frame."""
+
+    timestamp: float
+    """Capture time of the frame in seconds of the monotonic clock."""
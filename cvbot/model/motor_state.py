@@ -0,0 +1,163 @@
+from typing import Optional
+
+from cvbot.model.counter_motor import CounterMotor
+from cvbot.model.motor import Motor
+from cvbot.model.motor_state_table import MotorStateTable
+
+
+class MotorState:
+    """Runtime state of a motor, used on the hot path instead of the pydantic device model.
+
+    A view on one row of a MotorStateTable, so per-motor access and array operations over all motors
+    share the same storage. Updates are cheap array writes without validation.
+    The state is synced to the device model only at the configuration / serialization boundary.
+    """
+
+    __slots__ = ("device_id", "name", "table", "row")
+
+    device_id: int
+    """Id of the motor device."""
+
+    name: str
+    """Name of the motor device."""
+
+    table: MotorStateTable
+    """The table holding the state."""
+
+    row: int
+    """The row of the motor in the table."""
+
+    def __init__(self, device_id: int, name: str, table: Optional[MotorStateTable] = None, row: int = 0) -> None:
+        """Initialize the state.
+
+        Parameters
+        ----------
+        device_id : int
+            Id of the motor device.
+        name : str
+            Name of the motor device.
+        table : Optional[MotorStateTable], optional
+            The table holding the state, by default a new table with a single row.
+        row : int, optional
+            The row of the motor in the table, by default 0.
+        """
+        self.device_id = device_id
+        self.name = name
+        self.table = table if table is not None else MotorStateTable([name], [device_id])
+        self.row = row
+
+    @classmethod
+    def from_motor(cls, motor: Motor, table: Optional[MotorStateTable] = None, row: int = 0) -> "MotorState":
+        """Creates the runtime state of a motor device.
+
+        Parameters
+        ----------
+        motor : Motor
+            The motor device.
+        table : Optional[MotorStateTable], optional
+            The table holding the state, by default a new table with a single row.
+        row : int, optional
+            The row of the motor in the table, by default 0.
+
+        Returns
+        -------
+        MotorState
+            The state, initialized with the values of the device.
+        """
+        state = cls(motor.id, motor.name, table, row)
+        state.speed = motor.speed
+        if isinstance(motor, CounterMotor):
+            state.count = motor.count
+            state.recorded_at = motor.recorded_at
+            state.last_count = motor.last_count
+            state.last_recorded_at = motor.last_recorded_at
+        return state
+
+    @property
+    def speed(self) -> float:
+        """Speed setpoint of the motor in device specific units."""
+        return float(self.table.speeds[self.row])
+
+    @speed.setter
+    def speed(self, value: float) -> None:
+        self.table.speeds[self.row] = value
+
+    @property
+    def count(self) -> int:
+        """Last recorded count value."""
+        return int(self.table.counts[self.row])
+
+    @count.setter
+    def count(self, value: int) -> None:
+        self.table.counts[self.row] = value
+
+    @property
+    def recorded_at(self) -> float:
+        """Timestamp when the count was last recorded."""
+        return float(self.table.recorded_at[self.row])
+
+    @recorded_at.setter
+    def recorded_at(self, value: float) -> None:
+        self.table.recorded_at[self.row] = value
+
+    @property
+    def last_count(self) -> int:
+        """Previously recorded count value."""
+        return int(self.table.last_counts[self.row])
+
+    @last_count.setter
+    def last_count(self, value: int) -> None:
+        self.table.last_counts[self.row] = value
+
+    @property
+    def last_recorded_at(self) -> float:
+        """Timestamp when the previous count was recorded."""
+        return float(self.table.last_recorded_at[self.row])
+
+    @last_recorded_at.setter
+    def last_recorded_at(self, value: float) -> None:
+        self.table.last_recorded_at[self.row] = value
+
+    def record_count(self, count: int, timestamp: float) -> None:
+        """Records a new count value, keeping the previous one for the velocity.
+
+        Parameters
+        ----------
+        count : int
+            The count value.
+        timestamp : float
+            Timestamp when the count was recorded.
+        """
+        self.table.record_counts(self.row, count, timestamp)
+
+    @property
+    def velocity(self) -> float:
+        """Velocity of the motor in revolutions per minute (RPM), based on the last two counts.
+
+        Read from MotorStateTable.velocities, which computes the velocities of all motors in one vectorized pass.
+        """
+        return float(self.table.velocities[self.row])
+
+    def sync_to(self, motor: Motor) -> Motor:
+        """Writes the state into the device model.
+
+        Parameters
+        ----------
+        motor : Motor
+            The motor device.
+
+        Returns
+        -------
+        Motor
+            The updated device.
+        """
+        motor.speed = self.speed
+        if isinstance(motor, CounterMotor):
+            motor.count = self.count
+            motor.recorded_at = self.recorded_at
+            motor.last_count = self.last_count
+            motor.last_recorded_at = self.last_recorded_at
+        return motor
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(name={self.name}, speed={self.speed}, count={self.count})"
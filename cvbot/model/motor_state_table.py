@@ -0,0 +1,137 @@
+from typing import TYPE_CHECKING, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from cvbot.model.motor_state import MotorState
+
+
+class MotorStateTable:
+    """Runtime state of several motors, stored as contiguous arrays (struct of arrays).
+
+    Each motor is a row, so the state of all motors can be read and written with single array operations,
+    e.g. writing the output of the kinematics or computing the velocities of all wheels at once.
+    The rows of the drive motors come first, in the order of DriveRobotConfiguration.drive_motor_names,
+    if the controller was given that order.
+    """
+
+    names: Tuple[str, ...]
+    """Names of the motors, in row order."""
+
+    device_ids: np.ndarray
+    """Device ids of the motors. Shape (N,)."""
+
+    speeds: np.ndarray
+    """Speed setpoints of the motors in device specific units. Shape (N,)."""
+
+    counts: np.ndarray
+    """Last recorded count values. Shape (N,)."""
+
+    recorded_at: np.ndarray
+    """Timestamps when the counts were last recorded. Shape (N,)."""
+
+    last_counts: np.ndarray
+    """Previously recorded count values. Shape (N,)."""
+
+    last_recorded_at: np.ndarray
+    """Timestamps when the previous counts were recorded. Shape (N,)."""
+
+    def __init__(self, names: Sequence[str], device_ids: Optional[Sequence[int]] = None) -> None:
+        """Initialize the table with zeroed state.
+
+        Parameters
+        ----------
+        names : Sequence[str]
+            Names of the motors, in row order.
+        device_ids : Optional[Sequence[int]], optional
+            Device ids of the motors, by default -1 for all.
+        """
+        self.names = tuple(names)
+        size = len(self.names)
+        self._rows: Dict[str, int] = {name: row for row, name in enumerate(self.names)}
+        self.device_ids = np.full(size, -1, dtype=np.int64)
+        if device_ids is not None:
+            self.device_ids[:] = device_ids
+        self.speeds = np.zeros(size, dtype=np.float64)
+        self.counts = np.zeros(size, dtype=np.int64)
+        self.recorded_at = np.zeros(size, dtype=np.float64)
+        self.last_counts = np.zeros(size, dtype=np.int64)
+        self.last_recorded_at = np.zeros(size, dtype=np.float64)
+        self._velocities = np.zeros(size, dtype=np.float64)
+        self._durations = np.zeros(size, dtype=np.float64)
+
+    @classmethod
+    def from_states(cls, states: Sequence["MotorState"]) -> "MotorStateTable":
+        """Creates a table holding a copy of the given motor states, one row per state in the given order.
+
+        Parameters
+        ----------
+        states : Sequence[MotorState]
+            The motor states to copy.
+
+        Returns
+        -------
+        MotorStateTable
+            The new table.
+        """
+        table = cls([state.name for state in states], [state.device_id for state in states])
+        table.speeds[:] = [state.speed for state in states]
+        table.counts[:] = [state.count for state in states]
+        table.recorded_at[:] = [state.recorded_at for state in states]
+        table.last_counts[:] = [state.last_count for state in states]
+        table.last_recorded_at[:] = [state.last_recorded_at for state in states]
+        return table
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def index(self, name: str) -> int:
+        """Returns the row of the motor with the given name.
+
+        Parameters
+        ----------
+        name : str
+            The name of the motor.
+
+        Returns
+        -------
+        int
+            The row of the motor.
+
+        Raises
+        ------
+        KeyError
+            If the motor is not in the table.
+        """
+        return self._rows[name]
+
+    def record_counts(self, rows: np.ndarray, counts: np.ndarray, timestamp: float) -> None:
+        """Records new count values for the given rows, keeping the previous ones for the velocities.
+
+        Parameters
+        ----------
+        rows : np.ndarray
+            The rows to update. Index array or slice.
+        counts : np.ndarray
+            The count values, one per row.
+        timestamp : float
+            Timestamp when the counts were recorded.
+        """
+        self.last_counts[rows] = self.counts[rows]
+        self.last_recorded_at[rows] = self.recorded_at[rows]
+        self.counts[rows] = counts
+        self.recorded_at[rows] = timestamp
+
+    @property
+    def velocities(self) -> np.ndarray:
+        """Velocities of all motors in revolutions per minute (RPM), based on the last two counts of each motor.
+
+        Computed for all rows at once into a reused buffer, which is overwritten by the next access.
+        See CounterMotor.velocity.
+        """
+        np.subtract(self.recorded_at, self.last_recorded_at, out=self._durations)
+        np.subtract(self.counts, self.last_counts, out=self._velocities, casting="unsafe")
+        self._velocities *= 60.0
+        np.divide(self._velocities, self._durations, out=self._velocities, where=self._durations != 0.0)
+        self._velocities[self._durations == 0.0] = 0.0
+        return self._velocities
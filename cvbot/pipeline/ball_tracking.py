@@ -0,0 +1,281 @@
+import asyncio
+import functools
+import time
+import traceback
+from typing import Callable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from cvbot.concurrency.latest_value_queue import LatestValueQueue
+from cvbot.controller.easy_drive_controller import EasyDriveController
+from cvbot.controller.pid_controller import PIDController
+from cvbot.controller.search_strategy import SearchStrategy
+from cvbot.model.frame import Frame
+from cvbot.telemetry.metrics_server import RateMeter
+from cvbot.vision.frame_grabber import FrameGrabber
+from cvbot.vision.frame_recorder import FrameRecorder
+from cvbot.vision.roi_tracker import RoiTracker
+
+Box = Tuple[int, int, int, int]
+"""Bounding box (x1, y1, x2, y2) in pixels."""
+
+Detection = Tuple[Frame, bool, Box]
+"""A pinned frame, whether the ball was detected, and its box."""
+
+
+class PipelineMeters:
+    """Rates of the stages of the ball tracking pipeline, e.g. exported by the metrics endpoint."""
+
+    inference: RateMeter
+    """Frames run through the detector."""
+
+    loop: RateMeter
+    """Iterations of the actuation stage."""
+
+    detection: RateMeter
+    """Frames with a detected ball."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        """Initialize the meters.
+
+        Parameters
+        ----------
+        clock : Callable[[], float], optional
+            The clock of the meters, by default time.monotonic.
+        """
+        self.inference = RateMeter(clock=clock)
+        self.loop = RateMeter(clock=clock)
+        self.detection = RateMeter(clock=clock)
+
+
+def detect_ball_center(tracker: RoiTracker, image: np.ndarray, timestamp: float) -> Tuple[bool, Box]:
+    """Detects the ball in an image.
+
+    Returns
+    -------
+    Tuple[bool, Box]
+        Whether the ball was found and its box in pixels, (0, 0, 0, 0) if it was not found.
+    """
+    detections = tracker.detect(image, timestamp)
+    best = detections.best()
+
+    if best is not None:
+        x1, y1, x2, y2 = map(int, detections.boxes[best].tolist())
+        return True, (x1, y1, x2, y2)
+
+    return False, (0, 0, 0, 0)
+
+
+def detect_newest_frame(
+    tracker: RoiTracker, frame_grabber: FrameGrabber, last_sequence: int, timeout: float = 1.0
+) -> Tuple[Optional[Frame], bool, Box, bool]:
+    """Waits for a frame newer than last_sequence and runs the detector on it. Runs in a worker thread.
+
+    The frame is returned pinned, so the grabber does not overwrite it before the actuation stage is done with it.
+    Returns None as frame, if no new frame arrived or it was overwritten before it could be pinned.
+    The last element tells whether the detector ran on a crop around the tracked ball instead of the full frame.
+    """
+    frame = frame_grabber.wait_newer(last_sequence, timeout=timeout)
+    if frame is None or not frame_grabber.ring.pin(frame):
+        return None, False, (0, 0, 0, 0), False
+    try:
+        detected, box = detect_ball_center(tracker, frame.image, frame.timestamp)
+    except BaseException:
+        frame_grabber.ring.unpin(frame)
+        raise
+    return frame, detected, box, tracker.on_crop
+
+
+def draw_detection(image: np.ndarray, box: Box, text: str) -> None:
+    """Draws bbox, center and control values onto the image in place."""
+    x1, y1, x2, y2 = box
+    cv2.rectangle(image, (x1, y1), (x2, y2), (0, 255, 0), 2)
+    cv2.circle(image, (int((x1 + x2) / 2), int((y1 + y2) / 2)), 5, (0, 0, 255), -1)
+    cv2.putText(image, text, (x1, y1 - 10),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+
+
+def create_detection_queue(frame_grabber: FrameGrabber) -> LatestValueQueue[Detection]:
+    """Creates the queue linking inference and actuation.
+
+    Frames of detections replaced by newer ones before the actuation stage got them are released to the grabber.
+    """
+    return LatestValueQueue(maxsize=1, on_discard=lambda item: frame_grabber.ring.unpin(item[0]))
+
+
+async def inference_stage(
+    tracker: RoiTracker,
+    frame_grabber: FrameGrabber,
+    detections: LatestValueQueue[Detection],
+    stop_event: asyncio.Event,
+    meters: PipelineMeters,
+) -> None:
+    """Runs the detector on the newest frame in a worker thread, so the event loop keeps driving meanwhile.
+
+    A miss on the crop around the tracked ball is not passed on, the robot keeps its last command
+    until the tracker found the ball again or gave up after max_misses and searched the full frame.
+    Only a miss on the full frame reaches the actuation stage as a lost ball.
+    """
+    last_sequence = 0
+    while not stop_event.is_set():
+        frame, detected, box, on_crop = await asyncio.to_thread(
+            detect_newest_frame, tracker, frame_grabber, last_sequence)
+        if frame is None:
+            continue
+        last_sequence = frame.sequence
+        meters.inference.tick()
+        if not detected and on_crop:
+            # A single miss, e.g. from motion blur, must not reset the PID and start a search.
+            frame_grabber.ring.unpin(frame)
+            continue
+        detections.put_nowait((frame, detected, box))
+
+
+async def drive(controller: EasyDriveController, speeds: np.ndarray, captured_at: float) -> bool:
+    """Sends a drive command and reports it, if it was dropped because it expired or a newer one superseded it."""
+    if await controller.drive(speeds=speeds, captured_at=captured_at):
+        return True
+    commands = controller.commands
+    print(f"Drive command dropped ({commands.expired} expired, {commands.superseded} superseded so far)")
+    return False
+
+
+async def actuation_stage(
+    controller: EasyDriveController,
+    frame_grabber: FrameGrabber,
+    detections: LatestValueQueue[Detection],
+    stop_event: asyncio.Event,
+    meters: PipelineMeters,
+    recorder: Optional[FrameRecorder] = None,
+    on_detection: Optional[Callable[[Frame, bool, Box], None]] = None,
+) -> None:
+    """Turns the newest detection into a drive command and releases its frame.
+
+    on_detection is called with each detection before it is acted on, e.g. to stop a benchmark once the ball is reached.
+    """
+    # PID controller for left/right control, stepped with the measured time between frames.
+    # Output is clamped to speed limits (e.g., -100 to 100).
+    max_speed = 100.0
+    pid = PIDController(kp=100.0, ki=0.0, kd=20.0, output_limits=(-max_speed, max_speed),
+                        integral_limits=(-0.5, 0.5), derivative_time_constant=0.05)
+
+    forward_speed = 40.0  # forward speed value, adjust as needed
+    # Search by slowly moving left and pausing, stepped with every frame, so detection continues while searching.
+    search = SearchStrategy("pulse", speeds=(0.0, 50.0, 0.0), move_duration=0.5, pause_duration=0.5)
+
+    while not stop_event.is_set():
+        captured, detected, box = await detections.get()
+        frame, captured_at = captured.image, captured.timestamp
+        meters.loop.tick()
+
+        try:
+            if on_detection is not None:
+                on_detection(captured, detected, box)
+            if detected:
+                meters.detection.tick()
+                if search.searching:
+                    search.stop(captured_at)
+                    print(f"Ball reacquired after {search.last_search_duration:.2f}s")
+                x1, y1, x2, y2 = box
+                center_x = (x1 + x2) / 2
+                frame_height, frame_width = frame.shape[:2]
+                bbox_height = y2 - y1
+
+                error = (center_x / frame_width) - 0.5  # error from center line (-0.5 to 0.5)
+
+                # PID calculations, timed by the capture timestamp of the frame.
+                # The controller regulates the ball position towards the center, so its output is negated to steer towards the error.
+                output = -pid.update(center_x / frame_width, setpoint=0.5, now=captured_at)
+
+                # Decide forward speed based on bbox height
+                # Move forward if bbox height < 80% frame height
+                if bbox_height < 0.8 * frame_height:
+                    forward = forward_speed
+                elif bbox_height > 0.9 * frame_height:
+                    forward = - forward_speed
+                # # elif 0.77 * frame_height > bbox_height > 0.88 * frame_height:  # Slow down if close
+                # #     forward = 0.0
+                # else:  # stop forward movement if close enough
+                    forward = 0.0
+
+                print(f"Error: {error:.3f}, PID output: {output:.1f}, Forward speed: {forward:.1f}")
+
+                if recorder is not None:
+                    # Record the annotated frame, drawing and encoding happen on the recorder thread.
+                    text = f"Error: {error:.3f}, PID: {output:.1f}, Fwd: {forward:.1f}"
+                    recorder.submit(frame, functools.partial(draw_detection, box=box, text=text), timestamp=captured_at)
+
+                try:
+                    if forward_speed == 0.0:
+                        # Command robot: speeds = [forward/backward, left/right, rotation]
+                        await drive(controller, np.array([forward, output, 0.0]), captured_at)
+                    elif forward > 0.0:
+                        await drive(controller, np.array([0.0, 0.0, -100.0]), captured_at)
+                    elif forward < 0.0:
+                        await drive(controller, np.array([0.0, 0.0, 0.0]), captured_at)
+                    # elif 0.77 * frame_height > bbox_height > 0.88 * frame_height:  # Slow down if close
+                    #     await controller.drive(speeds=np.array([0.0, 0.0, 0.0]))
+                except Exception as e:
+                    print(f"Error during drive control: {e}")
+                    await controller.stop()
+                    continue
+
+            else:
+                # Target lost, start the next lock-on without stale integral and derivative state.
+                pid.reset()
+                # No detection: continue the search pattern, the next frame is analysed right away
+                try:
+                    await drive(controller, search.command(captured_at), captured_at)
+                except Exception as e:
+                    print(f"Error during search drive: {e}")
+                    continue
+        finally:
+            # Release the frame to the grabber, after its image was used for geometry and recording.
+            frame_grabber.ring.unpin(captured)
+
+
+async def run_ball_tracking(
+    controller: EasyDriveController,
+    frame_grabber: FrameGrabber,
+    tracker: RoiTracker,
+    detections: LatestValueQueue[Detection],
+    stop_event: asyncio.Event,
+    meters: PipelineMeters,
+    recorder: Optional[FrameRecorder] = None,
+    on_detection: Optional[Callable[[Frame, bool, Box], None]] = None,
+) -> None:
+    """Runs inference and actuation concurrently until stop_event is set or a stage dies, then stops the robot.
+
+    The stages are linked by the grabber's frame ring and the detection queue, so the loop rate is set
+    by the slowest stage instead of the sum of all stages.
+
+    Raises
+    ------
+    Exception
+        The first exception a stage died with, after the robot was stopped.
+    """
+    stages = [
+        asyncio.create_task(inference_stage(tracker, frame_grabber, detections, stop_event, meters)),
+        asyncio.create_task(actuation_stage(
+            controller, frame_grabber, detections, stop_event, meters, recorder, on_detection)),
+    ]
+
+    # Stop as soon as the user quits or a stage dies, instead of hanging with the motors at their last speed.
+    stop_task = asyncio.create_task(stop_event.wait())
+    try:
+        await asyncio.wait(stages + [stop_task], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        stop_event.set()
+        for task in stages + [stop_task]:
+            task.cancel()
+        results = await asyncio.gather(*stages, return_exceptions=True)
+        await controller.stop()
+
+    failures = [result for result in results if isinstance(result, Exception)]
+    for stage, result in zip(("inference", "actuation"), results):
+        if isinstance(result, Exception):
+            print(f"The {stage} stage failed:")
+            traceback.print_exception(result)
+    if failures:
+        raise failures[0]
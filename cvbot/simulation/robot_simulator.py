@@ -0,0 +1,583 @@
+import argparse
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncGenerator
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from cvbot.communication.controller import Controller
+from cvbot.config.detector_configuration import DetectorConfiguration
+from cvbot.config.drive_robot_configuration import DriveRobotConfiguration
+from cvbot.controller.easy_drive_controller import EasyDriveController
+from cvbot.model.camera import Camera
+from cvbot.model.counter_motor import CounterMotor
+from cvbot.model.device import Device
+from cvbot.model.frame import Frame
+from cvbot.model.sensor import Sensor
+from cvbot.model.servomotor import Servomotor
+from cvbot.pipeline.ball_tracking import PipelineMeters, create_detection_queue, run_ball_tracking
+from cvbot.vision.detector import Detections, Detector
+from cvbot.vision.frame_grabber import FrameGrabber
+from cvbot.vision.frame_recorder import FrameRecorder
+from cvbot.vision.roi_tracker import RoiTracker
+
+
+class RobotSimulator(Controller):
+    """Headless simulation of the robot and a ball, implementing the Controller interface.
+
+    The motor speeds are interpreted as motor speeds in rad/s (times motor_speed_scale), as produced by the kinematic
+    matrix of the configuration. The pseudo-inverse of the kinematic matrix maps them to the vehicle motion,
+    which is integrated into the pose of the robot, and the encoder counters advance with the motor rotation.
+    The camera renders the ball with a pinhole model from the pose of the robot.
+
+    The simulation runs on its own clock, time_scale times faster than real time. Frame timestamps and counter
+    timestamps are in simulation time, see now. The state is guarded by a lock, so the camera can be read
+    from another thread, see SimulatedCapture.
+    """
+
+    pose: np.ndarray
+    """Pose of the robot in the world (x, z, heading), in meters and radians (clockwise seen from above)."""
+
+    ball: np.ndarray
+    """Position of the ball on the ground (x, z) in meters."""
+
+    command_latencies: List[float]
+    """Simulation time between the capture of the latest delivered frame and each motor update, in seconds."""
+
+    def __init__(
+        self,
+        config: Optional[DriveRobotConfiguration] = None,
+        ball: Tuple[float, float] = (1.0, 1.5),
+        ball_radius: float = 0.11,
+        time_scale: float = 1.0,
+        motor_speed_scale: float = 1.0,
+        motor_time_constant: float = 0.05,
+        command_latency: float = 0.01,
+        camera_width: int = 320,
+        camera_height: int = 240,
+        camera_fps: int = 30,
+        camera_fov: float = math.radians(60.0),
+        camera_height_above_ground: float = 0.12,
+        physics_step: float = 0.005,
+        **kwargs,
+    ) -> None:
+        """Initialize the simulator.
+
+        Parameters
+        ----------
+        config : Optional[DriveRobotConfiguration], optional
+            The configuration of the simulated robot, by default the default configuration.
+        ball : Tuple[float, float], optional
+            Position of the ball (x, z) in meters, relative to the start pose of the robot, by default (1.0, 1.5).
+        ball_radius : float, optional
+            Radius of the ball in meters, by default 0.11.
+        time_scale : float, optional
+            Speed of the simulation clock relative to real time, by default 1.0.
+        motor_speed_scale : float, optional
+            Motor speed in rad/s per unit of the commanded motor speed, by default 1.0.
+        motor_time_constant : float, optional
+            Time constant in seconds of the first order response of the motors, by default 0.05.
+        command_latency : float, optional
+            Delay in seconds until a motor update takes effect, by default 0.01.
+        camera_width : int, optional
+            Width of the camera images, by default 320.
+        camera_height : int, optional
+            Height of the camera images, by default 240.
+        camera_fps : int, optional
+            Frame rate of the camera, by default 30.
+        camera_fov : float, optional
+            Horizontal field of view of the camera in radians, by default 60 degrees.
+        camera_height_above_ground : float, optional
+            Height of the camera above the ground in meters, by default 0.12.
+        physics_step : float, optional
+            Integration step of the simulation in seconds, by default 0.005.
+        """
+        super().__init__(**kwargs)
+        self.config = config if config is not None else DriveRobotConfiguration()
+        self.pose = np.zeros(3, dtype=np.float64)
+        self.ball = np.array(ball, dtype=np.float64)
+        self.ball_radius = ball_radius
+        self.time_scale = time_scale
+        self.motor_speed_scale = motor_speed_scale
+        self.motor_time_constant = motor_time_constant
+        self.command_latency = command_latency
+        self.camera_size = (camera_width, camera_height)
+        self.camera_fps = camera_fps
+        self.focal_length = camera_width / 2 / math.tan(camera_fov / 2)
+        self.camera_height_above_ground = camera_height_above_ground
+        self.physics_step = physics_step
+        self.command_latencies = []
+        self._inverse_kinematic_matrix = self.config.inverse_kinematic_matrix.astype(np.float64)
+        self._drive_rows = {name: index for index, name in enumerate(self.config.drive_motor_names)}
+        # Speeds in rad/s of the drive motors, in the order of the configuration.
+        self._wheel_speeds = np.zeros(len(self._drive_rows), dtype=np.float64)
+        self._target_speeds = np.zeros_like(self._wheel_speeds)
+        self._counts = np.zeros_like(self._wheel_speeds)
+        self._pending_commands: Deque[Tuple[float, np.ndarray]] = deque()
+        self._servo_positions: Dict[str, int] = dict()
+        self._last_frame_timestamp = None
+        self._background = self._render_background()
+        self._real_start = time.monotonic()
+        self._simulated_until = 0.0
+        self._lock = threading.RLock()
+
+    def now(self) -> float:
+        """Returns the current simulation time in seconds."""
+        return (time.monotonic() - self._real_start) * self.time_scale
+
+    async def sleep(self, duration: float) -> None:
+        """Sleeps for a duration of simulation time.
+
+        Parameters
+        ----------
+        duration : float
+            The duration in seconds of simulation time.
+        """
+        await asyncio.sleep(max(0.0, duration) / self.time_scale)
+
+    def advance(self, until: Optional[float] = None) -> None:
+        """Integrates the motion of the robot and the counters up to the given simulation time.
+
+        Parameters
+        ----------
+        until : Optional[float], optional
+            The simulation time, by default now.
+        """
+        with self._lock:
+            self._advance(self.now() if until is None else until)
+
+    def _advance(self, until: float) -> None:
+        while self._simulated_until < until:
+            dt = min(self.physics_step, until - self._simulated_until)
+            t = self._simulated_until + dt
+            while self._pending_commands and self._pending_commands[0][0] <= t:
+                self._target_speeds[:] = self._pending_commands.popleft()[1]
+            # First order response of the motors.
+            self._wheel_speeds += (self._target_speeds - self._wheel_speeds) * min(1.0, dt / self.motor_time_constant)
+            vx, vz, w = (self._inverse_kinematic_matrix @ self._wheel_speeds).tolist()
+            heading = self.pose[2] + w * dt / 2
+            cos, sin = math.cos(heading), math.sin(heading)
+            self.pose[0] += (vx * cos + vz * sin) * dt
+            self.pose[1] += (-vx * sin + vz * cos) * dt
+            self.pose[2] += w * dt
+            # The counters count pulses regardless of the direction.
+            self._counts += np.abs(self._wheel_speeds) * dt / (2 * math.pi) * self.config.encoder_counts_per_revolution
+            self._simulated_until = t
+
+    def ball_in_camera(self) -> Optional[Tuple[float, float, float]]:
+        """Projects the ball into the camera image.
+
+        Returns
+        -------
+        Optional[Tuple[float, float, float]]
+            Center (u, v) and radius of the ball in pixels, None if the ball is behind the camera.
+        """
+        dx_world, dz_world = self.ball - self.pose[:2]
+        cos, sin = math.cos(self.pose[2]), math.sin(self.pose[2])
+        dx = dx_world * cos - dz_world * sin
+        dz = dx_world * sin + dz_world * cos
+        if dz <= self.ball_radius:
+            return None
+        width, height = self.camera_size
+        u = width / 2 + self.focal_length * dx / dz
+        v = height / 2 + self.focal_length * (self.camera_height_above_ground - self.ball_radius) / dz
+        return u, v, self.focal_length * self.ball_radius / dz
+
+    def render(self) -> np.ndarray:
+        """Renders the camera image at the current pose.
+
+        Returns
+        -------
+        np.ndarray
+            The BGR image of shape (H,W,3) and dtype uint8.
+        """
+        image = self._background.copy()
+        projection = self.ball_in_camera()
+        if projection is not None:
+            u, v, radius = projection
+            width, height = self.camera_size
+            if -radius < u < width + radius and -radius < v < height + radius:
+                # Draw with subpixel precision.
+                shift = 4
+                cv2.circle(
+                    image, (int(u * (1 << shift)), int(v * (1 << shift))), max(1, int(radius * (1 << shift))),
+                    (0, 120, 255), -1, lineType=cv2.LINE_AA, shift=shift,
+                )
+        return image
+
+    def capture(self, timestamp: float) -> np.ndarray:
+        """Advances the simulation to the given time and renders the camera image.
+
+        Parameters
+        ----------
+        timestamp : float
+            The capture time in seconds of simulation time.
+
+        Returns
+        -------
+        np.ndarray
+            The BGR image of shape (H,W,3) and dtype uint8.
+        """
+        with self._lock:
+            self._advance(timestamp)
+            self._last_frame_timestamp = timestamp
+            return self.render()
+
+    def _render_background(self) -> np.ndarray:
+        width, height = self.camera_size
+        image = np.empty((height, width, 3), dtype=np.uint8)
+        image[: height // 2] = (200, 190, 180)
+        image[height // 2:] = (60, 140, 60)
+        return image
+
+    async def discover_devices(self) -> Dict[int, Device]:
+        devices = dict()
+        for name in sorted(self._drive_rows):
+            motor = CounterMotor(id=self.allocate_id(), name=name, speed=0)
+            devices[motor.id] = motor
+        for index in range(1, 4):
+            servomotor = Servomotor(id=self.allocate_id(), name=f"S{index}")
+            devices[servomotor.id] = servomotor
+        width, height = self.camera_size
+        camera = Camera(id=self.allocate_id(), width=width, height=height, fps=self.camera_fps)
+        devices[camera.id] = camera
+        return devices
+
+    async def open_sensor(self, *device: Sensor) -> AsyncGenerator[np.ndarray]:
+        for sensor in device:
+            if isinstance(sensor, Camera):
+                async for image in self.open_camera(sensor):
+                    yield image
+                return
+        names = ", ".join(type(sensor).__name__ for sensor in device)
+        raise ValueError(f"Unsupported sensor {names}, the simulator can only stream the camera.")
+
+    async def open_camera(self, camera: Camera) -> AsyncGenerator[np.ndarray, None]:
+        async for frame in self.open_camera_frames(camera):
+            yield frame.image
+
+    async def open_camera_frames(self, camera: Camera, reduction: int = 1) -> AsyncGenerator[Frame, None]:
+        """Renders the camera images on demand.
+
+        The camera captures a frame every 1 / fps seconds of simulation time. A consumer slower than the camera
+        gets the newest frame, the skipped frames show up as gaps in the sequence numbers.
+        """
+        period = 1.0 / self.camera_fps
+        last_sequence = 0
+        while True:
+            now = self.now()
+            sequence = int(now / period) + 1
+            if sequence <= last_sequence:
+                await self.sleep(last_sequence * period - now)
+                continue
+            timestamp = (sequence - 1) * period
+            image = self.capture(timestamp)
+            if reduction > 1:
+                image = cv2.resize(
+                    image, (image.shape[1] // reduction, image.shape[0] // reduction), interpolation=cv2.INTER_AREA
+                )
+            image.flags.writeable = False
+            last_sequence = sequence
+            yield Frame(image, sequence, timestamp)
+
+    async def update_motors(self, *device: CounterMotor) -> None:
+        for motor in device:
+            self.get_motor_state(motor).speed = motor.speed
+        await self.update_motor_states(*device)
+
+    async def update_motor_states(self, *device: CounterMotor) -> None:
+        with self._lock:
+            now = self.now()
+            self._advance(now)
+            speeds = self._pending_commands[-1][1].copy() if self._pending_commands else self._target_speeds.copy()
+            for motor in device:
+                row = self._drive_rows.get(motor.name, None)
+                if row is not None:
+                    speeds[row] = self.get_motor_state(motor).speed * self.motor_speed_scale
+            self._pending_commands.append((now + self.command_latency, speeds))
+            if self._last_frame_timestamp is not None:
+                self.command_latencies.append(now - self._last_frame_timestamp)
+
+    async def update_servomotors(self, *device: Servomotor) -> None:
+        for servomotor in device:
+            self._servo_positions[servomotor.name] = servomotor.position
+
+    async def update_counters(self, *device: CounterMotor) -> None:
+        with self._lock:
+            self._advance(self.now())
+            for motor in device:
+                row = self._drive_rows.get(motor.name, None)
+                if row is not None:
+                    self._counts[row] = motor.count
+                self.get_motor_state(motor).count = motor.count
+
+    async def read_counters(self, *device: CounterMotor) -> List[CounterMotor]:
+        await self.refresh_counters(*device)
+        return self.sync_devices(*device)
+
+    async def refresh_counters(self, *device: CounterMotor) -> None:
+        with self._lock:
+            now = self.now()
+            self._advance(now)
+            motors = [motor for motor in device if motor.name in self._drive_rows]
+            rows = np.array([self.get_motor_state(motor).row for motor in motors], dtype=np.intp)
+            counts = self._counts[[self._drive_rows[motor.name] for motor in motors]].astype(np.int64)
+        self.motor_table.record_counts(rows, counts, now)
+
+
+class SimulatedCapture:
+    """The camera of a RobotSimulator behind the interface of a cv2.VideoCapture, e.g. to feed a FrameGrabber.
+
+    Like a camera, reading blocks until the next frame is due, every 1 / fps seconds of simulation time.
+    Frames which were due while nobody read are skipped.
+    """
+
+    def __init__(self, simulator: RobotSimulator) -> None:
+        """Initialize the capture.
+
+        Parameters
+        ----------
+        simulator : RobotSimulator
+            The simulator rendering the images.
+        """
+        self.simulator = simulator
+        self._index = -1
+        self._opened = True
+
+    def isOpened(self) -> bool:
+        return self._opened
+
+    def set(self, property_id: int, value: float) -> bool:
+        # The simulated camera has no settable properties.
+        return False
+
+    def grab(self) -> bool:
+        """Waits for the next frame and skips it."""
+        return self._wait_for_next_frame() is not None
+
+    def read(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        """Waits for the next frame and renders it.
+
+        Parameters
+        ----------
+        image : Optional[np.ndarray], optional
+            Buffer to render into, by default a new array.
+
+        Returns
+        -------
+        Tuple[bool, Optional[np.ndarray]]
+            Whether a frame was read, and the BGR image of shape (H,W,3) and dtype uint8.
+        """
+        timestamp = self._wait_for_next_frame()
+        if timestamp is None:
+            return False, None
+        rendered = self.simulator.capture(timestamp)
+        if image is None or image.shape != rendered.shape:
+            return True, rendered
+        np.copyto(image, rendered)
+        return True, image
+
+    def release(self) -> None:
+        self._opened = False
+
+    def _wait_for_next_frame(self) -> Optional[float]:
+        if not self._opened:
+            return None
+        period = 1.0 / self.simulator.camera_fps
+        now = self.simulator.now()
+        self._index = max(self._index + 1, math.ceil(now / period))
+        timestamp = self._index * period
+        if timestamp > now:
+            time.sleep((timestamp - now) / self.simulator.time_scale)
+        return timestamp
+
+
+class ColorBallDetector(Detector):
+    """Detects an orange ball by its color, e.g. in the images of the RobotSimulator.
+
+    Stands in for the neural network detector in benchmarks of the control loop, which do not need the model weights.
+    """
+
+    def __init__(
+        self,
+        config: Optional[DetectorConfiguration] = None,
+        lower_hsv: Tuple[int, int, int] = (5, 150, 150),
+        upper_hsv: Tuple[int, int, int] = (25, 255, 255),
+        min_area: int = 4,
+    ) -> None:
+        """Initialize the detector.
+
+        Parameters
+        ----------
+        config : Optional[DetectorConfiguration], optional
+            The configuration, only channel_order is used, by default BGR images.
+        lower_hsv : Tuple[int, int, int], optional
+            Lower bound of the ball color in OpenCV HSV, by default (5, 150, 150).
+        upper_hsv : Tuple[int, int, int], optional
+            Upper bound of the ball color in OpenCV HSV, by default (25, 255, 255).
+        min_area : int, optional
+            Minimal area of the ball in pixels, by default 4.
+        """
+        super().__init__(config if config is not None else DetectorConfiguration())
+        self.lower_hsv = np.array(lower_hsv, dtype=np.uint8)
+        self.upper_hsv = np.array(upper_hsv, dtype=np.uint8)
+        self.min_area = min_area
+
+    def detect(self, image: np.ndarray) -> Detections:
+        code = cv2.COLOR_BGR2HSV if self.config.channel_order == "bgr" else cv2.COLOR_RGB2HSV
+        mask = cv2.inRange(cv2.cvtColor(image, code), self.lower_hsv, self.upper_hsv)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+        # Skip the background component.
+        stats = stats[1:]
+        stats = stats[stats[:, cv2.CC_STAT_AREA] >= self.min_area]
+        boxes = np.empty((len(stats), 4), dtype=np.float32)
+        boxes[:, 0] = stats[:, cv2.CC_STAT_LEFT]
+        boxes[:, 1] = stats[:, cv2.CC_STAT_TOP]
+        boxes[:, 2] = stats[:, cv2.CC_STAT_LEFT] + stats[:, cv2.CC_STAT_WIDTH]
+        boxes[:, 3] = stats[:, cv2.CC_STAT_TOP] + stats[:, cv2.CC_STAT_HEIGHT]
+        # Confidence by how well the component fills a circle in its box.
+        filled = stats[:, cv2.CC_STAT_AREA] / np.maximum(
+            math.pi / 4 * stats[:, cv2.CC_STAT_WIDTH] * stats[:, cv2.CC_STAT_HEIGHT], 1.0)
+        scores = np.clip(filled, 0.0, 1.0).astype(np.float32)
+        return Detections(boxes, scores, np.zeros(len(stats), dtype=np.int64))
+
+
+async def benchmark_ball_tracking(
+    simulator: RobotSimulator,
+    detector: Optional[Detector] = None,
+    duration: float = 30.0,
+    max_command_age: Optional[float] = 0.25,
+    recorder: Optional[FrameRecorder] = None,
+    on_detection: Optional[Callable[[Frame, bool, Tuple[int, int, int, int]], None]] = None,
+) -> Dict[str, float]:
+    """Runs the ball tracking pipeline of pid.py against the simulator for a duration.
+
+    The stages of cvbot.pipeline.ball_tracking run unchanged: a FrameGrabber captures the simulated camera,
+    the RoiTracker detects the ball in a worker thread, and the actuation stage steers with the PID controller
+    and search pattern of pid.py. All clocks, of the frame timestamps, command deadlines and rates, are set to
+    the simulation clock, so deadlines and latencies are measured in simulation time.
+
+    The steering of pid.py rotates the robot while the ball is visible and only drives forward while searching,
+    so it does not approach the ball. The benchmark measures the pipeline, how fast the ball is found and
+    how often it is seen, not whether the robot reaches it.
+
+    Parameters
+    ----------
+    simulator : RobotSimulator
+        The simulator, already holding the scene.
+    detector : Optional[Detector], optional
+        The detector, by default a ColorBallDetector.
+    duration : float, optional
+        Duration of the run in seconds of simulation time, by default 30.0.
+    max_command_age : Optional[float], optional
+        Time in seconds of simulation time after which a drive command, which was not executed yet, is dropped,
+        by default 0.25 like pid.py. None to never drop commands.
+    recorder : Optional[FrameRecorder], optional
+        Records the annotated detections like pid.py, by default None.
+    on_detection : Optional[Callable[[Frame, bool, Tuple[int, int, int, int]], None]], optional
+        Called with each detection the actuation stage acts on, by default None.
+
+    Returns
+    -------
+    Dict[str, float]
+        elapsed and first_detection_time in seconds of simulation time (NaN if the ball was never detected),
+        detection_ratio, the fraction of the acted on frames showing the ball, loop_rate and inference_rate
+        in Hz of simulation time, mean and max command_latency in seconds, the number of dropped_frames,
+        and the numbers of expired_commands and superseded_commands.
+    """
+    if detector is None:
+        detector = ColorBallDetector()
+    tracker = RoiTracker(detector)
+    drive = EasyDriveController(simulator, simulator.config, max_command_age=max_command_age, clock=simulator.now)
+    await drive.initialize()
+    meters = PipelineMeters(clock=simulator.now)
+    capture = SimulatedCapture(simulator)
+    frame_grabber = FrameGrabber(capture, ring_size=5, clock=simulator.now)
+    detections = create_detection_queue(frame_grabber)
+    stop_event = asyncio.Event()
+    start = simulator.now()
+    first_detection_at = None
+
+    def observe(frame: Frame, detected: bool, box: Tuple[int, int, int, int]) -> None:
+        nonlocal first_detection_at
+        if on_detection is not None:
+            on_detection(frame, detected, box)
+        if detected and first_detection_at is None:
+            first_detection_at = frame.timestamp
+
+    async def time_out() -> None:
+        await simulator.sleep(duration)
+        stop_event.set()
+
+    timer = asyncio.create_task(time_out())
+    try:
+        await run_ball_tracking(drive, frame_grabber, tracker, detections, stop_event, meters, recorder, observe)
+    finally:
+        timer.cancel()
+        frame_grabber.stop()
+        capture.release()
+    elapsed = simulator.now() - start
+    captured = frame_grabber.ring.sequence if frame_grabber.ring is not None else 0
+    latencies = simulator.command_latencies
+    return dict(
+        elapsed=elapsed,
+        first_detection_time=first_detection_at - start if first_detection_at is not None else math.nan,
+        detection_ratio=meters.detection.count / meters.loop.count if meters.loop.count > 0 else math.nan,
+        loop_rate=meters.loop.count / elapsed if elapsed > 0 else math.nan,
+        inference_rate=meters.inference.count / elapsed if elapsed > 0 else math.nan,
+        mean_command_latency=float(np.mean(latencies)) if latencies else math.nan,
+        max_command_latency=float(np.max(latencies)) if latencies else math.nan,
+        # Frames the detector skipped, and frames dropped by the capture and the detection queue.
+        dropped_frames=float(captured - meters.inference.count + frame_grabber.dropped + detections.dropped),
+        expired_commands=float(drive.commands.expired),
+        superseded_commands=float(drive.commands.superseded),
+    )
+
+
+def main() -> None:
+    """Runs the ball tracking benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmarks the ball tracking loop against the robot simulator.")
+    parser.add_argument("--time-scale", type=float, default=4.0, help="Speed of the simulation relative to real time.")
+    parser.add_argument("--duration", type=float, default=30.0, help="Duration in seconds of simulation time.")
+    parser.add_argument("--ball", type=float, nargs=2, default=(0.3, 1.5),
+                        help="Position (x, z) of the ball in meters, by default in view of the start pose.")
+    parser.add_argument("--model", default=None, help="Model of the detector, by default the ball is found by its color.")
+    parser.add_argument("--motor-speed-scale", type=float, default=0.05,
+                        help="Motor speed in rad/s per unit of the motor speed, 0.05 turns the full speed of 255 into "
+                             "about 2 revolutions per second.")
+    parser.add_argument("--max-command-age", type=float, default=0.25,
+                        help="Time in seconds after which a drive command, which was not executed yet, is dropped.")
+    parser.add_argument("--record", default=None, help="Records the annotated detections into this .avi file.")
+    args = parser.parse_args()
+
+    async def run() -> Dict[str, float]:
+        simulator = RobotSimulator(
+            ball=tuple(args.ball), time_scale=args.time_scale, motor_speed_scale=args.motor_speed_scale
+        )
+        detector = None
+        if args.model is not None:
+            from cvbot.vision.detector import create_detector
+
+            detector = create_detector(DetectorConfiguration(model_path=args.model))
+        recorder = None
+        if args.record is not None:
+            recorder = FrameRecorder(args.record, mode="video", max_fps=10.0, video_fps=10.0)
+        try:
+            return await benchmark_ball_tracking(
+                simulator, detector, duration=args.duration, max_command_age=args.max_command_age, recorder=recorder
+            )
+        finally:
+            if recorder is not None:
+                recorder.close()
+
+    for key, value in asyncio.run(run()).items():
+        print(f"{key}: {value:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+import argparse
+import asyncio
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+try:
+    from aiohttp import web
+except ImportError:
+    web = None
+
+
+class TxtControllerState:
+    """State of the simulated TXT controller: actuator setpoints and counters.
+
+    The counters of the motors advance with the commanded speed, so clients reading counters see plausible values.
+    """
+
+    motors: Dict[str, Dict[str, Any]]
+    """Last motor setpoints, keyed by motor name, e.g. "M1"."""
+
+    servomotors: Dict[str, Dict[str, Any]]
+    """Last servomotor setpoints, keyed by servomotor name, e.g. "S1"."""
+
+    counts: Dict[str, float]
+    """Counter values, keyed by counter name, e.g. "C1"."""
+
+    def __init__(self, counts_per_second: float = 200.0, max_motor_value: int = 512) -> None:
+        """Initialize the state.
+
+        Parameters
+        ----------
+        counts_per_second : float, optional
+            Counter increments per second of a motor at full speed, by default 200.0.
+        max_motor_value : int, optional
+            The motor value of full speed, by default 512.
+        """
+        self.counts_per_second = counts_per_second
+        self.max_motor_value = max_motor_value
+        self.reset()
+
+    def reset(self) -> None:
+        """Stops all actuators and clears the counters."""
+        self.motors = {
+            f"M{index}": dict(name=f"M{index}", enabled=True, values=[0], direction="CW") for index in range(1, 5)
+        }
+        self.servomotors = {
+            f"S{index}": dict(name=f"S{index}", enabled=True, value=256) for index in range(1, 4)
+        }
+        self.counts = {f"C{index}": 0.0 for index in range(1, 5)}
+        self._updated_at = time.monotonic()
+
+    def advance(self, now: Optional[float] = None) -> None:
+        """Advances the counters to the given time, according to the motor speeds.
+
+        Parameters
+        ----------
+        now : Optional[float], optional
+            The time in seconds of the monotonic clock, by default now.
+        """
+        if now is None:
+            now = time.monotonic()
+        dt = now - self._updated_at
+        self._updated_at = now
+        for name, motor in self.motors.items():
+            value = motor["values"][0] if motor.get("enabled", True) and motor["values"] else 0
+            counter = "C" + name[1:]
+            # The counters count pulses regardless of the direction.
+            self.counts[counter] += abs(value) / self.max_motor_value * self.counts_per_second * dt
+
+    def counter(self, name: str) -> Dict[str, Any]:
+        """Returns a counter in the format of the api."""
+        self.advance()
+        return dict(name=name, enabled=True, digital=True, count=int(self.counts[name]))
+
+
+def render_ball_frame(timestamp: float, width: int = 320, height: int = 240) -> np.ndarray:
+    """Renders a synthetic camera image: an orange ball circling on a green floor.
+
+    Parameters
+    ----------
+    timestamp : float
+        Time in seconds, determines the position of the ball.
+    width : int, optional
+        Width of the image, by default 320.
+    height : int, optional
+        Height of the image, by default 240.
+
+    Returns
+    -------
+    np.ndarray
+        The BGR image of shape (H,W,3) and dtype uint8.
+    """
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:] = (60, 140, 60)
+    center = (
+        int(width / 2 + width / 3 * np.cos(timestamp)),
+        int(height / 2 + height / 4 * np.sin(2 * timestamp)),
+    )
+    cv2.circle(image, center, max(4, height // 12), (0, 120, 255), -1, lineType=cv2.LINE_AA)
+    return image
+
+
+class TxtApiServer:
+    """Local stand-in for the REST api of a TXT controller, for load and latency testing without hardware.
+
+    Serves exactly the endpoints TxtApiClient calls, each handler is named after the TxtApiControllerAPI call
+    it answers: controller init, single motor, servomotor and counter requests, and camera start / stream / stop,
+    with a synthetic MJPEG camera stream. Latency, jitter and failures can be injected per request.
+
+    The paths are collected in ROUTES. They are written after the calls of the cvtxtclient version pinned in
+    requirements_.txt, not generated from it. Requests to any other path are answered with 404 and recorded
+    in unmatched, so a client calling a path the server does not know shows up there instead of as a
+    failing request somewhere in the client. tests/test_txt_api_server.py runs TxtApiClient against the server
+    and checks that nothing was unmatched, when cvtxtclient is installed. Adjust ROUTES if it fails.
+    """
+
+    ROUTES: List[Tuple[str, str, str]] = [
+        ("POST", "/controller/{controller_id}/init", "init_controller_by_id"),
+        ("POST", "/controller/{controller_id}/motors/{motor_id}", "update_controller_motor_by_id"),
+        ("POST", "/controller/{controller_id}/servomotors/{servomotor_id}", "update_controller_servomotor_by_id"),
+        ("GET", "/controller/{controller_id}/counters/{counter_id}", "get_controller_counter_by_id"),
+        ("POST", "/controller/{controller_id}/counters/{counter_id}", "update_controller_counter_by_id"),
+        ("POST", "/camera/start", "start_camera"),
+        ("POST", "/camera/stop", "stop_camera"),
+        ("GET", "/camera/stream", "camera_image_stream"),
+    ]
+    """Method, path relative to the base path and handler name of each endpoint."""
+
+    requests: Dict[str, int]
+    """Number of requests, keyed by handler name, e.g. "update_controller_motor_by_id"."""
+
+    errors: Dict[str, int]
+    """Number of injected failures, keyed by handler name."""
+
+    unmatched: List[Tuple[str, str]]
+    """Method and path of each request which matched none of the ROUTES."""
+
+    def __init__(
+        self,
+        api_base_path: str = "/api/v1",
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        hang_rate: float = 0.0,
+        camera_fps: float = 30.0,
+        jpeg_quality: int = 80,
+        frame_source: Optional[Callable[[float], np.ndarray]] = None,
+        state: Optional[TxtControllerState] = None,
+        seed: Optional[int] = None,
+    ) -> None:
+        """Initialize the server.
+
+        Parameters
+        ----------
+        api_base_path : str, optional
+            The base path of the api, by default "/api/v1".
+        latency : float, optional
+            Delay in seconds added to each request, by default 0.0.
+        jitter : float, optional
+            Maximal random delay in seconds added on top of the latency, uniformly distributed, by default 0.0.
+        error_rate : float, optional
+            Probability of a request failing with status 500, by default 0.0.
+        hang_rate : float, optional
+            Probability of a request not being answered for 30 seconds, to trigger client timeouts, by default 0.0.
+        camera_fps : float, optional
+            Frame rate of the camera stream, by default 30.0.
+        jpeg_quality : int, optional
+            JPEG quality of the camera stream, by default 80.
+        frame_source : Optional[Callable[[float], np.ndarray]], optional
+            Renders the BGR camera image for a time of the monotonic clock, by default render_ball_frame.
+        state : Optional[TxtControllerState], optional
+            The simulated controller state, by default a new state.
+        seed : Optional[int], optional
+            Seed of the injected latency and failures, by default None.
+        """
+        if web is None:
+            raise ImportError("aiohttp not found. Is the package installed?")
+        self.api_base_path = api_base_path.rstrip("/")
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.camera_fps = camera_fps
+        self.jpeg_quality = jpeg_quality
+        self.frame_source = frame_source if frame_source is not None else render_ball_frame
+        self.state = state if state is not None else TxtControllerState()
+        self.camera_running = False
+        self.requests = dict()
+        self.errors = dict()
+        self.unmatched = []
+        self._random = random.Random(seed)
+        self._runner = None
+        self.url = None
+
+    def create_app(self) -> "web.Application":
+        """Creates the aiohttp application serving the endpoints.
+
+        Returns
+        -------
+        web.Application
+            The application.
+        """
+        app = web.Application()
+        for method, path, name in self.ROUTES:
+            app.router.add_route(method, self.api_base_path + path, self._wrap(name, getattr(self, name)))
+        # Registered last, so it only gets the requests none of the routes matched.
+        app.router.add_route("*", "/{path:.*}", self._unmatched)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Starts serving in the running event loop.
+
+        Parameters
+        ----------
+        host : str, optional
+            The host to bind to, by default "127.0.0.1".
+        port : int, optional
+            The port to bind to, by default 0 for a free port.
+
+        Returns
+        -------
+        str
+            The base url of the api.
+        """
+        self._runner = web.AppRunner(self.create_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        # The bound address, which holds the actual port if a free one was picked.
+        port = self._runner.addresses[0][1]
+        self.host, self.port = host, port
+        self.url = f"http://{host}:{port}{self.api_base_path}"
+        return self.url
+
+    async def stop(self) -> None:
+        """Stops serving and closes all connections."""
+        if self._runner is not None:
+            self.camera_running = False
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "TxtApiServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.stop()
+
+    def _wrap(self, name: str, handler: Callable) -> Callable:
+        async def wrapped(request: "web.Request") -> "web.StreamResponse":
+            self.requests[name] = self.requests.get(name, 0) + 1
+            delay = self.latency + (self._random.uniform(0.0, self.jitter) if self.jitter > 0.0 else 0.0)
+            if delay > 0.0:
+                await asyncio.sleep(delay)
+            if self.hang_rate > 0.0 and self._random.random() < self.hang_rate:
+                self.errors[name] = self.errors.get(name, 0) + 1
+                await asyncio.sleep(30.0)
+            if self.error_rate > 0.0 and self._random.random() < self.error_rate:
+                self.errors[name] = self.errors.get(name, 0) + 1
+                return web.json_response(dict(message="Injected failure"), status=500)
+            return await handler(request)
+
+        return wrapped
+
+    async def _unmatched(self, request: "web.Request") -> "web.Response":
+        self.unmatched.append((request.method, request.path))
+        return web.json_response(dict(message=f"No route for {request.method} {request.path}"), status=404)
+
+    async def init_controller_by_id(self, request: "web.Request") -> "web.Response":
+        self.state.reset()
+        return web.json_response(dict(message="Controller initialized"))
+
+    async def update_controller_motor_by_id(self, request: "web.Request") -> "web.Response":
+        self.state.advance()
+        motor = await request.json()
+        motor["name"] = self._name("M", request.match_info["motor_id"])
+        self.state.motors[motor["name"]] = motor
+        return web.json_response(motor)
+
+    async def update_controller_servomotor_by_id(self, request: "web.Request") -> "web.Response":
+        servomotor = await request.json()
+        servomotor["name"] = self._name("S", request.match_info["servomotor_id"])
+        self.state.servomotors[servomotor["name"]] = servomotor
+        return web.json_response(servomotor)
+
+    async def get_controller_counter_by_id(self, request: "web.Request") -> "web.Response":
+        return web.json_response(self.state.counter(self._name("C", request.match_info["counter_id"])))
+
+    async def update_controller_counter_by_id(self, request: "web.Request") -> "web.Response":
+        counter = await request.json()
+        name = self._name("C", request.match_info["counter_id"])
+        self.state.advance()
+        self.state.counts[name] = float(counter.get("count", 0))
+        return web.json_response(self.state.counter(name))
+
+    async def start_camera(self, request: "web.Request") -> "web.Response":
+        if request.can_read_body:
+            config = await request.json()
+            self.camera_fps = float(config.get("fps", self.camera_fps) or self.camera_fps)
+        self.camera_running = True
+        return web.json_response(dict(message="Camera started"))
+
+    async def stop_camera(self, request: "web.Request") -> "web.Response":
+        self.camera_running = False
+        return web.json_response(dict(message="Camera stopped"))
+
+    async def camera_image_stream(self, request: "web.Request") -> "web.StreamResponse":
+        """Streams JPEG images as multipart/x-mixed-replace (MJPEG) while the camera is running."""
+        boundary = "frame"
+        response = web.StreamResponse(
+            headers={"Content-Type": f"multipart/x-mixed-replace; boundary={boundary}"}
+        )
+        await response.prepare(request)
+        period = 1.0 / self.camera_fps
+        next_time = time.monotonic()
+        try:
+            while self.camera_running:
+                image = self.frame_source(time.monotonic())
+                # Encode off the event loop, so the other endpoints stay responsive.
+                ok, encoded = await asyncio.to_thread(
+                    cv2.imencode, ".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+                )
+                if ok:
+                    data = encoded.tobytes()
+                    await response.write(
+                        f"--{boundary}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(data)}\r\n\r\n".encode()
+                        + data + b"\r\n"
+                    )
+                next_time += period
+                await asyncio.sleep(max(0.0, next_time - time.monotonic()))
+            await response.write_eof()
+        except ConnectionResetError:
+            # The client closed the stream.
+            pass
+        return response
+
+    @staticmethod
+    def _name(prefix: str, device_id: str) -> str:
+        # Ids are given as number ("1") or as name ("M1").
+        return device_id if device_id.startswith(prefix) else prefix + device_id
+
+
+def main() -> None:
+    """Runs the stand-in server from the command line."""
+    parser = argparse.ArgumentParser(description="Local stand-in for the REST api of a TXT controller.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="Delay of each request in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Maximal random extra delay in seconds.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of a failing request.")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Probability of an unanswered request.")
+    parser.add_argument("--camera-fps", type=float, default=30.0)
+    args = parser.parse_args()
+
+    async def serve() -> None:
+        server = TxtApiServer(
+            latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+            hang_rate=args.hang_rate, camera_fps=args.camera_fps,
+        )
+        url = await server.start(args.host, args.port)
+        print(f"Serving TXT api stand-in at {url}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+from cvbot.telemetry.tracing import LatencyHistogram, Tracer
+
+
+class RateMeter:
+    """Counts events, e.g. loop iterations, and measures their rate over a time window.
+
+    Ticking is lock-free and cheap: the rate is updated by the ticking thread once per window,
+    readers on other threads only read the last result.
+    """
+
+    count: int
+    """Number of events since creation."""
+
+    def __init__(self, window: float = 5.0, clock: Callable[[], float] = time.monotonic) -> None:
+        """Initialize the meter.
+
+        Parameters
+        ----------
+        window : float, optional
+            Time in seconds over which the rate is averaged, by default 5.0.
+        clock : Callable[[], float], optional
+            The clock, by default time.monotonic.
+        """
+        self.window = window
+        self.clock = clock
+        self.count = 0
+        self._rate = 0.0
+        self._updated_at = clock()
+        self._mark = (self._updated_at, 0)
+
+    def tick(self, count: int = 1) -> None:
+        """Counts events.
+
+        Parameters
+        ----------
+        count : int, optional
+            Number of events, by default 1.
+        """
+        self.count += count
+        now = self.clock()
+        mark_time, mark_count = self._mark
+        if now - mark_time >= self.window:
+            self._rate = (self.count - mark_count) / (now - mark_time)
+            self._updated_at = now
+            self._mark = (now, self.count)
+
+    @property
+    def rate(self) -> float:
+        """Events per second in the last complete window, 0 if no event happened for two windows."""
+        if self.clock() - self._updated_at > 2 * self.window:
+            return 0.0
+        return self._rate
+
+
+class MetricsServer:
+    """Serves metrics of the running process in the Prometheus text format, e.g. for fleet dashboards.
+
+    Metrics are registered as callbacks, which are only evaluated when the endpoint is scraped.
+    The server runs on its own threads, so a scrape never stalls the event loop of the control process.
+    The histograms of a tracer are exported as Prometheus histograms, the requests to the TXT controller
+    per endpoint as cvbot_txt_request_duration_seconds and cvbot_txt_request_errors_total,
+    all other stages as cvbot_stage_duration_seconds and cvbot_stage_errors_total.
+    """
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+    """Content type of the Prometheus text format."""
+
+    _metrics: Dict[str, Tuple[str, str, List[Tuple[Dict[str, str], Callable[[], float]]]]]
+    """Type, help and the labelled callbacks of each metric, by metric name."""
+
+    def __init__(
+        self,
+        port: int = 9100,
+        host: str = "0.0.0.0",
+        tracer: Optional[Tracer] = None,
+        path: str = "/metrics",
+    ) -> None:
+        """Initialize the server, call start to serve.
+
+        Parameters
+        ----------
+        port : int, optional
+            The port to listen on, by default 9100. 0 to pick a free port.
+        host : str, optional
+            The address to listen on, by default all interfaces.
+        tracer : Optional[Tracer], optional
+            The tracer whose histograms are exported, by default None.
+        path : str, optional
+            The path of the metrics, by default "/metrics".
+        """
+        self.port = port
+        self.host = host
+        self.tracer = tracer
+        self.path = path
+        self._metrics = dict()
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def gauge(
+        self, name: str, help: str, collect: Callable[[], float], labels: Optional[Dict[str, str]] = None
+    ) -> None:
+        """Registers a gauge, a value which goes up and down, e.g. a queue depth.
+
+        Parameters
+        ----------
+        name : str
+            The metric name, e.g. "cvbot_loop_rate_hz".
+        help : str
+            Description of the metric.
+        collect : Callable[[], float]
+            Returns the current value. Called on the server thread.
+        labels : Optional[Dict[str, str]], optional
+            Labels distinguishing the series of the metric, by default None.
+        """
+        self._register(name, "gauge", help, collect, labels)
+
+    def counter(
+        self, name: str, help: str, collect: Callable[[], float], labels: Optional[Dict[str, str]] = None
+    ) -> None:
+        """Registers a counter, a value which only goes up, e.g. the number of dropped frames.
+
+        Parameters
+        ----------
+        name : str
+            The metric name, should end with "_total".
+        help : str
+            Description of the metric.
+        collect : Callable[[], float]
+            Returns the current value. Called on the server thread.
+        labels : Optional[Dict[str, str]], optional
+            Labels distinguishing the series of the metric, by default None.
+        """
+        self._register(name, "counter", help, collect, labels)
+
+    def _register(
+        self, name: str, kind: str, help: str, collect: Callable[[], float], labels: Optional[Dict[str, str]]
+    ) -> None:
+        with self._lock:
+            existing = self._metrics.get(name, None)
+            if existing is not None and existing[0] != kind:
+                raise ValueError(f"Metric {name} is already registered as {existing[0]}.")
+            if existing is None:
+                existing = self._metrics[name] = (kind, help, [])
+            existing[2].append((dict(labels) if labels is not None else dict(), collect))
+
+    def render(self) -> str:
+        """Renders all metrics in the Prometheus text format.
+
+        Returns
+        -------
+        str
+            The exposition, a failing callback only drops its own sample.
+        """
+        lines = []
+        with self._lock:
+            metrics = [(name, kind, help, list(series)) for name, (kind, help, series) in self._metrics.items()]
+        for name, kind, help, series in metrics:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, collect in series:
+                try:
+                    value = float(collect())
+                except Exception:
+                    continue
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        if self.tracer is not None:
+            lines.extend(self._render_histograms())
+        lines.append("")
+        return "\n".join(lines)
+
+    def _render_histograms(self) -> List[str]:
+        requests = []
+        stages = []
+        for name, histogram in sorted(list(self.tracer.histograms.items())):
+            if name.startswith("txt."):
+                requests.append(({"endpoint": name[len("txt."):]}, histogram))
+            else:
+                stages.append(({"stage": name}, histogram))
+        lines = []
+        for prefix, description, series in (
+            ("cvbot_txt_request", "requests to the TXT controller per endpoint", requests),
+            ("cvbot_stage", "stages of the control loop", stages),
+        ):
+            if not series:
+                continue
+            lines.append(f"# HELP {prefix}_duration_seconds Duration of the {description}.")
+            lines.append(f"# TYPE {prefix}_duration_seconds histogram")
+            for labels, histogram in series:
+                lines.extend(_render_histogram(f"{prefix}_duration_seconds", labels, histogram))
+            lines.append(f"# HELP {prefix}_errors_total Number of failed {description}.")
+            lines.append(f"# TYPE {prefix}_errors_total counter")
+            for labels, histogram in series:
+                lines.append(f"{prefix}_errors_total{_format_labels(labels)} {histogram.errors}")
+        return lines
+
+    def start(self) -> int:
+        """Starts serving on a background thread.
+
+        Returns
+        -------
+        int
+            The port the server listens on.
+        """
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?", 1)[0] != server.path:
+                    self.send_error(404)
+                    return
+                body = server.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", server.CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                # Scrapes are periodic, do not log each of them.
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        self.port = self._server.server_address[1]
+        return self.port
+
+    def stop(self) -> None:
+        """Stops serving."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+            self._thread = None
+
+
+def _render_histogram(name: str, labels: Dict[str, str], histogram: LatencyHistogram) -> List[str]:
+    """Renders a latency histogram with one Prometheus bucket per doubling of the duration."""
+    counts = list(histogram.counts)
+    lines = []
+    cumulative = 0
+    for index, count in enumerate(counts[:-1]):
+        cumulative += count
+        if index % histogram.BUCKETS_PER_OCTAVE == 0:
+            bucket_labels = dict(labels, le=_format_value(histogram.bucket_upper_bound(index)))
+            lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+    total = cumulative + counts[-1]
+    lines.append(f"{name}_bucket{_format_labels(dict(labels, le='+Inf'))} {total}")
+    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.total)}")
+    lines.append(f"{name}_count{_format_labels(labels)} {total}")
+    return lines
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for key, value in labels.items()
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
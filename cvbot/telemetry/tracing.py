@@ -0,0 +1,322 @@
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class LatencyHistogram:
+    """Histogram of durations with logarithmic buckets, cheap enough to record every frame and request.
+
+    The buckets start at 1 microsecond and grow by a factor of 2^(1/4), so percentiles are accurate to about 10%
+    up to several minutes. Recording takes no lock: each stage is usually recorded from a single thread,
+    and a concurrent recording from another thread at worst loses a count, which is irrelevant for the statistics.
+    """
+
+    MIN_DURATION = 1e-6
+    """Upper bound of the first bucket in seconds."""
+
+    BUCKETS_PER_OCTAVE = 4
+    """Number of buckets per doubling of the duration."""
+
+    NUM_BUCKETS = 112
+    """Number of buckets, the last one collects all durations above about 4 minutes."""
+
+    counts: List[int]
+    """Number of recorded durations per bucket."""
+
+    count: int
+    """Number of recorded durations."""
+
+    errors: int
+    """Number of recorded durations which ended with an error."""
+
+    total: float
+    """Sum of the recorded durations in seconds."""
+
+    max: float
+    """Longest recorded duration in seconds."""
+
+    def __init__(self, name: str) -> None:
+        """Initialize an empty histogram.
+
+        Parameters
+        ----------
+        name : str
+            Name of the measured stage, e.g. "detector.infer".
+        """
+        self.name = name
+        self.counts = [0] * self.NUM_BUCKETS
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, duration: float, error: bool = False) -> None:
+        """Records a duration.
+
+        Parameters
+        ----------
+        duration : float
+            The duration in seconds.
+        error : bool, optional
+            Whether the measured operation failed, by default False.
+        """
+        if duration > self.MIN_DURATION:
+            index = min(
+                int(math.log2(duration / self.MIN_DURATION) * self.BUCKETS_PER_OCTAVE) + 1, self.NUM_BUCKETS - 1
+            )
+        else:
+            index = 0
+        self.counts[index] += 1
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        if error:
+            self.errors += 1
+
+    @classmethod
+    def bucket_upper_bound(cls, index: int) -> float:
+        """Returns the upper bound of a bucket in seconds, inf for the last bucket."""
+        if index >= cls.NUM_BUCKETS - 1:
+            return math.inf
+        return cls.MIN_DURATION * 2.0 ** (index / cls.BUCKETS_PER_OCTAVE)
+
+    def percentile(self, q: float) -> float:
+        """Estimates a percentile of the recorded durations.
+
+        Parameters
+        ----------
+        q : float
+            The percentile in [0, 100].
+
+        Returns
+        -------
+        float
+            The estimated duration in seconds, the geometric center of the bucket holding the percentile.
+            NaN if nothing was recorded.
+        """
+        counts = list(self.counts)
+        total = sum(counts)
+        if total == 0:
+            return math.nan
+        rank = q / 100 * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            cumulative += count
+            if cumulative >= rank and count > 0:
+                break
+        if index == 0:
+            return min(self.MIN_DURATION, self.max)
+        center = self.MIN_DURATION * 2.0 ** ((index - 0.5) / self.BUCKETS_PER_OCTAVE)
+        return min(center, self.max)
+
+    def summary(self) -> Dict[str, float]:
+        """Returns count, errors, mean, p50, p95, p99 and max, durations in seconds."""
+        count = self.count
+        return dict(
+            count=count,
+            errors=self.errors,
+            mean=self.total / count if count > 0 else math.nan,
+            p50=self.percentile(50),
+            p95=self.percentile(95),
+            p99=self.percentile(99),
+            max=self.max if count > 0 else math.nan,
+        )
+
+    def reset(self) -> None:
+        """Discards all recorded durations."""
+        self.counts = [0] * self.NUM_BUCKETS
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class Span:
+    """Measures the duration of a with block into a histogram. Exceptions are counted as errors and propagated."""
+
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: LatencyHistogram) -> None:
+        self.histogram = histogram
+        self.start = 0.0
+
+    def __enter__(self) -> "Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        # Cancellation is not a failure of the operation.
+        error = exc_type is not None and issubclass(exc_type, Exception)
+        self.histogram.record(time.perf_counter() - self.start, error)
+
+
+class _NullSpan:
+    """Span of a disabled tracer, measures nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Collects the latency of the stages of the control loop into named histograms.
+
+    Stages are measured with spans, e.g.
+
+    ```python
+    with tracer.span("detector.infer"):
+        output = model(tensor)
+    ```
+
+    or recorded from timestamps, e.g. the glass-to-motor latency from the capture time of a frame
+    until the motors were set. The histograms live in memory, summary returns their percentiles and
+    start_reporting dumps them periodically.
+    """
+
+    histograms: Dict[str, LatencyHistogram]
+    """The histograms by stage name."""
+
+    enabled: bool
+    """Whether spans and recordings are measured."""
+
+    def __init__(self, enabled: bool = True, clock: Callable[[], float] = time.monotonic) -> None:
+        """Initialize the tracer.
+
+        Parameters
+        ----------
+        enabled : bool, optional
+            Whether spans and recordings are measured, by default True.
+        clock : Callable[[], float], optional
+            Clock of the timestamps passed to record_since, by default time.monotonic, the clock of the frame timestamps.
+        """
+        self.histograms = dict()
+        self.enabled = enabled
+        self.clock = clock
+        self._reporter = None
+        self._stop_reporting = threading.Event()
+
+    def histogram(self, name: str) -> LatencyHistogram:
+        """Returns the histogram of a stage, creating it on first use.
+
+        Parameters
+        ----------
+        name : str
+            Name of the stage.
+
+        Returns
+        -------
+        LatencyHistogram
+            The histogram.
+        """
+        histogram = self.histograms.get(name, None)
+        if histogram is None:
+            # setdefault is atomic, concurrent first uses end up with the same histogram.
+            histogram = self.histograms.setdefault(name, LatencyHistogram(name))
+        return histogram
+
+    def span(self, name: str) -> Span:
+        """Returns a context manager measuring the duration of its block into the histogram of a stage.
+
+        Parameters
+        ----------
+        name : str
+            Name of the stage.
+
+        Returns
+        -------
+        Span
+            The span, a no-op if the tracer is disabled.
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self.histogram(name))
+
+    def record(self, name: str, duration: float, error: bool = False) -> None:
+        """Records a duration measured by the caller.
+
+        Parameters
+        ----------
+        name : str
+            Name of the stage.
+        duration : float
+            The duration in seconds.
+        error : bool, optional
+            Whether the measured operation failed, by default False.
+        """
+        if self.enabled:
+            self.histogram(name).record(duration, error)
+
+    def record_since(self, name: str, start: float) -> None:
+        """Records the time elapsed since a timestamp, e.g. the capture time of a frame.
+
+        Parameters
+        ----------
+        name : str
+            Name of the stage.
+        start : float
+            The timestamp in seconds of the clock of the tracer.
+        """
+        if self.enabled:
+            self.histogram(name).record(self.clock() - start)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Returns the summary of each histogram, see LatencyHistogram.summary, ordered by stage name."""
+        return {name: self.histograms[name].summary() for name in sorted(self.histograms)}
+
+    def format_summary(self) -> str:
+        """Formats the summary as a table, durations in milliseconds."""
+        lines = [f"{'stage':<24} {'count':>8} {'errors':>6} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"]
+        for name, stats in self.summary().items():
+            lines.append(
+                f"{name:<24} {stats['count']:>8d} {stats['errors']:>6d}"
+                + "".join(f" {stats[key] * 1000:>8.2f}" for key in ("mean", "p50", "p95", "p99", "max"))
+            )
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        """Discards the recordings of all histograms."""
+        for histogram in list(self.histograms.values()):
+            histogram.reset()
+
+    def start_reporting(self, interval: float = 10.0, output: Callable[[str], None] = print) -> None:
+        """Dumps the summary periodically from a background thread. Does nothing if the tracer is disabled.
+
+        Parameters
+        ----------
+        interval : float, optional
+            Time between two dumps in seconds, by default 10.0.
+        output : Callable[[str], None], optional
+            Receives the formatted summary, by default print.
+        """
+        self.stop_reporting()
+        if not self.enabled:
+            return
+        self._stop_reporting.clear()
+
+        def report() -> None:
+            while not self._stop_reporting.wait(interval):
+                if self.histograms:
+                    output(self.format_summary())
+
+        self._reporter = threading.Thread(target=report, daemon=True)
+        self._reporter.start()
+
+    def stop_reporting(self) -> None:
+        """Stops the periodic dump."""
+        if self._reporter is not None:
+            self._stop_reporting.set()
+            self._reporter.join()
+            self._reporter = None
+
+
+tracer = Tracer()
+"""The tracer of the process, the instrumented components record into it."""
@@ -0,0 +1,422 @@
+import importlib.util
+import os
+from abc import abstractmethod
+from typing import NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from cvbot.config.detector_configuration import DetectorConfiguration
+from cvbot.telemetry.tracing import tracer
+
+
+class Detections(NamedTuple):
+    """Detections of one image, in the same structure for all backends."""
+
+    boxes: np.ndarray
+    """Bounding boxes (x1, y1, x2, y2) in pixels of the input image. Shape (N, 4), dtype float32."""
+
+    scores: np.ndarray
+    """Confidence of each detection. Shape (N,), dtype float32."""
+
+    class_ids: np.ndarray
+    """Class of each detection. Shape (N,), dtype int64."""
+
+    def best(self) -> Optional[int]:
+        """Returns the index of the detection with the highest confidence, None if there are no detections."""
+        if len(self.scores) == 0:
+            return None
+        return int(self.scores.argmax())
+
+
+class Detector:
+    """An object detector, running a YOLO model with an inference backend chosen by the configuration.
+
+    Use create_detector to create the detector for a configuration.
+    """
+
+    def __init__(self, config: DetectorConfiguration) -> None:
+        """Initialize the detector.
+
+        Parameters
+        ----------
+        config : DetectorConfiguration
+            The configuration of the detector.
+        """
+        self.config = config
+
+    @abstractmethod
+    def detect(self, image: np.ndarray) -> Detections:
+        """Detects the objects in an image.
+
+        Parameters
+        ----------
+        image : np.ndarray
+            The image of shape (H,W,3) and dtype uint8, in the channel order of the configuration.
+
+        Returns
+        -------
+        Detections
+            The detections after non-maximum suppression.
+        """
+        pass
+
+    def detect_best(self, image: np.ndarray, class_id: Optional[int] = None) -> Detections:
+        """Detects the object with the highest confidence in an image, e.g. the ball.
+
+        Parameters
+        ----------
+        image : np.ndarray
+            The image of shape (H,W,3) and dtype uint8, in the channel order of the configuration.
+        class_id : Optional[int], optional
+            Only consider detections of this class, by default all classes.
+
+        Returns
+        -------
+        Detections
+            The best detection above the confidence threshold, or no detection.
+        """
+        detections = self.detect(image)
+        if class_id is not None:
+            keep = detections.class_ids == class_id
+            detections = Detections(detections.boxes[keep], detections.scores[keep], detections.class_ids[keep])
+        best = detections.best()
+        index = slice(0, 0) if best is None else slice(best, best + 1)
+        return Detections(detections.boxes[index], detections.scores[index], detections.class_ids[index])
+
+    def close(self) -> None:
+        """Releases the resources of the backend."""
+        pass
+
+
+class UltralyticsDetector(Detector):
+    """Runs the PyTorch model with the ultralytics package."""
+
+    def __init__(self, config: DetectorConfiguration) -> None:
+        super().__init__(config)
+        # Imported on demand, importing ultralytics pulls in the whole torch stack.
+        from ultralytics import YOLO
+
+        if config.num_threads is not None:
+            import torch
+
+            torch.set_num_threads(config.num_threads)
+        self.model = YOLO(config.model_path)
+
+    def detect(self, image: np.ndarray) -> Detections:
+        if self.config.channel_order == "rgb":
+            # ultralytics expects numpy images in BGR order.
+            image = image[..., ::-1]
+        with tracer.span("detector.infer"):
+            result = self.model(
+                image,
+                imgsz=self.config.input_size,
+                conf=self.config.confidence_threshold,
+                iou=self.config.iou_threshold,
+                verbose=False,
+            )[0]
+        return self._to_detections(result.boxes)
+
+    def detect_best(self, image: np.ndarray, class_id: Optional[int] = None) -> Detections:
+        if self.config.channel_order == "rgb":
+            image = image[..., ::-1]
+        with tracer.span("detector.infer"):
+            result = self.model(
+                image,
+                imgsz=self.config.input_size,
+                conf=self.config.confidence_threshold,
+                iou=self.config.iou_threshold,
+                classes=None if class_id is None else [class_id],
+                max_det=1,
+                verbose=False,
+            )[0]
+        return self._to_detections(result.boxes)
+
+    @staticmethod
+    def _to_detections(boxes) -> Detections:
+        return Detections(
+            boxes.xyxy.cpu().numpy().astype(np.float32),
+            boxes.conf.cpu().numpy().astype(np.float32),
+            boxes.cls.cpu().numpy().astype(np.int64),
+        )
+
+
+class ExportedYoloDetector(Detector):
+    """Base of the backends running an exported YOLOv8 model.
+
+    Does the preprocessing (letterbox, channel order, normalization, HWC to CHW) and the postprocessing
+    (confidence threshold, non-maximum suppression, undoing the letterbox) of ultralytics with numpy and OpenCV.
+    """
+
+    input_shape: Tuple[int, int]
+    """Height and width of the model input."""
+
+    input_dtype: np.dtype
+    """Data type of the model input, float32 or float16 for a half precision export."""
+
+    @abstractmethod
+    def infer(self, tensor: np.ndarray) -> np.ndarray:
+        """Runs the model.
+
+        Parameters
+        ----------
+        tensor : np.ndarray
+            The preprocessed input. Shape (1, 3, H, W).
+
+        Returns
+        -------
+        np.ndarray
+            The raw output. Shape (1, 4 + C, N) with the boxes (cx, cy, w, h) and the scores of the C classes.
+        """
+        pass
+
+    def preprocess(self, image: np.ndarray) -> Tuple[np.ndarray, float, Tuple[float, float]]:
+        """Letterboxes and normalizes an image into the model input.
+
+        Works in preallocated buffers: the image is resized into a reused buffer and converted channel by channel
+        into the input tensor, only where the image lands. The padding of the tensor is filled once per image size.
+
+        Parameters
+        ----------
+        image : np.ndarray
+            The image of shape (H,W,3) and dtype uint8, in the channel order of the configuration.
+
+        Returns
+        -------
+        Tuple[np.ndarray, float, Tuple[float, float]]
+            The input tensor, the scale and the (x, y) padding applied to the image.
+            The tensor is reused by the next call.
+        """
+        if image.shape[:2] != self._letterbox_source:
+            self._prepare_letterbox(image.shape[:2])
+        scale, (left, top), (new_width, new_height) = self._letterbox
+        if (new_width, new_height) != (image.shape[1], image.shape[0]):
+            image = cv2.resize(image, (new_width, new_height), dst=self._resized, interpolation=cv2.INTER_LINEAR)
+        tensor = self._tensor
+        # The model takes RGB, swap the channels while converting, instead of converting the image.
+        channels = (2, 1, 0) if self.config.channel_order == "bgr" else (0, 1, 2)
+        for channel, source in enumerate(channels):
+            np.multiply(
+                image[:, :, source], 1 / 255,
+                out=tensor[0, channel, top:top + new_height, left:left + new_width],
+                casting="unsafe",
+            )
+        return tensor, scale, (left, top)
+
+    def _prepare_letterbox(self, image_size: Tuple[int, int]) -> None:
+        """Computes the letterbox of an image size and allocates the buffers of the preprocessing."""
+        height, width = self.input_shape
+        scale = min(height / image_size[0], width / image_size[1])
+        new_width, new_height = round(image_size[1] * scale), round(image_size[0] * scale)
+        top, left = round((height - new_height) / 2 - 0.1), round((width - new_width) / 2 - 0.1)
+        self._letterbox = (scale, (left, top), (new_width, new_height))
+        self._letterbox_source = tuple(image_size)
+        self._resized = np.empty((new_height, new_width, 3), dtype=np.uint8)
+        self._tensor = np.full((1, 3, height, width), 114 / 255, dtype=self.input_dtype)
+
+    def postprocess(
+        self, output: np.ndarray, scale: float, padding: Tuple[float, float], image_shape: Tuple[int, ...]
+    ) -> Detections:
+        """Filters the raw model output and maps the boxes back into the image.
+
+        Parameters
+        ----------
+        output : np.ndarray
+            The raw output of the model. Shape (1, 4 + C, N).
+        scale : float
+            The scale applied by the preprocessing.
+        padding : Tuple[float, float]
+            The (x, y) padding applied by the preprocessing.
+        image_shape : Tuple[int, ...]
+            Shape of the input image.
+
+        Returns
+        -------
+        Detections
+            The detections after non-maximum suppression.
+        """
+        predictions = output[0].T.astype(np.float32)
+        class_scores = predictions[:, 4:]
+        class_ids = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(class_ids)), class_ids]
+        keep = scores >= self.config.confidence_threshold
+        predictions, scores, class_ids = predictions[keep], scores[keep], class_ids[keep]
+
+        boxes = np.empty((len(predictions), 4), dtype=np.float32)
+        boxes[:, :2] = predictions[:, :2] - predictions[:, 2:4] / 2
+        boxes[:, 2:] = predictions[:, :2] + predictions[:, 2:4] / 2
+        if len(boxes) > 0:
+            # Per class suppression, by moving the boxes of each class apart.
+            offsets = class_ids[:, np.newaxis].astype(np.float32) * (max(self.input_shape) + 1)
+            shifted = boxes + offsets
+            xywh = np.concatenate([shifted[:, :2], shifted[:, 2:] - shifted[:, :2]], axis=1)
+            indices = cv2.dnn.NMSBoxes(
+                xywh.tolist(), scores.tolist(), self.config.confidence_threshold, self.config.iou_threshold
+            )
+            indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+            boxes, scores, class_ids = boxes[indices], scores[indices], class_ids[indices]
+
+        boxes[:, [0, 2]] -= padding[0]
+        boxes[:, [1, 3]] -= padding[1]
+        boxes /= scale
+        boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, image_shape[1])
+        boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, image_shape[0])
+        return Detections(boxes, scores.astype(np.float32), class_ids.astype(np.int64))
+
+    def detect(self, image: np.ndarray) -> Detections:
+        with tracer.span("detector.preprocess"):
+            tensor, scale, padding = self.preprocess(image)
+        with tracer.span("detector.infer"):
+            output = self.infer(tensor)
+        with tracer.span("detector.postprocess"):
+            return self.postprocess(output, scale, padding, image.shape)
+
+    def detect_best(self, image: np.ndarray, class_id: Optional[int] = None) -> Detections:
+        """Detects the object with the highest confidence in an image, e.g. the ball.
+
+        Decodes only the top-1 candidate of the raw output. Non-maximum suppression always keeps the candidate
+        with the highest confidence, so the result is the same as the best of detect, without running the suppression.
+
+        Parameters
+        ----------
+        image : np.ndarray
+            The image of shape (H,W,3) and dtype uint8, in the channel order of the configuration.
+        class_id : Optional[int], optional
+            Only consider detections of this class, by default all classes.
+
+        Returns
+        -------
+        Detections
+            The best detection above the confidence threshold, or no detection.
+        """
+        with tracer.span("detector.preprocess"):
+            tensor, scale, padding = self.preprocess(image)
+        with tracer.span("detector.infer"):
+            output = self.infer(tensor)[0]
+        if class_id is not None:
+            scores = output[4 + class_id]
+        elif output.shape[0] == 5:
+            # Single class model.
+            scores = output[4]
+        else:
+            scores = output[4:].max(axis=0)
+        best = int(scores.argmax())
+        score = float(scores[best])
+        if score < self.config.confidence_threshold:
+            return Detections(np.empty((0, 4), np.float32), np.empty(0, np.float32), np.empty(0, np.int64))
+        cx, cy, w, h = output[:4, best].tolist()
+        boxes = np.array(
+            [[
+                min(max((cx - w / 2 - padding[0]) / scale, 0.0), image.shape[1]),
+                min(max((cy - h / 2 - padding[1]) / scale, 0.0), image.shape[0]),
+                min(max((cx + w / 2 - padding[0]) / scale, 0.0), image.shape[1]),
+                min(max((cy + h / 2 - padding[1]) / scale, 0.0), image.shape[0]),
+            ]],
+            dtype=np.float32,
+        )
+        best_class = class_id if class_id is not None else int(output[4:, best].argmax())
+        return Detections(boxes, np.array([score], np.float32), np.array([best_class], np.int64))
+
+    def _resolve_input(self, shape: Tuple, dtype: np.dtype) -> None:
+        height, width = shape[2], shape[3]
+        # Dynamic dimensions are reported as names or None, use the configured size for them.
+        self.input_shape = (
+            height if isinstance(height, int) else self.config.input_size,
+            width if isinstance(width, int) else self.config.input_size,
+        )
+        self.input_dtype = np.dtype(dtype)
+        self._letterbox_source = None
+
+
+class OnnxRuntimeDetector(ExportedYoloDetector):
+    """Runs an ONNX export of the model with ONNX Runtime on the CPU."""
+
+    def __init__(self, config: DetectorConfiguration) -> None:
+        super().__init__(config)
+        # Imported on demand, so only the runtime of the configured backend is loaded.
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError("onnxruntime not found. Is the package installed?") from e
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if config.num_threads is not None:
+            options.intra_op_num_threads = config.num_threads
+        self.session = onnxruntime.InferenceSession(
+            config.model_path, options, providers=["CPUExecutionProvider"]
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self._resolve_input(
+            model_input.shape, np.float16 if model_input.type == "tensor(float16)" else np.float32
+        )
+
+    def infer(self, tensor: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: tensor})[0]
+
+
+class OpenVinoDetector(ExportedYoloDetector):
+    """Runs an ONNX or OpenVINO IR export of the model with OpenVINO on the CPU."""
+
+    def __init__(self, config: DetectorConfiguration) -> None:
+        super().__init__(config)
+        try:
+            from openvino import Core as OpenVinoCore
+        except ImportError as e:
+            raise ImportError("openvino not found. Is the package installed?") from e
+        core = OpenVinoCore()
+        properties = {}
+        if config.num_threads is not None:
+            properties["INFERENCE_NUM_THREADS"] = config.num_threads
+        self.model = core.compile_model(config.model_path, "CPU", properties)
+        model_input = self.model.input(0)
+        shape = [
+            dimension.get_length() if dimension.is_static else None
+            for dimension in model_input.get_partial_shape()
+        ]
+        self._resolve_input(shape, model_input.get_element_type().to_dtype())
+        self.request = self.model.create_infer_request()
+
+    def infer(self, tensor: np.ndarray) -> np.ndarray:
+        return self.request.infer({0: tensor})[self.model.output(0)]
+
+
+def create_detector(config: DetectorConfiguration) -> Detector:
+    """Creates the detector for a configuration.
+
+    Parameters
+    ----------
+    config : DetectorConfiguration
+        The configuration of the detector.
+
+    Returns
+    -------
+    Detector
+        The detector running the configured backend.
+
+    Raises
+    ------
+    ValueError
+        If the backend is unknown.
+    ImportError
+        If the runtime of the backend is not installed.
+    """
+    backend = config.backend
+    if backend == "auto":
+        extension = os.path.splitext(config.model_path)[1].lower()
+        if extension == ".onnx":
+            # Checked without importing, importing a runtime is slow and it may not be the one used.
+            has_onnxruntime = importlib.util.find_spec("onnxruntime") is not None
+            has_openvino = importlib.util.find_spec("openvino") is not None
+            backend = "onnxruntime" if has_onnxruntime or not has_openvino else "openvino"
+        elif extension == ".xml":
+            backend = "openvino"
+        else:
+            backend = "ultralytics"
+    if backend == "ultralytics":
+        return UltralyticsDetector(config)
+    if backend == "onnxruntime":
+        return OnnxRuntimeDetector(config)
+    if backend == "openvino":
+        return OpenVinoDetector(config)
+    raise ValueError(f"Unknown detector backend {config.backend}.")
@@ -0,0 +1,151 @@
+import threading
+import time
+from typing import Any, Callable, Optional
+
+import cv2
+import numpy as np
+
+from cvbot.model.frame import Frame
+from cvbot.telemetry.tracing import tracer
+from cvbot.vision.frame_ring import FrameRing
+
+
+class FrameGrabber:
+    """Captures frames of a cv2.VideoCapture on a background thread into a preallocated FrameRing.
+
+    Frames are read directly into the ring buffers with cap.read(image=buffer), so capturing does not allocate.
+    Readers get read-only views together with a sequence number and the capture time, and can block
+    until a newer frame arrives instead of polling.
+    """
+
+    cap: Any
+    """The cv2.VideoCapture to read from."""
+
+    ring: Optional[FrameRing]
+    """The ring holding the captured frames. Created with the shape of the first frame."""
+
+    dropped: int
+    """Number of frames which were discarded because all buffers were pinned by readers."""
+
+    def __init__(
+        self,
+        cap: Any,
+        ring_size: int = 4,
+        retry_interval: float = 0.01,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize the grabber and start the capture thread.
+
+        Parameters
+        ----------
+        cap : Any
+            The opened cv2.VideoCapture.
+        ring_size : int, optional
+            Number of frame buffers, by default 4.
+        retry_interval : float, optional
+            Time in seconds to wait before retrying after a failed read, by default 0.01.
+        clock : Callable[[], float], optional
+            Clock of the capture timestamps, by default time.monotonic.
+        """
+        self.cap = cap
+        self.clock = clock
+        self.ring = None
+        self.ring_size = ring_size
+        self.retry_interval = retry_interval
+        self.dropped = 0
+        self._ring_ready = threading.Event()
+        # Keep only the newest frame in the driver buffer, if the backend supports it.
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.running = True
+        self.thread = threading.Thread(target=self.update, daemon=True)
+        self.thread.start()
+
+    def update(self) -> None:
+        """Capture loop of the background thread."""
+        while self.running:
+            if self.ring is None:
+                ret, image = self.cap.read()
+                if not ret:
+                    time.sleep(self.retry_interval)
+                    continue
+                timestamp = self.clock()
+                self.ring = FrameRing(image.shape, image.dtype, self.ring_size)
+                np.copyto(self.ring.acquire(), image)
+                self.ring.commit(timestamp)
+                self._ring_ready.set()
+                continue
+
+            buffer = self.ring.acquire()
+            if buffer is None:
+                # All buffers are in use by readers, skip this frame.
+                self.cap.grab()
+                self.dropped += 1
+                continue
+            with tracer.span("capture.read"):
+                ret, image = self.cap.read(image=buffer)
+            if not ret:
+                time.sleep(self.retry_interval)
+                continue
+            timestamp = self.clock()
+            if image is not buffer:
+                # The backend did not decode in place.
+                if image.shape != buffer.shape:
+                    self.dropped += 1
+                    continue
+                np.copyto(buffer, image)
+            self.ring.commit(timestamp)
+        if self.ring is not None:
+            self.ring.close()
+
+    def read(self) -> Optional[np.ndarray]:
+        """Returns the latest frame as read-only view, without copying.
+
+        Returns
+        -------
+        Optional[np.ndarray]
+            The latest frame, None if no frame was captured yet.
+        """
+        frame = self.latest()
+        return frame.image if frame is not None else None
+
+    def latest(self) -> Optional[Frame]:
+        """Returns the latest frame together with its sequence number and capture time.
+
+        Returns
+        -------
+        Optional[Frame]
+            The latest frame, None if no frame was captured yet.
+        """
+        if self.ring is None:
+            return None
+        return self.ring.latest()
+
+    def wait_newer(self, sequence: int = 0, timeout: Optional[float] = None) -> Optional[Frame]:
+        """Blocks until a frame newer than the given sequence number was captured.
+
+        Parameters
+        ----------
+        sequence : int, optional
+            Sequence number of the last frame the reader has seen, by default 0.
+        timeout : Optional[float], optional
+            Maximum time to wait in seconds, by default None (wait forever).
+
+        Returns
+        -------
+        Optional[Frame]
+            The latest frame, None if the timeout expired or the grabber was stopped.
+        """
+        start = time.monotonic()
+        if not self._ring_ready.wait(timeout) or self.ring is None:
+            return None
+        if timeout is not None:
+            timeout = max(0.0, timeout - (time.monotonic() - start))
+        return self.ring.wait_newer(sequence, timeout)
+
+    def stop(self) -> None:
+        """Stops the capture thread and wakes up waiting readers."""
+        self.running = False
+        self.thread.join()
+        self._ring_ready.set()
+        if self.ring is not None:
+            self.ring.close()
@@ -0,0 +1,199 @@
+import pathlib
+import queue
+import threading
+import time
+from typing import Callable, Optional, Union
+
+import cv2
+import numpy as np
+
+
+class FrameRecorder:
+    """Records frames on a background thread, so encoding and disk writes stay off the control loop.
+
+    Frames are passed through a bounded queue. If the writer falls behind, new frames are dropped instead of
+    blocking the caller. The rate can be limited by a maximum frame rate and by keeping only every n-th frame.
+
+    Supported output modes are:
+    - "jpeg": One JPEG file per frame in the output directory.
+    - "video": A single MJPEG encoded AVI file.
+    - "memmap": A memory-mapped .npy frame log of fixed capacity, which is overwritten cyclically.
+      The capture times are stored in a second .npy file next to it.
+    """
+
+    MODES = ("jpeg", "video", "memmap")
+    """Supported output modes."""
+
+    submitted: int
+    """Number of frames passed to submit."""
+
+    recorded: int
+    """Number of frames written to the output."""
+
+    dropped: int
+    """Number of frames discarded because the queue was full."""
+
+    def __init__(
+        self,
+        output: Union[str, pathlib.Path],
+        mode: str = "jpeg",
+        max_fps: Optional[float] = None,
+        keep_every: int = 1,
+        queue_size: int = 4,
+        video_fps: float = 10.0,
+        jpeg_quality: int = 90,
+        memmap_capacity: int = 1000,
+    ) -> None:
+        """Initialize the recorder and start its writer thread.
+
+        Parameters
+        ----------
+        output : Union[str, pathlib.Path]
+            The output directory for "jpeg", the .avi file for "video" or the .npy file for "memmap".
+        mode : str, optional
+            The output mode, one of "jpeg", "video" or "memmap", by default "jpeg".
+        max_fps : Optional[float], optional
+            Maximum number of recorded frames per second, by default None (unlimited).
+        keep_every : int, optional
+            Only every n-th submitted frame is recorded, by default 1.
+        queue_size : int, optional
+            Maximum number of frames waiting to be written, by default 4.
+        video_fps : float, optional
+            Frame rate stored in the video file, by default 10.0.
+        jpeg_quality : int, optional
+            JPEG quality in range 0-100 for "jpeg" and "video", by default 90.
+        memmap_capacity : int, optional
+            Number of frames in the memory-mapped log, by default 1000.
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unsupported recording mode: {mode}. Expected one of {self.MODES}.")
+        if keep_every < 1:
+            raise ValueError("keep_every must be at least 1.")
+        self.output = pathlib.Path(output)
+        self.mode = mode
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.keep_every = keep_every
+        self.video_fps = video_fps
+        self.jpeg_quality = jpeg_quality
+        self.memmap_capacity = memmap_capacity
+
+        self.submitted = 0
+        self.recorded = 0
+        self.dropped = 0
+        self._last_accepted_at = -np.inf
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._video_writer = None
+        self._memmap_frames = None
+        self._memmap_timestamps = None
+
+        if mode == "jpeg":
+            self.output.mkdir(parents=True, exist_ok=True)
+        else:
+            self.output.parent.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(
+        self,
+        frame: np.ndarray,
+        annotate: Optional[Callable[[np.ndarray], None]] = None,
+        timestamp: Optional[float] = None,
+    ) -> bool:
+        """Submits a frame for recording. Never blocks.
+
+        Parameters
+        ----------
+        frame : np.ndarray
+            The BGR frame of shape (H, W, 3). It is copied if accepted, so it may be reused by the caller.
+        annotate : Optional[Callable[[np.ndarray], None]], optional
+            A function drawing onto the copied frame in place, by default None.
+            It is called on the writer thread.
+        timestamp : Optional[float], optional
+            Capture time of the frame in seconds of the monotonic clock, by default the current time.
+
+        Returns
+        -------
+        bool
+            True if the frame was queued for recording, False if it was skipped by the rate policy or dropped.
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        self.submitted += 1
+        if (self.submitted - 1) % self.keep_every != 0:
+            return False
+        if timestamp - self._last_accepted_at < self.min_interval:
+            return False
+        if self._queue.full():
+            self.dropped += 1
+            return False
+        try:
+            self._queue.put_nowait((frame.copy(), annotate, timestamp))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self._last_accepted_at = timestamp
+        return True
+
+    def qsize(self) -> int:
+        """Returns the number of frames waiting to be written."""
+        return self._queue.qsize()
+
+    def close(self) -> None:
+        """Writes the pending frames, stops the writer thread and closes the output."""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(None)
+        self._thread.join()
+
+    def __enter__(self) -> "FrameRecorder":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                image, annotate, timestamp = item
+                if annotate is not None:
+                    annotate(image)
+                self._write(image, timestamp)
+                self.recorded += 1
+        finally:
+            self._release()
+
+    def _write(self, image: np.ndarray, timestamp: float) -> None:
+        if self.mode == "jpeg":
+            filename = self.output / f"detected_{self.recorded:06d}_{int(timestamp * 1000)}.jpg"
+            cv2.imwrite(str(filename), image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        elif self.mode == "video":
+            if self._video_writer is None:
+                height, width = image.shape[:2]
+                self._video_writer = cv2.VideoWriter(
+                    str(self.output), cv2.VideoWriter_fourcc(*"MJPG"), self.video_fps, (width, height))
+                self._video_writer.set(cv2.VIDEOWRITER_PROP_QUALITY, self.jpeg_quality)
+            self._video_writer.write(image)
+        elif self.mode == "memmap":
+            if self._memmap_frames is None:
+                self._memmap_frames = np.lib.format.open_memmap(
+                    self.output, mode="w+", dtype=image.dtype, shape=(self.memmap_capacity,) + image.shape)
+                self._memmap_timestamps = np.lib.format.open_memmap(
+                    self.output.with_name(self.output.stem + "_timestamps.npy"), mode="w+",
+                    dtype=np.float64, shape=(self.memmap_capacity,))
+                self._memmap_timestamps[:] = np.nan
+            index = self.recorded % self.memmap_capacity
+            self._memmap_frames[index] = image
+            self._memmap_timestamps[index] = timestamp
+
+    def _release(self) -> None:
+        if self._video_writer is not None:
+            self._video_writer.release()
+            self._video_writer = None
+        if self._memmap_frames is not None:
+            self._memmap_frames.flush()
+            self._memmap_timestamps.flush()
+            self._memmap_frames = None
+            self._memmap_timestamps = None
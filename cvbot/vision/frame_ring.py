@@ -0,0 +1,221 @@
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from cvbot.model.frame import Frame
+
+
+class FrameRing:
+    """A small ring of preallocated frame buffers, shared between one writer and multiple readers.
+
+    The writer fills a free buffer in place and publishes it, readers get read-only views without copying.
+    A view stays valid until the writer wraps around the ring and reuses its buffer, which happens
+    at the earliest after size - 1 newer frames. Readers which need a frame for longer can pin it,
+    the writer then skips its buffer.
+    """
+
+    size: int
+    """Number of buffers in the ring."""
+
+    _buffers: List[np.ndarray]
+    """The writable buffers."""
+
+    _views: List[np.ndarray]
+    """Read-only views on the buffers, created once."""
+
+    _sequences: List[int]
+    """Sequence number of the frame currently stored in each buffer, 0 if empty."""
+
+    _timestamps: List[float]
+    """Capture time of the frame currently stored in each buffer."""
+
+    _pins: List[int]
+    """Number of readers pinning each buffer."""
+
+    def __init__(self, shape: Tuple[int, ...], dtype: np.dtype = np.uint8, size: int = 4) -> None:
+        """Initialize the ring and allocate its buffers.
+
+        Parameters
+        ----------
+        shape : Tuple[int, ...]
+            Shape of a frame, e.g. (H, W, 3).
+        dtype : np.dtype, optional
+            Data type of a frame, by default np.uint8
+        size : int, optional
+            Number of buffers, by default 4. Must be at least 2, so a buffer can be written while the latest one is read.
+        """
+        if size < 2:
+            raise ValueError("A frame ring needs at least 2 buffers.")
+        self.size = size
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self._buffers = [np.empty(self.shape, self.dtype) for _ in range(size)]
+        self._views = []
+        for buffer in self._buffers:
+            view = buffer.view()
+            view.flags.writeable = False
+            self._views.append(view)
+        self._sequences = [0] * size
+        self._timestamps = [0.0] * size
+        self._pins = [0] * size
+        self._latest_index = -1
+        self._write_index = -1
+        self._sequence = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    @property
+    def sequence(self) -> int:
+        """Sequence number of the latest published frame, 0 if none was published yet."""
+        return self._sequence
+
+    def acquire(self) -> Optional[np.ndarray]:
+        """Returns a writable buffer for the next frame.
+
+        The buffer is only handed out to readers after calling commit.
+
+        Returns
+        -------
+        Optional[np.ndarray]
+            The buffer to write the next frame into.
+            None if every buffer except the latest one is pinned by readers.
+        """
+        with self._condition:
+            for offset in range(1, self.size + 1):
+                index = (self._latest_index + offset) % self.size
+                if index != self._latest_index and self._pins[index] == 0:
+                    self._write_index = index
+                    # Invalidate the old content, so stale views of it are recognized.
+                    self._sequences[index] = 0
+                    return self._buffers[index]
+            self._write_index = -1
+            return None
+
+    def commit(self, timestamp: Optional[float] = None) -> Frame:
+        """Publishes the buffer returned by the last acquire call and wakes up waiting readers.
+
+        Parameters
+        ----------
+        timestamp : Optional[float], optional
+            Capture time of the frame in seconds of the monotonic clock, by default the current time.
+
+        Returns
+        -------
+        Frame
+            The published frame.
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        with self._condition:
+            index = self._write_index
+            if index < 0:
+                raise RuntimeError("No buffer acquired.")
+            self._sequence += 1
+            self._sequences[index] = self._sequence
+            self._timestamps[index] = timestamp
+            self._latest_index = index
+            self._write_index = -1
+            self._condition.notify_all()
+            return Frame(self._views[index], self._sequence, timestamp)
+
+    def latest(self) -> Optional[Frame]:
+        """Returns the latest published frame without waiting.
+
+        Returns
+        -------
+        Optional[Frame]
+            The latest frame, None if no frame was published yet.
+        """
+        with self._condition:
+            return self._latest_frame()
+
+    def wait_newer(self, sequence: int, timeout: Optional[float] = None) -> Optional[Frame]:
+        """Blocks until a frame newer than the given sequence number is published.
+
+        Parameters
+        ----------
+        sequence : int
+            Sequence number of the last frame the reader has seen, 0 for none.
+        timeout : Optional[float], optional
+            Maximum time to wait in seconds, by default None (wait forever).
+
+        Returns
+        -------
+        Optional[Frame]
+            The latest frame, None if the timeout expired or the ring was closed.
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._sequence > sequence or self._closed, timeout):
+                return None
+            if self._sequence <= sequence:
+                return None
+            return self._latest_frame()
+
+    def pin(self, frame: Frame) -> bool:
+        """Prevents the writer from reusing the buffer of the frame, until unpin is called.
+
+        Parameters
+        ----------
+        frame : Frame
+            The frame to pin.
+
+        Returns
+        -------
+        bool
+            True if the frame was pinned, False if its buffer was already reused and the frame content is lost.
+        """
+        with self._condition:
+            index = self._index_of(frame)
+            if index < 0:
+                return False
+            self._pins[index] += 1
+            return True
+
+    def unpin(self, frame: Frame) -> None:
+        """Releases a frame pinned by pin.
+
+        Parameters
+        ----------
+        frame : Frame
+            The pinned frame.
+        """
+        with self._condition:
+            index = self._index_of(frame)
+            if index >= 0 and self._pins[index] > 0:
+                self._pins[index] -= 1
+
+    def is_valid(self, frame: Frame) -> bool:
+        """Checks whether the buffer of the frame still holds the frame.
+
+        Parameters
+        ----------
+        frame : Frame
+            The frame to check.
+
+        Returns
+        -------
+        bool
+            True if the frame content is still available.
+        """
+        with self._condition:
+            return self._index_of(frame) >= 0
+
+    def close(self) -> None:
+        """Wakes up all waiting readers. Further waits return immediately."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def _latest_frame(self) -> Optional[Frame]:
+        index = self._latest_index
+        if index < 0:
+            return None
+        return Frame(self._views[index], self._sequences[index], self._timestamps[index])
+
+    def _index_of(self, frame: Frame) -> int:
+        for index in range(self.size):
+            if self._views[index] is frame.image:
+                return index if self._sequences[index] == frame.sequence else -1
+        return -1
@@ -0,0 +1,238 @@
+import functools
+import threading
+import time
+from typing import Callable, Optional
+
+import cv2
+import numpy as np
+
+from cvbot.model.frame import Frame
+from cvbot.telemetry.tracing import tracer
+from cvbot.vision.frame_ring import FrameRing
+
+try:
+    from turbojpeg import TJPF_RGB, TurboJPEG
+except ImportError:
+    TurboJPEG = None
+
+_REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _load_turbojpeg() -> Optional["TurboJPEG"]:
+    """Returns the shared turbojpeg decoder, None if turbojpeg or its native library is not installed."""
+    if TurboJPEG is None:
+        return None
+    try:
+        return TurboJPEG()
+    except (OSError, RuntimeError):
+        # The native library could not be loaded.
+        return None
+
+
+def _imdecode(buffer: np.ndarray, reduction: int) -> Optional[np.ndarray]:
+    """Decodes to BGR with OpenCV, None if the image could not be decoded."""
+    try:
+        return cv2.imdecode(buffer, _REDUCED_FLAGS[reduction])
+    except cv2.error:
+        return None
+
+
+def decode_jpeg(data: bytes, reduction: int = 1, use_turbojpeg: bool = True) -> Optional[np.ndarray]:
+    """Decodes a JPEG image on the calling thread, e.g. in a worker thread of asyncio.to_thread.
+
+    Stateless, unlike a JpegDecoder it starts no thread and allocates a new image for each call.
+
+    Parameters
+    ----------
+    data : bytes
+        The JPEG encoded image.
+    reduction : int, optional
+        Factor by which the image is scaled down while decoding, 1, 2, 4 or 8, by default 1.
+    use_turbojpeg : bool, optional
+        Whether to use turbojpeg if it is installed, by default True. Otherwise cv2.imdecode is used.
+
+    Returns
+    -------
+    Optional[np.ndarray]
+        The RGB image of shape (H,W,3), None if it could not be decoded.
+
+    Raises
+    ------
+    ValueError
+        If the reduction is not supported.
+    """
+    if reduction not in _REDUCED_FLAGS:
+        raise ValueError(f"reduction must be one of {tuple(_REDUCED_FLAGS)}.")
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    turbojpeg = _load_turbojpeg() if use_turbojpeg else None
+    if turbojpeg is not None:
+        try:
+            return turbojpeg.decode(buffer, pixel_format=TJPF_RGB, scaling_factor=(1, reduction))
+        except (OSError, ValueError):
+            return None
+    image = _imdecode(buffer, reduction)
+    if image is None:
+        return None
+    # Convert in place, without allocating a second image.
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+
+
+class JpegDecoder:
+    """Decodes JPEG images on a background thread into a preallocated FrameRing of RGB frames.
+
+    Submitting an image never blocks. If decoding falls behind, a pending image is replaced by the newer one,
+    so the decoded frames are always the freshest ones and the submitting event loop is never stalled.
+    The libjpeg decoder can scale the image down while decoding, which is much cheaper than a full decode
+    followed by a resize.
+    Uses turbojpeg if it is installed, otherwise cv2.imdecode.
+    """
+
+    ring: Optional[FrameRing]
+    """The ring holding the decoded frames. Created with the shape of the first frame."""
+
+    decoded: int
+    """Number of decoded images."""
+
+    dropped: int
+    """Number of images which were replaced by a newer image before they were decoded."""
+
+    errors: int
+    """Number of images which could not be decoded."""
+
+    def __init__(
+        self,
+        reduction: int = 1,
+        ring_size: int = 4,
+        use_turbojpeg: bool = True,
+        on_frame: Optional[Callable[[Frame], None]] = None,
+    ) -> None:
+        """Initialize the decoder and start the decoding thread.
+
+        Parameters
+        ----------
+        reduction : int, optional
+            Factor by which the images are scaled down while decoding, 1, 2, 4 or 8, by default 1.
+        ring_size : int, optional
+            Number of frame buffers, by default 4.
+        use_turbojpeg : bool, optional
+            Whether to use turbojpeg if it is installed, by default True.
+        on_frame : Optional[Callable[[Frame], None]], optional
+            Called on the decoding thread with each decoded frame, by default None.
+        """
+        if reduction not in _REDUCED_FLAGS:
+            raise ValueError(f"reduction must be one of {tuple(_REDUCED_FLAGS)}.")
+        self.reduction = reduction
+        self.ring = None
+        self.ring_size = ring_size
+        self.on_frame = on_frame
+        self.decoded = 0
+        self.dropped = 0
+        self.errors = 0
+        self._turbojpeg = _load_turbojpeg() if use_turbojpeg else None
+        self._pending = None
+        self._condition = threading.Condition()
+        self.running = True
+        self.thread = threading.Thread(target=self.update, daemon=True)
+        self.thread.start()
+
+    def submit(self, data: bytes, timestamp: Optional[float] = None) -> None:
+        """Queues an image for decoding, replacing a pending one. Does not block.
+
+        Parameters
+        ----------
+        data : bytes
+            The JPEG encoded image.
+        timestamp : Optional[float], optional
+            Capture time of the image in seconds of the monotonic clock, by default now.
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        with self._condition:
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = (data, timestamp)
+            self._condition.notify()
+
+    def decode(self, data: bytes) -> Optional[np.ndarray]:
+        """Decodes an image on the calling thread, with the reduction and library of the decoder. See decode_jpeg.
+
+        Parameters
+        ----------
+        data : bytes
+            The JPEG encoded image.
+
+        Returns
+        -------
+        Optional[np.ndarray]
+            The RGB image of shape (H,W,3), None if it could not be decoded.
+        """
+        return decode_jpeg(data, self.reduction, use_turbojpeg=self._turbojpeg is not None)
+
+    def update(self) -> None:
+        """Decoding loop of the background thread."""
+        while True:
+            with self._condition:
+                while self.running and self._pending is None:
+                    self._condition.wait()
+                if not self.running:
+                    break
+                data, timestamp = self._pending
+                self._pending = None
+            with tracer.span("camera.decode"):
+                frame = self._decode_into_ring(data, timestamp)
+            if frame is not None and self.on_frame is not None:
+                self.on_frame(frame)
+        if self.ring is not None:
+            self.ring.close()
+
+    def _decode_into_ring(self, data: bytes, timestamp: float) -> Optional[Frame]:
+        if self._turbojpeg is not None:
+            image = self.decode(data)
+        else:
+            # Decode to BGR and convert into the ring buffer, avoiding a second copy.
+            image = _imdecode(np.frombuffer(data, dtype=np.uint8), self.reduction)
+        if image is None:
+            self.errors += 1
+            return None
+        if self.ring is None:
+            self.ring = FrameRing(image.shape, image.dtype, self.ring_size)
+        elif image.shape != self.ring.shape:
+            # The resolution changed, the ring is kept, so frames held by readers stay valid.
+            self.errors += 1
+            return None
+        buffer = self.ring.acquire()
+        if buffer is None:
+            # All buffers are in use by readers, skip this frame.
+            self.dropped += 1
+            return None
+        if self._turbojpeg is not None:
+            np.copyto(buffer, image)
+        else:
+            cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=buffer)
+        self.decoded += 1
+        return self.ring.commit(timestamp)
+
+    def latest(self) -> Optional[Frame]:
+        """Returns the latest decoded frame.
+
+        Returns
+        -------
+        Optional[Frame]
+            The latest frame, None if no frame was decoded yet.
+        """
+        if self.ring is None:
+            return None
+        return self.ring.latest()
+
+    def close(self) -> None:
+        """Stops the decoding thread, pending images are discarded."""
+        with self._condition:
+            self.running = False
+            self._condition.notify()
+        self.thread.join()
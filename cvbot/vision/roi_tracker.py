@@ -0,0 +1,229 @@
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+from cvbot.vision.detector import Detections, Detector
+
+
+class ConstantVelocityPredictor:
+    """Predicts the box of a moving object, assuming it moves with constant velocity in the image.
+
+    An alpha-beta filter: position and velocity of the box center are corrected by fixed gains
+    with each measurement, the box size is smoothed.
+    """
+
+    center: Optional[np.ndarray]
+    """Estimated center (x, y) of the box in pixels, None before the first measurement."""
+
+    velocity: np.ndarray
+    """Estimated velocity (vx, vy) of the center in pixels per second."""
+
+    size: np.ndarray
+    """Estimated size (w, h) of the box in pixels."""
+
+    def __init__(self, alpha: float = 0.85, beta: float = 0.3) -> None:
+        """Initialize the predictor.
+
+        Parameters
+        ----------
+        alpha : float, optional
+            Gain of the position correction in [0, 1], by default 0.85. 1 to follow the measurements exactly.
+        beta : float, optional
+            Gain of the velocity correction in [0, 1], by default 0.3.
+        """
+        self.alpha = alpha
+        self.beta = beta
+        self.reset()
+
+    def reset(self) -> None:
+        """Forgets the tracked object."""
+        self.center = None
+        self.velocity = np.zeros(2, dtype=np.float64)
+        self.size = np.zeros(2, dtype=np.float64)
+        self.timestamp = 0.0
+
+    def update(self, box: np.ndarray, timestamp: float) -> None:
+        """Corrects the estimate with a measured box.
+
+        Parameters
+        ----------
+        box : np.ndarray
+            The measured box (x1, y1, x2, y2) in pixels.
+        timestamp : float
+            Capture time of the measurement in seconds.
+        """
+        center = np.array([(box[0] + box[2]) / 2, (box[1] + box[3]) / 2], dtype=np.float64)
+        size = np.array([box[2] - box[0], box[3] - box[1]], dtype=np.float64)
+        if self.center is None:
+            self.center = center
+            self.size = size
+            self.timestamp = timestamp
+            return
+        dt = timestamp - self.timestamp
+        predicted = self.center + self.velocity * dt
+        residual = center - predicted
+        self.center = predicted + self.alpha * residual
+        if dt > 0.0:
+            self.velocity = self.velocity + self.beta * residual / dt
+        self.size = self.size + self.alpha * (size - self.size)
+        self.timestamp = timestamp
+
+    def predict(self, timestamp: float) -> Optional[np.ndarray]:
+        """Predicts the box at the given time.
+
+        Parameters
+        ----------
+        timestamp : float
+            The time in seconds.
+
+        Returns
+        -------
+        Optional[np.ndarray]
+            The predicted box (x1, y1, x2, y2) in pixels, None if no object is tracked.
+        """
+        if self.center is None:
+            return None
+        center = self.center + self.velocity * (timestamp - self.timestamp)
+        half = self.size / 2
+        return np.concatenate([center - half, center + half])
+
+
+class RoiTracker:
+    """Tracks the best detection of a detector by running it on a crop around the predicted position.
+
+    The crop is letterboxed to the model input like a full frame, so a distant ball is seen at a larger scale
+    and far fewer pixels have to be processed. The tracker falls back to the full frame after a number of
+    consecutive misses, and periodically to re-acquire the object if the tracking locked onto a wrong one.
+    """
+
+    full_frame_runs: int
+    """Number of detections on the full frame."""
+
+    roi_runs: int
+    """Number of detections on a crop."""
+
+    misses: int
+    """Number of consecutive detections on a crop, which did not find the object."""
+
+    on_crop: bool
+    """Whether the last detection ran on a crop. A miss on a crop is followed by more crops or a full frame search,
+    only a miss on the full frame means the object is lost."""
+
+    def __init__(
+        self,
+        detector: Detector,
+        crop_scale: float = 3.0,
+        min_crop_size: int = 96,
+        crop_step: int = 32,
+        max_misses: int = 3,
+        redetect_interval: Optional[int] = 30,
+        class_id: Optional[int] = None,
+    ) -> None:
+        """Initialize the tracker.
+
+        Parameters
+        ----------
+        detector : Detector
+            The detector to run.
+        crop_scale : float, optional
+            Side length of the square crop relative to the larger side of the predicted box, by default 3.0.
+        min_crop_size : int, optional
+            Minimal side length of the crop in pixels, by default 96.
+        crop_step : int, optional
+            The side length of the crop is rounded up to a multiple of this step, by default 32.
+            Keeps the number of distinct crop sizes, and so the reallocations of the detector buffers, small.
+        max_misses : int, optional
+            Number of consecutive misses on a crop after which the full frame is searched, by default 3.
+        redetect_interval : Optional[int], optional
+            Number of frames after which the full frame is searched again, by default 30. None to never.
+        class_id : Optional[int], optional
+            Only track detections of this class, by default all classes.
+        """
+        self.detector = detector
+        self.crop_scale = crop_scale
+        self.min_crop_size = min_crop_size
+        self.crop_step = crop_step
+        self.max_misses = max_misses
+        self.redetect_interval = redetect_interval
+        self.class_id = class_id
+        self.predictor = ConstantVelocityPredictor()
+        self.full_frame_runs = 0
+        self.roi_runs = 0
+        self.misses = 0
+        self.on_crop = False
+        self._frames_since_full_frame = 0
+
+    @property
+    def tracking(self) -> bool:
+        """Whether the next detection runs on a crop."""
+        if self.predictor.center is None or self.misses >= self.max_misses:
+            return False
+        return self.redetect_interval is None or self._frames_since_full_frame < self.redetect_interval
+
+    def reset(self) -> None:
+        """Forgets the tracked object, the next detection runs on the full frame."""
+        self.predictor.reset()
+        self.misses = 0
+
+    def detect(self, image: np.ndarray, timestamp: float) -> Detections:
+        """Detects the object in an image, on a crop around its predicted position while it is tracked.
+
+        Parameters
+        ----------
+        image : np.ndarray
+            The image of shape (H,W,3) and dtype uint8, in the channel order of the detector configuration.
+        timestamp : float
+            Capture time of the image in seconds.
+
+        Returns
+        -------
+        Detections
+            The best detection in pixels of the full image, or no detection. on_crop tells where it ran.
+        """
+        self.on_crop = self.tracking
+        if self.on_crop:
+            left, top, side = self.crop(self.predictor.predict(timestamp), image.shape)
+            detections = self.detector.detect_best(image[top:top + side, left:left + side], self.class_id)
+            self.roi_runs += 1
+            self._frames_since_full_frame += 1
+            if len(detections.scores) == 0:
+                self.misses += 1
+                return detections
+            detections.boxes[:, [0, 2]] += left
+            detections.boxes[:, [1, 3]] += top
+        else:
+            detections = self.detector.detect_best(image, self.class_id)
+            self.full_frame_runs += 1
+            self._frames_since_full_frame = 0
+            if len(detections.scores) == 0:
+                self.reset()
+                return detections
+        self.misses = 0
+        self.predictor.update(detections.boxes[0], timestamp)
+        return detections
+
+    def crop(self, box: np.ndarray, image_shape: Tuple[int, ...]) -> Tuple[int, int, int]:
+        """Computes the square crop around a box.
+
+        Parameters
+        ----------
+        box : np.ndarray
+            The box (x1, y1, x2, y2) in pixels.
+        image_shape : Tuple[int, ...]
+            Shape of the image.
+
+        Returns
+        -------
+        Tuple[int, int, int]
+            Left and top corner and side length of the crop, which lies completely within the image.
+        """
+        height, width = image_shape[:2]
+        side = max(box[2] - box[0], box[3] - box[1]) * self.crop_scale
+        side = max(self.min_crop_size, int(math.ceil(side / self.crop_step)) * self.crop_step)
+        side = min(side, height, width)
+        center_x, center_y = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+        # Shift the crop into the image instead of clipping it, so it keeps its size.
+        left = int(min(max(round(center_x - side / 2), 0), width - side))
+        top = int(min(max(round(center_y - side / 2), 0), height - side))
+        return left, top, side
@@ -1,18 +1,23 @@
 import asyncio
-import numpy as np
 from cvbot.communication.txtapiclient import TxtApiClient
 from cvbot.controller.easy_drive_controller import EasyDriveController
+from cvbot.config.detector_configuration import DetectorConfiguration
 from cvbot.config.drive_robot_configuration import DriveRobotConfiguration
+from cvbot.pipeline.ball_tracking import PipelineMeters, create_detection_queue, run_ball_tracking
+from cvbot.telemetry.metrics_server import MetricsServer
+from cvbot.telemetry.tracing import tracer
+from cvbot.vision.detector import create_detector
+from cvbot.vision.frame_grabber import FrameGrabber
+from cvbot.vision.frame_recorder import FrameRecorder
+from cvbot.vision.roi_tracker import RoiTracker
 
 from dotenv import load_dotenv
 import os
 import cv2
-from ultralytics import YOLO
 
 import warnings
 import pathlib
 import time
-import threading
 
 # Suppress specific Pydantic warning
 warnings.filterwarnings(
@@ -28,14 +33,23 @@ HOST = os.getenv("HOST")
 PORT = os.getenv("PORT")
 KEY = os.getenv("KEY")
 
-# Load the YOLO model
+# Load the YOLO model, e.g. MODEL=best.onnx to run the ONNX export with ONNX Runtime
 try:
     print("Loading model...")
-    model = YOLO('best.pt')
+    detector = create_detector(DetectorConfiguration(
+        model_path=os.getenv("MODEL", "best.pt"),
+        backend=os.getenv("DETECTOR_BACKEND", "auto"),
+    ))
 except Exception as e:
     print(f"Error loading model: {e}")
     exit()
 
+# Once the ball is found, run the detector on a crop around its predicted position.
+tracker = RoiTracker(detector)
+
+# Rates of the pipeline stages, exported by the metrics endpoint.
+meters = PipelineMeters()
+
 # Initialize camera
 print("Connecting to camera...")
 cap = cv2.VideoCapture(0)
@@ -50,53 +64,6 @@ cap.set(cv2.CAP_PROP_FRAME_WIDTH, 320)
 cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 240)
 
 
-class FrameGrabber:
-    def __init__(self, cap):
-        self.cap = cap
-        self.frame = None
-        self.lock = threading.Lock()
-        self.running = True
-        self.thread = threading.Thread(target=self.update, daemon=True)
-        self.thread.start()
-
-    def update(self):
-        while self.running:
-            ret, frame = self.cap.read()
-            if not ret:
-                continue
-            # Lock and update latest frame
-            with self.lock:
-                self.frame = frame
-            # Flush out any other frames in buffer to keep latest only
-            while self.cap.grab():
-                ret2, frame2 = self.cap.retrieve()
-                if ret2:
-                    with self.lock:
-                        self.frame = frame2
-
-    def read(self):
-        with self.lock:
-            return self.frame.copy() if self.frame is not None else None
-
-    def stop(self):
-        self.running = False
-        self.thread.join()
-
-
-def detect_ball_center(frame):
-    results = model(frame)
-    boxes = results[0].boxes
-
-    if boxes is not None and len(boxes) > 0:
-        confidences = boxes.conf
-        max_conf_idx = confidences.argmax().item()
-        best_box = boxes.xyxy[max_conf_idx]
-        x1, y1, x2, y2 = map(int, best_box.tolist())
-        return True, (x1, y1, x2, y2)
-
-    return False, (0, 0, 0, 0)
-
-
 async def listen_for_quit(stop_event):
     while not stop_event.is_set():
         key = await asyncio.to_thread(input, "Press 'q' to quit: ")
@@ -104,9 +71,37 @@ async def listen_for_quit(stop_event):
             stop_event.set()
 
 
+def create_metrics_server(port, controller, frame_grabber, detections, recorder):
+    """Registers the rates, drops and queue depths of the pipeline, latencies come from the tracer."""
+    metrics = MetricsServer(port, tracer=tracer)
+    metrics.gauge("cvbot_loop_rate_hz", "Control loop iterations per second.", lambda: meters.loop.rate)
+    metrics.gauge("cvbot_inference_rate_hz", "Frames run through the detector per second.", lambda: meters.inference.rate)
+    metrics.gauge("cvbot_detection_rate_hz", "Frames with a detected ball per second.", lambda: meters.detection.rate)
+    metrics.counter("cvbot_loop_iterations_total", "Control loop iterations.", lambda: meters.loop.count)
+    metrics.counter("cvbot_detections_total", "Frames with a detected ball.", lambda: meters.detection.count)
+    metrics.counter("cvbot_frames_captured_total", "Frames captured by the camera.",
+                    lambda: frame_grabber.ring.sequence if frame_grabber.ring is not None else 0)
+    metrics.counter("cvbot_frames_inferred_total", "Frames run through the detector.", lambda: meters.inference.count)
+    metrics.counter("cvbot_dropped_frames_total", "Frames dropped by a pipeline stage.",
+                    lambda: frame_grabber.dropped, labels={"stage": "capture"})
+    metrics.counter("cvbot_dropped_frames_total", "Frames dropped by a pipeline stage.",
+                    lambda: detections.dropped, labels={"stage": "actuation"})
+    metrics.counter("cvbot_dropped_frames_total", "Frames dropped by a pipeline stage.",
+                    lambda: recorder.dropped, labels={"stage": "recorder"})
+    metrics.counter("cvbot_dropped_commands_total", "Drive commands superseded or expired before execution.",
+                    lambda: controller.dropped_commands)
+    metrics.gauge("cvbot_queue_depth", "Items waiting in the queue of a pipeline stage.",
+                  detections.qsize, labels={"stage": "actuation"})
+    metrics.gauge("cvbot_queue_depth", "Items waiting in the queue of a pipeline stage.",
+                  recorder.qsize, labels={"stage": "recorder"})
+    return metrics
+
+
 async def connect():
+    # Annotated detections are written into one MJPEG video per run, limited to 10 fps.
     detected_dir = pathlib.Path("detected")
-    detected_dir.mkdir(exist_ok=True)
+    recorder = FrameRecorder(detected_dir / f"detected_{int(time.time() * 1000)}.avi", mode="video",
+                             max_fps=10.0, video_fps=10.0)
 
     stop_event = asyncio.Event()
     quit_task = asyncio.create_task(listen_for_quit(stop_event))
@@ -114,110 +109,47 @@ async def connect():
     try:
         print("Initializing API client and controller")
         api_client = TxtApiClient(HOST, PORT, KEY)
-        controller = EasyDriveController(api_client, DriveRobotConfiguration())
+        # Drive commands not executed within this time after they were issued are dropped.
+        max_command_age = float(os.getenv("MAX_COMMAND_AGE", "0.25"))
+        controller = EasyDriveController(api_client, DriveRobotConfiguration(), max_command_age=max_command_age)
         await api_client.initialize()
         await controller.stop()
     except Exception as e:
         print(f"Error initializing API client or controller: {e}")
         exit()
 
-    frame_grabber = FrameGrabber(cap)
+    # One more buffer than the default, frames stay pinned from inference until the actuation stage is done.
+    frame_grabber = FrameGrabber(cap, ring_size=5)
 
-    # PID controller params for left/right control
-    Kp = 100.0
-    Ki = 0.0
-    Kd = 20.0
-    integral = 0.0
-    last_error = 0.0
-    dt = 0.1  # approx loop interval in seconds
+    # Optionally dump the latency of each stage periodically, e.g. TRACE_INTERVAL=10 to dump every 10 seconds.
+    trace_interval = float(os.getenv("TRACE_INTERVAL", "0"))
+    if trace_interval > 0:
+        tracer.start_reporting(trace_interval)
 
-    forward_speed = 40.0  # forward speed value, adjust as needed
+    # Capture, inference and actuation run concurrently, linked by the grabber's frame ring and a latest-value queue.
+    detections = create_detection_queue(frame_grabber)
 
-    while not stop_event.is_set():
-        frame = frame_grabber.read()
-        if frame is None:
-            await asyncio.sleep(0.01)
-            continue
-
-        detected, box = detect_ball_center(frame)
-
-        if detected:
-            x1, y1, x2, y2 = box
-            center_x = (x1 + x2) / 2
-            frame_height, frame_width = frame.shape[:2]
-            bbox_height = y2 - y1
-
-            error = (center_x / frame_width) - 0.5  # error from center line (-0.5 to 0.5)
-
-            # PID calculations
-            integral += error * dt
-            derivative = (error - last_error) / dt
-            output = Kp * error + Ki * integral + Kd * derivative
-            last_error = error
-
-            # Clamp output to speed limits (e.g., -100 to 100)
-            max_speed = 100.0
-            output = max(min(output, max_speed), -max_speed)
-
-            # Decide forward speed based on bbox height
-            # Move forward if bbox height < 80% frame height
-            if bbox_height < 0.8 * frame_height:
-                forward = forward_speed
-            elif bbox_height > 0.9 * frame_height:
-                forward = - forward_speed
-            # # elif 0.77 * frame_height > bbox_height > 0.88 * frame_height:  # Slow down if close
-            # #     forward = 0.0
-            # else:  # stop forward movement if close enough
-                forward = 0.0
-
-            print(f"Error: {error:.3f}, PID output: {output:.1f}, Forward speed: {forward:.1f}")
-
-            # Draw bbox and center for display
-            annotated_frame = frame.copy()
-            cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            cv2.circle(annotated_frame, (int(center_x), int((y1 + y2) / 2)), 5, (0, 0, 255), -1)
-            text = f"Error: {error:.3f}, PID: {output:.1f}, Fwd: {forward:.1f}"
-            cv2.putText(annotated_frame, text, (x1, y1 - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-
-            # Save annotated frame
-            filename = detected_dir / f"detected_{int(time.time() * 1000)}.jpg"
-            cv2.imwrite(str(filename), annotated_frame)
-
-            try:
-                if forward_speed == 0.0:
-                    # Command robot: speeds = [forward/backward, left/right, rotation]
-                    await controller.drive(speeds=np.array([forward, output, 0.0]))
-                elif forward > 0.0:
-                    await controller.drive(speeds=np.array([0.0, 0.0, -100.0]))
-                elif forward < 0.0:
-                    await controller.drive(speeds=np.array([0.0, 0.0, 0.0]))
-                # elif 0.77 * frame_height > bbox_height > 0.88 * frame_height:  # Slow down if close
-                #     await controller.drive(speeds=np.array([0.0, 0.0, 0.0]))
-            except Exception as e:
-                print(f"Error during drive control: {e}")
-                await controller.stop()
-                continue
-
-        else:
-            # No detection: show frame and search by slowly moving left
-            try:
-                await controller.drive(speeds=np.array([0.0, 50.0, 0.0]))
-                await asyncio.sleep(0.5)
-                await controller.stop()
-                await asyncio.sleep(0.5)
-            except Exception as e:
-                print(f"Error during search drive: {e}")
-                continue
-
-        await asyncio.sleep(dt)
-
-    stop_event.set()
-    quit_task.cancel()
-    frame_grabber.stop()
-    await controller.stop()
-    cap.release()
-    cv2.destroyAllWindows()
+    # Optionally serve metrics for the fleet dashboards, e.g. METRICS_PORT=9100, scraped at /metrics.
+    metrics_port = os.getenv("METRICS_PORT")
+    metrics = None
+    if metrics_port:
+        metrics = create_metrics_server(int(metrics_port), controller, frame_grabber, detections, recorder)
+        print(f"Serving metrics on port {metrics.start()}")
+
+    # Runs until the user quits or a stage dies, and stops the robot either way.
+    try:
+        await run_ball_tracking(controller, frame_grabber, tracker, detections, stop_event, meters, recorder)
+    finally:
+        quit_task.cancel()
+        if metrics is not None:
+            metrics.stop()
+        tracer.stop_reporting()
+        print(tracer.format_summary())
+        frame_grabber.stop()
+        recorder.close()
+        await api_client.close()
+        cap.release()
+        cv2.destroyAllWindows()
 
 
 asyncio.run(connect())
@@ -0,0 +1,72 @@
+from typing import Dict, Hashable, Optional
+
+from cvbot.communication.controller import Controller
+from cvbot.model.counter_motor import CounterMotor
+from cvbot.model.device import Device
+from cvbot.model.servomotor import Servomotor
+
+
+class IndexedController(Controller):
+    """Controller without communication, the api id of a named device is its name in lower case."""
+
+    def get_api_id(self, device: Device) -> Optional[Hashable]:
+        name = getattr(device, "name", None)
+        return name.lower() if name is not None else None
+
+    async def discover_devices(self) -> Dict[int, Device]:
+        return dict()
+
+
+def test_devices_are_found_by_name_and_api_id():
+    control = IndexedController()
+    motor = CounterMotor(id=control.allocate_id(), name="M1")
+    servomotor = Servomotor(id=control.allocate_id(), name="S1")
+    control.add_devices(motor, servomotor)
+
+    assert control.get_device_by_name("M1") is motor
+    assert control.get_device_by_api_id("s1") is servomotor
+    assert control.get_device_by_name("M2") is None
+    assert control.get_devices_by_type(Servomotor) == [servomotor]
+
+    control.remove_devices(motor)
+    assert control.get_device_by_name("M1") is None
+    assert control.get_device_by_api_id("m1") is None
+    assert control.get_device_by_name("S1") is servomotor
+
+
+def test_replacing_a_device_updates_the_indexes():
+    control = IndexedController()
+    old = CounterMotor(id=0, name="M1")
+    control.add_devices(old)
+    new = CounterMotor(id=0, name="M2")
+    control.add_devices(new)
+
+    assert control.get_device_by_name("M1") is None
+    assert control.get_device_by_name("M2") is new
+    assert control.get_device_by_api_id("m2") is new
+    assert control.get_devices_by_type(CounterMotor) == [new]
+
+
+def test_removing_a_device_keeps_another_device_with_the_same_name():
+    control = IndexedController()
+    first = CounterMotor(id=0, name="M1")
+    control.add_devices(first)
+    second = CounterMotor(id=1, name="M1")
+    control.add_devices(second)
+    control.remove_devices(first)
+    assert control.get_device_by_name("M1") is second
+
+
+def test_allocated_ids_are_monotonic_and_never_reused():
+    control = IndexedController()
+    first = control.allocate_id()
+    second = control.allocate_id()
+    assert second > first
+
+    device = CounterMotor(id=10, name="M1")
+    control.add_devices(device)
+    assert control.allocate_id() == 11
+    control.remove_devices(device)
+    assert control.allocate_id() == 12
+    assert control.allocate_id(min_id=20) == 20
+    assert control.allocate_id(min_id=5) == 21
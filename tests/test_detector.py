@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from cvbot.config.detector_configuration import DetectorConfiguration
+from cvbot.vision.detector import ExportedYoloDetector
+
+
+class ScriptedDetector(ExportedYoloDetector):
+    """Exported model with a 64x64 input, whose raw output is scripted."""
+
+    def __init__(self, output: np.ndarray, **kwargs) -> None:
+        super().__init__(DetectorConfiguration(**kwargs))
+        self._resolve_input((1, 3, 64, 64), np.float32)
+        self.output = output
+        self.inputs = []
+
+    def infer(self, tensor: np.ndarray) -> np.ndarray:
+        self.inputs.append(tensor.copy())
+        return self.output
+
+
+def candidates(*rows) -> np.ndarray:
+    """Raw output (1, 4 + C, N) from rows (cx, cy, w, h, score of class 0, score of class 1) in model input pixels."""
+    return np.array(rows, dtype=np.float32).T[np.newaxis]
+
+
+OUTPUT = candidates(
+    (20, 30, 10, 10, 0.9, 0.0),
+    # Overlaps the first candidate of the same class, removed by the suppression.
+    (21, 30, 10, 10, 0.8, 0.1),
+    (50, 40, 8, 8, 0.0, 0.7),
+    (40, 40, 8, 8, 0.1, 0.05),
+)
+
+# A 64x32 image is letterboxed into the input without scaling, with 16 pixels of padding at the top.
+IMAGE = np.full((32, 64, 3), 255, dtype=np.uint8)
+
+
+def test_preprocess_letterboxes_and_normalizes():
+    image = IMAGE.copy()
+    image[..., 0] = 0
+    detector = ScriptedDetector(OUTPUT, channel_order="bgr")
+    tensor, scale, padding = detector.preprocess(image)
+    assert tensor.shape == (1, 3, 64, 64)
+    assert (scale, padding) == (1.0, (0, 16))
+    assert tensor[0, :, :16].flatten() == pytest.approx(114 / 255)
+    # The blue channel of the BGR image is the last channel of the RGB input.
+    assert tensor[0, 2, 16:48] == pytest.approx(0.0)
+    assert tensor[0, 0, 16:48] == pytest.approx(1.0)
+
+
+def test_postprocess_suppresses_and_maps_back_into_the_image():
+    detections = ScriptedDetector(OUTPUT).detect(IMAGE)
+    assert detections.boxes.tolist() == [[15, 9, 25, 19], [46, 20, 54, 28]]
+    assert detections.scores == pytest.approx([0.9, 0.7])
+    assert detections.class_ids.tolist() == [0, 1]
+
+
+def test_detect_best_decodes_the_best_candidate():
+    detector = ScriptedDetector(OUTPUT)
+    best = detector.detect_best(IMAGE)
+    detections = detector.detect(IMAGE)
+    assert best.boxes.tolist() == detections.boxes[:1].tolist()
+    assert best.scores.tolist() == detections.scores[:1].tolist()
+    assert best.class_ids.tolist() == [0]
+
+    of_class = detector.detect_best(IMAGE, class_id=1)
+    assert of_class.boxes.tolist() == [[46, 20, 54, 28]]
+    assert of_class.class_ids.tolist() == [1]
+
+
+def test_detect_best_below_the_threshold_is_empty():
+    detections = ScriptedDetector(OUTPUT, confidence_threshold=0.95).detect_best(IMAGE)
+    assert detections.best() is None
+    assert detections.boxes.shape == (0, 4)
+
+
+def test_boxes_are_clipped_to_the_image():
+    detections = ScriptedDetector(candidates((2, 18, 10, 10, 0.9, 0.0))).detect_best(IMAGE)
+    assert detections.boxes.tolist() == [[0, 0, 7, 7]]
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from cvbot.controller.drive_command_scheduler import DriveCommandScheduler
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_executes_command():
+    executed = []
+
+    async def execute(command):
+        executed.append(command)
+
+    async def run():
+        scheduler = DriveCommandScheduler(execute)
+        assert await scheduler.submit((1.0, 0.0, 0.0))
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert executed == [(1.0, 0.0, 0.0)]
+    assert scheduler.completed == 1
+    assert scheduler.dropped == 0
+
+
+def test_newer_command_supersedes_pending_and_in_flight():
+    executed = []
+
+    async def execute(command):
+        await asyncio.sleep(0.05)
+        executed.append(command)
+
+    async def run():
+        scheduler = DriveCommandScheduler(execute, max_age=None)
+        results = await asyncio.gather(scheduler.submit("a"), scheduler.submit("b"), scheduler.submit("c"))
+        return scheduler, results
+
+    scheduler, results = asyncio.run(run())
+    assert results == [False, False, True]
+    assert executed == ["c"]
+    assert scheduler.superseded == 2
+    assert scheduler.completed == 1
+
+
+def test_expired_command_is_dropped():
+    clock = FakeClock()
+    executed = []
+
+    async def execute(command):
+        executed.append(command)
+
+    async def run():
+        scheduler = DriveCommandScheduler(execute, max_age=0.25, clock=clock)
+        # Submitted with a deadline which already passed.
+        return scheduler, await scheduler.submit("late", deadline=-1.0)
+
+    scheduler, applied = asyncio.run(run())
+    assert not applied
+    assert executed == []
+    assert scheduler.expired == 1
+
+
+def test_slow_command_is_cancelled_at_deadline():
+    async def execute(command):
+        await asyncio.sleep(1.0)
+
+    async def run():
+        scheduler = DriveCommandScheduler(execute, max_age=0.02)
+        return scheduler, await scheduler.submit("slow")
+
+    scheduler, applied = asyncio.run(run())
+    assert not applied
+    assert scheduler.expired == 1
+
+
+def test_exception_is_propagated():
+    async def execute(command):
+        raise RuntimeError("controller unreachable")
+
+    async def run():
+        scheduler = DriveCommandScheduler(execute)
+        await scheduler.submit("a")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run())
@@ -0,0 +1,83 @@
+import threading
+
+import numpy as np
+import pytest
+
+from cvbot.vision.frame_ring import FrameRing
+
+
+def publish(ring: FrameRing, value: int, timestamp: float = 0.0):
+    buffer = ring.acquire()
+    assert buffer is not None
+    buffer[:] = value
+    return ring.commit(timestamp)
+
+
+def test_frames_are_read_only_views_in_sequence():
+    ring = FrameRing((2, 2), size=3)
+    assert ring.latest() is None
+    first = publish(ring, 1, timestamp=0.5)
+    second = publish(ring, 2)
+    assert (first.sequence, second.sequence) == (1, 2)
+    assert ring.sequence == 2
+    latest = ring.latest()
+    assert latest.sequence == 2
+    assert latest.timestamp == 0.0
+    assert np.all(latest.image == 2)
+    assert not latest.image.flags.writeable
+    assert first.timestamp == 0.5
+
+
+def test_buffer_is_reused_after_wrap_around():
+    ring = FrameRing((1,), size=2)
+    first = publish(ring, 1)
+    publish(ring, 2)
+    assert ring.is_valid(first)
+    publish(ring, 3)
+    assert not ring.is_valid(first)
+
+
+def test_pinned_frame_is_not_overwritten():
+    ring = FrameRing((1,), size=2)
+    first = publish(ring, 1)
+    assert ring.pin(first)
+    publish(ring, 2)
+    # The only other buffer holds the latest frame, so there is no free buffer.
+    assert ring.acquire() is None
+    ring.unpin(first)
+    publish(ring, 3)
+    assert not ring.is_valid(first)
+
+
+def test_overwritten_frame_cannot_be_pinned():
+    ring = FrameRing((1,), size=2)
+    first = publish(ring, 1)
+    publish(ring, 2)
+    publish(ring, 3)
+    assert not ring.pin(first)
+
+
+def test_wait_newer():
+    ring = FrameRing((1,), size=3)
+    publish(ring, 1)
+    assert ring.wait_newer(0, timeout=0.0).sequence == 1
+    assert ring.wait_newer(1, timeout=0.01) is None
+
+    timer = threading.Timer(0.02, publish, args=(ring, 2))
+    timer.start()
+    frame = ring.wait_newer(1, timeout=5.0)
+    timer.join()
+    assert frame.sequence == 2
+
+
+def test_close_wakes_up_readers():
+    ring = FrameRing((1,), size=2)
+    timer = threading.Timer(0.02, ring.close)
+    timer.start()
+    assert ring.wait_newer(0, timeout=5.0) is None
+    timer.join()
+
+
+def test_size_must_allow_reading_while_writing():
+    with pytest.raises(ValueError):
+        FrameRing((1,), size=1)
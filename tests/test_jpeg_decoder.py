@@ -0,0 +1,63 @@
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from cvbot.vision.jpeg_decoder import JpegDecoder, decode_jpeg
+
+
+def encode(width: int = 64, height: int = 48) -> bytes:
+    """A JPEG image, red in RGB, e.g. as sent by the camera."""
+    image = np.zeros((height, width, 3), dtype=np.uint8)
+    image[..., 2] = 255
+    ok, data = cv2.imencode(".jpg", image)
+    assert ok
+    return data.tobytes()
+
+
+@pytest.mark.parametrize("reduction", [1, 2, 4, 8])
+def test_decode_with_opencv_reduces_and_converts_to_rgb(reduction):
+    image = decode_jpeg(encode(), reduction, use_turbojpeg=False)
+    assert image.shape == (48 // reduction, 64 // reduction, 3)
+    assert image[..., 0].min() > 240
+    assert image[..., 2].max() < 15
+
+
+def test_decode_invalid_data():
+    assert decode_jpeg(b"no jpeg", use_turbojpeg=False) is None
+    with pytest.raises(ValueError):
+        decode_jpeg(encode(), reduction=3)
+
+
+def test_decoder_decodes_on_its_thread_into_the_ring():
+    decoded = threading.Event()
+    frames = []
+
+    def on_frame(frame):
+        frames.append(frame)
+        decoded.set()
+
+    decoder = JpegDecoder(reduction=2, use_turbojpeg=False, on_frame=on_frame)
+    try:
+        assert decoder.decode(encode()).shape == (24, 32, 3)
+        decoder.submit(b"no jpeg", timestamp=1.0)
+        decoder.submit(encode(), timestamp=2.0)
+        assert decoded.wait(5.0)
+        frame = decoder.latest()
+        assert frames == [frame]
+        assert frame.timestamp == 2.0
+        assert frame.image.shape == (24, 32, 3)
+        assert not frame.image.flags.writeable
+        assert frame.image[..., 0].min() > 240
+        # The invalid image was either replaced before decoding or failed to decode.
+        assert decoder.dropped + decoder.errors == 1
+        assert decoder.decoded == 1
+    finally:
+        decoder.close()
+    assert not decoder.thread.is_alive()
+
+
+def test_decoder_rejects_unsupported_reduction():
+    with pytest.raises(ValueError):
+        JpegDecoder(reduction=3)
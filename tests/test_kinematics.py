@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from cvbot.config.drive_robot_configuration import DriveRobotConfiguration
+
+
+def test_body_to_wheel_round_trip():
+    config = DriveRobotConfiguration()
+    velocities = np.array([[0.1, 0.0, 0.0], [0.0, 0.2, 0.0], [0.0, 0.0, 0.5], [0.05, -0.1, 0.3]])
+    wheel_speeds = config.body_to_wheel_speeds(velocities, saturate=False)
+    assert wheel_speeds.shape == (4, 4)
+    np.testing.assert_allclose(config.wheel_to_body_speeds(wheel_speeds), velocities, atol=1e-5)
+
+
+def test_single_velocity_matches_kinematic_matrix():
+    config = DriveRobotConfiguration()
+    velocity = np.array([0.0, 0.1, 0.2])
+    np.testing.assert_allclose(
+        config.body_to_wheel_speeds(velocity, saturate=False), config.kinematic_matrix @ velocity, rtol=1e-6
+    )
+
+
+def test_inverse_is_pseudo_inverse():
+    config = DriveRobotConfiguration()
+    np.testing.assert_allclose(
+        config.inverse_kinematic_matrix @ config.kinematic_matrix, np.eye(3), atol=1e-5
+    )
+
+
+def test_saturation_keeps_direction():
+    config = DriveRobotConfiguration()
+    velocity = np.array([0.0, 10.0, 1.0])
+    unsaturated = config.body_to_wheel_speeds(velocity, saturate=False)
+    saturated = config.body_to_wheel_speeds(velocity)
+    assert np.abs(saturated).max() == pytest.approx(config.max_motor_speed)
+    np.testing.assert_allclose(saturated / np.abs(saturated).max(), unsaturated / np.abs(unsaturated).max(), rtol=1e-5)
+    slow = np.array([0.0, 0.01, 0.0])
+    np.testing.assert_allclose(config.body_to_wheel_speeds(slow), config.body_to_wheel_speeds(slow, saturate=False))
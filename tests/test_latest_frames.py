@@ -0,0 +1,86 @@
+import asyncio
+from typing import Dict, List
+
+import numpy as np
+
+from cvbot.communication.controller import Controller
+from cvbot.config.drive_robot_configuration import DriveRobotConfiguration
+from cvbot.controller.easy_drive_controller import EasyDriveController
+from cvbot.model.camera import Camera
+from cvbot.model.device import Device
+from cvbot.model.frame import Frame
+
+
+class ScriptedCamera(Controller):
+    """Controller whose camera yields scripted frames, and drops scripted numbers of images before numbering them."""
+
+    def __init__(self, sequences: List[int], unnumbered: List[int]) -> None:
+        super().__init__()
+        self.sequences = sequences
+        self.unnumbered = unnumbered
+        self._dropped = 0
+        self.add_devices(Camera(id=0, width=4, height=2, fps=30))
+
+    async def discover_devices(self) -> Dict[int, Device]:
+        return dict()
+
+    async def open_camera_frames(self, camera, reduction=1):
+        for sequence, unnumbered in zip(self.sequences, self.unnumbered):
+            self._dropped = unnumbered
+            yield Frame(np.zeros((2, 4, 3), dtype=np.uint8), sequence, float(sequence))
+
+    @property
+    def dropped_camera_frames(self) -> int:
+        return self._dropped
+
+
+async def collect(control: Controller) -> tuple:
+    drive = EasyDriveController(control, DriveRobotConfiguration())
+    sequences = [frame.sequence async for frame in drive.latest_frames()]
+    return sequences, drive.dropped_frames
+
+
+def test_gaps_in_the_sequence_are_counted_as_dropped():
+    sequences, dropped = asyncio.run(collect(ScriptedCamera([1, 2, 5, 6, 9], [0] * 5)))
+    assert sequences == [1, 2, 5, 6, 9]
+    assert dropped == 4
+
+
+def test_frames_dropped_before_numbering_are_counted():
+    sequences, dropped = asyncio.run(collect(ScriptedCamera([1, 2, 3, 5], [0, 2, 2, 3])))
+    assert sequences == [1, 2, 3, 5]
+    assert dropped == 1 + 2 + 1
+
+
+class SlowConsumerCamera(Controller):
+    """Controller with the default open_camera_frames over a camera producing images faster than they are read."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.add_devices(Camera(id=0, width=4, height=2, fps=30))
+
+    async def discover_devices(self) -> Dict[int, Device]:
+        return dict()
+
+    async def open_camera(self, camera):
+        for value in range(10):
+            yield np.full((2, 4, 3), value, dtype=np.uint8)
+            await asyncio.sleep(0)
+
+
+def test_default_stream_skips_to_the_newest_image():
+    async def run():
+        drive = EasyDriveController(SlowConsumerCamera(), DriveRobotConfiguration())
+        frames = []
+        async for frame in drive.latest_frames():
+            frames.append(frame)
+            # Busy consumer, the camera delivers several images meanwhile.
+            for _ in range(3):
+                await asyncio.sleep(0)
+        return frames, drive.dropped_frames
+
+    frames, dropped = asyncio.run(run())
+    assert frames[-1].image[0, 0, 0] == 9
+    assert frames[-1].sequence == 10
+    assert len(frames) < 10
+    assert dropped == 10 - len(frames)
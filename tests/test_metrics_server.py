@@ -0,0 +1,71 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+from cvbot.telemetry.metrics_server import MetricsServer, RateMeter
+from cvbot.telemetry.tracing import Tracer
+
+
+def test_render_gauges_and_counters():
+    server = MetricsServer()
+    server.gauge("cvbot_loop_rate_hz", "Loop rate.", lambda: 29.5)
+    server.counter("cvbot_dropped_frames_total", "Dropped frames.", lambda: 3, labels={"stage": "capture"})
+    server.counter("cvbot_dropped_frames_total", "Dropped frames.", lambda: 1 / 0, labels={"stage": "failing"})
+    lines = server.render().splitlines()
+    assert "# TYPE cvbot_loop_rate_hz gauge" in lines
+    assert "cvbot_loop_rate_hz 29.5" in lines
+    assert "# TYPE cvbot_dropped_frames_total counter" in lines
+    assert 'cvbot_dropped_frames_total{stage="capture"} 3.0' in lines
+    # A failing callback only drops its own sample.
+    assert not any('stage="failing"' in line for line in lines)
+
+
+def test_metric_type_conflict():
+    server = MetricsServer()
+    server.gauge("cvbot_value", "A value.", lambda: 1)
+    with pytest.raises(ValueError):
+        server.counter("cvbot_value", "A value.", lambda: 1)
+
+
+def test_render_histograms():
+    tracer = Tracer()
+    tracer.record("txt.motor", 0.002)
+    tracer.record("txt.motor", 0.004, error=True)
+    tracer.record("detector.infer", 0.02)
+    lines = MetricsServer(tracer=tracer).render().splitlines()
+    assert 'cvbot_txt_request_duration_seconds_count{endpoint="motor"} 2' in lines
+    assert 'cvbot_txt_request_duration_seconds_bucket{endpoint="motor",le="+Inf"} 2' in lines
+    assert 'cvbot_txt_request_errors_total{endpoint="motor"} 1' in lines
+    assert 'cvbot_stage_duration_seconds_count{stage="detector.infer"} 1' in lines
+    buckets = [
+        int(line.rsplit(" ", 1)[1]) for line in lines
+        if line.startswith('cvbot_stage_duration_seconds_bucket{stage="detector.infer"')
+    ]
+    assert buckets == sorted(buckets)
+
+
+def test_serves_metrics():
+    server = MetricsServer(port=0, host="127.0.0.1")
+    server.gauge("cvbot_loop_rate_hz", "Loop rate.", lambda: 1.0)
+    port = server.start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"] == MetricsServer.CONTENT_TYPE
+            assert "cvbot_loop_rate_hz 1.0" in response.read().decode()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/other", timeout=5)
+    finally:
+        server.stop()
+
+
+def test_rate_meter():
+    now = [0.0]
+    meter = RateMeter(window=1.0, clock=lambda: now[0])
+    for _ in range(8):
+        now[0] += 0.125
+        meter.tick()
+    assert meter.count == 8
+    assert meter.rate == pytest.approx(8.0)
+    now[0] += 5.0
+    assert meter.rate == 0.0
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from cvbot.communication.motor_command_coalescer import MotorCommandCoalescer
+
+
+async def settle() -> None:
+    """Lets the submitted tasks and the flush task run until they block."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class FakeLink:
+    """Records the sent batches, each send blocks until released."""
+
+    def __init__(self) -> None:
+        self.batches = []
+        self.release = asyncio.Event()
+        self.error = None
+
+    async def send(self, batch) -> None:
+        self.batches.append(dict(batch))
+        await self.release.wait()
+        self.release.clear()
+        if self.error is not None:
+            raise self.error
+
+
+def test_setpoints_submitted_during_a_send_share_the_next_batch():
+    async def run():
+        link = FakeLink()
+        coalescer = MotorCommandCoalescer(link.send)
+        first = asyncio.create_task(coalescer.submit({"M1": 10}))
+        await settle()
+        assert link.batches == [{"M1": 10}]
+
+        second = asyncio.create_task(coalescer.submit({"M1": 20, "M2": 5}))
+        third = asyncio.create_task(coalescer.submit({"M1": 30}))
+        await settle()
+        assert not first.done()
+
+        link.release.set()
+        await first
+        await settle()
+        # The latest setpoint per motor wins, the others keep their order of submission.
+        assert link.batches == [{"M1": 10}, {"M1": 30, "M2": 5}]
+        assert list(link.batches[1]) == ["M1", "M2"]
+        assert coalescer.superseded == 1
+
+        link.release.set()
+        await asyncio.gather(second, third)
+        assert coalescer.batches == 2
+
+    asyncio.run(run())
+
+
+def test_send_errors_reach_all_callers_of_the_batch():
+    async def run():
+        link = FakeLink()
+        coalescer = MotorCommandCoalescer(link.send)
+        link.error = RuntimeError("Connection lost.")
+        callers = [asyncio.create_task(coalescer.submit({name: 1})) for name in ("M1", "M2")]
+        await settle()
+        link.release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        assert [type(result) for result in results] == [RuntimeError, RuntimeError]
+        assert link.batches == [{"M1": 1, "M2": 1}]
+
+        link.error = None
+        link.release.set()
+        await coalescer.submit({"M1": 2})
+        assert link.batches[-1] == {"M1": 2}
+
+    asyncio.run(run())
+
+
+def test_cancelled_caller_does_not_cancel_the_batch():
+    async def run():
+        link = FakeLink()
+        coalescer = MotorCommandCoalescer(link.send)
+        cancelled = asyncio.create_task(coalescer.submit({"M1": 1}))
+        waiting = asyncio.create_task(coalescer.submit({"M2": 1}))
+        await settle()
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        link.release.set()
+        await waiting
+        assert link.batches == [{"M1": 1, "M2": 1}]
+
+    asyncio.run(run())
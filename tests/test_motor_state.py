@@ -0,0 +1,52 @@
+from typing import Dict
+
+from cvbot.communication.controller import Controller
+from cvbot.model.counter_motor import CounterMotor
+from cvbot.model.device import Device
+from cvbot.model.motor_state import MotorState
+
+
+class LocalController(Controller):
+    async def discover_devices(self) -> Dict[int, Device]:
+        return dict()
+
+
+def test_state_is_initialized_from_and_synced_to_the_model():
+    motor = CounterMotor(id=3, name="M1", speed=10.0, count=5, recorded_at=1.0, last_count=2, last_recorded_at=0.5)
+    state = MotorState.from_motor(motor)
+    assert (state.device_id, state.name, state.speed, state.count) == (3, "M1", 10.0, 5)
+    assert (state.last_count, state.recorded_at, state.last_recorded_at) == (2, 1.0, 0.5)
+
+    state.speed = -20.0
+    state.record_count(11, 2.0)
+    assert motor.speed == 10.0
+    assert motor.count == 5
+
+    state.sync_to(motor)
+    assert motor.speed == -20.0
+    assert (motor.count, motor.recorded_at, motor.last_count, motor.last_recorded_at) == (11, 2.0, 5, 1.0)
+
+
+def test_velocity_matches_the_model():
+    motor = CounterMotor(id=0, name="M1", count=0, recorded_at=0.0, last_count=0, last_recorded_at=0.0)
+    state = MotorState.from_motor(motor)
+    assert state.velocity == 0.0
+    state.record_count(2, 1.0)
+    state.record_count(5, 1.5)
+    assert state.velocity == 360.0
+    assert state.sync_to(motor).velocity == state.velocity
+
+
+def test_controller_keeps_the_runtime_state_apart_from_the_model():
+    control = LocalController()
+    motor = CounterMotor(id=0, name="M1")
+    control.add_devices(motor)
+    control.get_motor_state(motor).speed = 50.0
+    assert motor.speed == 0.0
+    assert control.sync_devices() == [motor]
+    assert motor.speed == 50.0
+
+    # The state of a removed motor is written back into its model.
+    control.get_motor_state(motor).speed = 70.0
+    control.remove_devices(motor)
+    assert motor.speed == 70.0
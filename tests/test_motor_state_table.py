@@ -0,0 +1,58 @@
+from typing import Dict
+
+import numpy as np
+
+from cvbot.communication.controller import Controller
+from cvbot.model.counter_motor import CounterMotor
+from cvbot.model.device import Device
+from cvbot.model.motor_state_table import MotorStateTable
+
+
+class LocalController(Controller):
+    async def discover_devices(self) -> Dict[int, Device]:
+        return dict()
+
+
+def test_velocities_of_all_rows():
+    table = MotorStateTable(["M1", "M2", "M3"], [0, 1, 2])
+    table.record_counts(np.arange(3), np.array([0, 0, 0]), 1.0)
+    table.record_counts(np.array([0, 1]), np.array([10, -5]), 1.5)
+    assert table.index("M2") == 1
+    assert table.counts.tolist() == [10, -5, 0]
+    # Rows recorded only once or at the same time have no velocity.
+    assert table.velocities.tolist() == [1200.0, -600.0, 0.0]
+
+
+def test_motor_order_sets_the_rows_and_keeps_the_state():
+    control = LocalController()
+    motors = [CounterMotor(id=index, name=name) for index, name in enumerate(["M1", "M2", "M3", "M4"])]
+    control.add_devices(*motors)
+    for index, motor in enumerate(motors):
+        control.get_motor_state(motor).speed = index
+
+    version = control.devices_version
+    control.set_motor_order("M3", "M1")
+    table = control.motor_table
+    assert control.devices_version > version
+    assert table.names == ("M3", "M1", "M2", "M4")
+    assert table.device_ids.tolist() == [2, 0, 1, 3]
+    assert table.speeds.tolist() == [2.0, 0.0, 1.0, 3.0]
+
+    # The states are views on the rows of the table.
+    table.speeds[:2] = [30.0, 10.0]
+    assert control.get_motor_state(motors[2]).speed == 30.0
+    assert control.get_motor_state(motors[0]).row == 1
+    control.get_motor_state(motors[3]).speed = 40.0
+    assert table.speeds[3] == 40.0
+
+
+def test_table_is_rebuilt_when_devices_change():
+    control = LocalController()
+    first = CounterMotor(id=0, name="M1")
+    control.add_devices(first)
+    control.get_motor_state(first).record_count(7, 1.0)
+    old_table = control.motor_table
+    control.add_devices(CounterMotor(id=1, name="M2"))
+    assert control.motor_table is not old_table
+    assert control.motor_table.names == ("M1", "M2")
+    assert control.get_motor_state(first).count == 7
@@ -0,0 +1,60 @@
+import math
+
+import pytest
+
+from cvbot.controller.pid_controller import PIDController
+
+
+def test_first_update_is_proportional_only():
+    pid = PIDController(kp=2.0, ki=1.0, kd=1.0)
+    assert pid.update(0.25, setpoint=0.5, now=0.0) == pytest.approx(0.5)
+    assert pid.integral == 0.0
+
+
+def test_integral_and_derivative_use_elapsed_time():
+    pid = PIDController(kp=0.0, ki=1.0, kd=1.0)
+    pid.update(0.0, setpoint=1.0, now=0.0)
+    # Error 1 for 0.5 s, measurement rose by 0.5 in 0.5 s.
+    output = pid.update(0.5, setpoint=1.0, now=0.5)
+    assert pid.integral == pytest.approx(0.25)
+    assert pid.derivative == pytest.approx(-1.0)
+    assert output == pytest.approx(0.25 - 1.0)
+
+
+def test_time_step_is_capped():
+    pid = PIDController(kp=0.0, ki=1.0, max_dt=0.5)
+    pid.update(0.0, setpoint=1.0, now=0.0)
+    pid.update(0.0, setpoint=1.0, now=10.0)
+    assert pid.integral == pytest.approx(0.5)
+
+
+def test_output_is_clamped_without_windup():
+    pid = PIDController(kp=10.0, ki=1.0, output_limits=(-1.0, 1.0))
+    for step in range(10):
+        assert pid.update(0.0, setpoint=1.0, now=step * 0.1) == 1.0
+    # Saturated in the direction of the error, the integral must not grow.
+    assert pid.integral == 0.0
+
+
+def test_integral_limits():
+    pid = PIDController(kp=0.0, ki=1.0, integral_limits=(-0.2, 0.2))
+    for step in range(10):
+        pid.update(0.0, setpoint=1.0, now=step * 0.1)
+    assert pid.integral == pytest.approx(0.2)
+
+
+def test_reset_forgets_state():
+    pid = PIDController(kp=1.0, ki=1.0, kd=1.0)
+    pid.update(0.0, setpoint=1.0, now=0.0)
+    pid.update(0.5, setpoint=1.0, now=0.1)
+    pid.reset()
+    assert pid.integral == 0.0
+    assert pid.derivative == 0.0
+    # The next update is again a first update, without a derivative kick.
+    assert pid.update(0.0, setpoint=1.0, now=5.0) == pytest.approx(1.0)
+
+
+def test_invalid_output_limits():
+    with pytest.raises(ValueError):
+        PIDController(kp=1.0, output_limits=(1.0, -1.0))
+    assert math.isinf(PIDController(kp=1.0).output_max)
@@ -0,0 +1,41 @@
+import asyncio
+import math
+
+import pytest
+
+from cvbot.model.camera import Camera
+from cvbot.model.counter_motor import CounterMotor
+from cvbot.simulation.robot_simulator import RobotSimulator, benchmark_ball_tracking
+
+
+def test_only_the_camera_can_be_streamed():
+    async def run():
+        simulator = RobotSimulator()
+        await simulator.initialize()
+        camera = simulator.get_devices_by_type(Camera)[0]
+        stream = simulator.open_sensor(camera)
+        image = await stream.__anext__()
+        await stream.aclose()
+        assert image.shape == (240, 320, 3)
+
+        motor = simulator.get_devices_by_type(CounterMotor)[0]
+        with pytest.raises(ValueError, match="CounterMotor"):
+            await simulator.open_sensor(motor).__anext__()
+
+    asyncio.run(run())
+
+
+def test_benchmark_detects_a_ball_in_view(capsys):
+    simulator = RobotSimulator(ball=(0.3, 1.5), time_scale=8.0, motor_speed_scale=0.05)
+    result = asyncio.run(benchmark_ball_tracking(simulator, duration=1.0))
+    assert result["elapsed"] >= 1.0
+    assert result["first_detection_time"] < 0.5
+    assert 0.0 < result["detection_ratio"] <= 1.0
+    assert result["loop_rate"] > 0.0
+
+
+def test_benchmark_without_a_ball_in_view(capsys):
+    simulator = RobotSimulator(ball=(0.0, -2.0), time_scale=8.0, motor_speed_scale=0.05)
+    result = asyncio.run(benchmark_ball_tracking(simulator, duration=0.5))
+    assert math.isnan(result["first_detection_time"])
+    assert result["detection_ratio"] == 0.0
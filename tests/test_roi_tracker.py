@@ -0,0 +1,142 @@
+import asyncio
+from typing import List, Optional
+
+import numpy as np
+import pytest
+
+from cvbot.config.detector_configuration import DetectorConfiguration
+from cvbot.model.frame import Frame
+from cvbot.pipeline.ball_tracking import PipelineMeters, inference_stage
+from cvbot.vision.detector import Detections, Detector
+from cvbot.vision.frame_ring import FrameRing
+from cvbot.vision.roi_tracker import RoiTracker
+
+HEIGHT, WIDTH = 240, 320
+
+
+class BrightPixelDetector(Detector):
+    """Detects the bounding box of the non-zero pixels, and records the shapes of the images it ran on."""
+
+    def __init__(self) -> None:
+        super().__init__(DetectorConfiguration())
+        self.shapes = []
+
+    def detect(self, image: np.ndarray) -> Detections:
+        self.shapes.append(image.shape[:2])
+        ys, xs = np.nonzero(image[..., 0])
+        if len(xs) == 0:
+            return Detections(np.empty((0, 4), np.float32), np.empty(0, np.float32), np.empty(0, np.int64))
+        box = [xs.min(), ys.min(), xs.max() + 1, ys.max() + 1]
+        return Detections(np.array([box], np.float32), np.array([0.9], np.float32), np.array([0], np.int64))
+
+
+def ball_image(x: Optional[int] = 150, y: int = 100, size: int = 20) -> np.ndarray:
+    """An image with a square ball at (x, y), or an empty image if x is None."""
+    image = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    if x is not None:
+        image[y:y + size, x:x + size] = 255
+    return image
+
+
+def test_tracked_ball_is_detected_on_a_crop_in_image_coordinates():
+    detector = BrightPixelDetector()
+    tracker = RoiTracker(detector, min_crop_size=96)
+    assert not tracker.tracking
+    tracker.detect(ball_image(150), 0.0)
+    assert not tracker.on_crop
+    assert tracker.tracking
+
+    detections = tracker.detect(ball_image(152), 0.1)
+    assert tracker.on_crop
+    assert detector.shapes == [(HEIGHT, WIDTH), (96, 96)]
+    assert detections.boxes.tolist() == [[152, 100, 172, 120]]
+    assert (tracker.full_frame_runs, tracker.roi_runs) == (1, 1)
+
+
+def test_full_frame_search_after_max_misses():
+    detector = BrightPixelDetector()
+    tracker = RoiTracker(detector, max_misses=2, redetect_interval=None)
+    tracker.detect(ball_image(), 0.0)
+
+    tracker.detect(ball_image(None), 0.1)
+    assert tracker.on_crop and tracker.misses == 1 and tracker.tracking
+    # The last miss still ran on a crop, so it does not mean the ball is lost.
+    tracker.detect(ball_image(None), 0.2)
+    assert tracker.on_crop and tracker.misses == 2 and not tracker.tracking
+
+    tracker.detect(ball_image(None), 0.3)
+    assert not tracker.on_crop
+    assert detector.shapes[-1] == (HEIGHT, WIDTH)
+    # A miss on the full frame forgets the ball.
+    assert tracker.predictor.center is None
+    assert tracker.misses == 0
+    assert not tracker.tracking
+
+
+def test_periodic_full_frame_search():
+    detector = BrightPixelDetector()
+    tracker = RoiTracker(detector, redetect_interval=2)
+    tracker.detect(ball_image(), 0.0)
+    tracker.detect(ball_image(), 0.1)
+    assert tracker.on_crop
+    tracker.detect(ball_image(None), 0.2)
+    assert tracker.on_crop and not tracker.tracking
+
+    tracker.detect(ball_image(), 0.3)
+    assert not tracker.on_crop
+    assert tracker.tracking
+    assert (tracker.full_frame_runs, tracker.roi_runs) == (2, 2)
+
+
+def test_crop_lies_within_the_image():
+    tracker = RoiTracker(BrightPixelDetector(), crop_scale=3.0, min_crop_size=64, crop_step=32)
+    assert tracker.crop(np.array([300, 5, 320, 35]), (HEIGHT, WIDTH, 3)) == (224, 0, 96)
+    assert tracker.crop(np.array([0, 0, 200, 200]), (HEIGHT, WIDTH, 3)) == (0, 0, 240)
+
+
+class ScriptedGrabber:
+    """Publishes the next image of a script into a frame ring whenever the inference stage waits for a frame."""
+
+    def __init__(self, images: List[np.ndarray]) -> None:
+        self.ring = FrameRing((HEIGHT, WIDTH, 3), np.uint8)
+        self.images = list(images)
+        self.done = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+
+    def wait_newer(self, sequence: int, timeout: Optional[float] = None) -> Optional[Frame]:
+        if not self.images:
+            self.loop.call_soon_threadsafe(self.done.set)
+            return None
+        np.copyto(self.ring.acquire(), self.images.pop(0))
+        return self.ring.commit(float(sequence))
+
+
+class RecordingQueue:
+    def __init__(self, grabber: ScriptedGrabber) -> None:
+        self.grabber = grabber
+        self.items = []
+
+    def put_nowait(self, item) -> None:
+        frame, detected, box = item
+        self.items.append(detected)
+        self.grabber.ring.unpin(frame)
+
+
+@pytest.mark.parametrize("redetect_interval", [None, 2])
+def test_inference_stage_passes_on_only_full_frame_misses(redetect_interval):
+    async def run():
+        tracker = RoiTracker(BrightPixelDetector(), max_misses=2, redetect_interval=redetect_interval)
+        # Full frame hit, two crop misses, full frame miss, full frame hit, crop hit.
+        images = [ball_image(), ball_image(None), ball_image(None), ball_image(None), ball_image(), ball_image()]
+        grabber = ScriptedGrabber(images)
+        detections = RecordingQueue(grabber)
+        stop_event = asyncio.Event()
+        stage = asyncio.create_task(inference_stage(tracker, grabber, detections, stop_event, PipelineMeters()))
+        await grabber.done.wait()
+        stop_event.set()
+        await stage
+        return tracker, detections.items
+
+    tracker, items = asyncio.run(run())
+    assert (tracker.full_frame_runs, tracker.roi_runs) == (3, 3)
+    assert items == [True, False, True, True]
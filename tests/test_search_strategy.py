@@ -0,0 +1,63 @@
+import pytest
+
+from cvbot.controller.search_strategy import SearchStrategy
+
+
+def test_pulse_alternates_moving_and_pausing():
+    search = SearchStrategy("pulse", speeds=(0.0, 50.0, 0.0), move_duration=0.5, pause_duration=0.25)
+    assert not search.searching
+    assert search.command(10.0) == (0.0, 50.0, 0.0)
+    assert search.searching
+    assert search.searches == 1
+    assert search.command(10.4) == (0.0, 50.0, 0.0)
+    assert search.command(10.5) == (0.0, 0.0, 0.0)
+    assert search.command(10.75) == (0.0, 50.0, 0.0)
+
+
+def test_phases_which_ended_meanwhile_are_skipped():
+    search = SearchStrategy("rotate", speeds=(0.0, 0.0, 30.0), move_duration=1.0, pause_duration=1.0)
+    search.command(0.0)
+    # Move 0-1, pause 1-2, move 2-3, pause 3-4.
+    assert search.command(3.5) == (0.0, 0.0, 0.0)
+    assert search.command(4.0) == (0.0, 0.0, 30.0)
+
+
+def test_sweep_turns_back_and_forth_with_growing_duration():
+    search = SearchStrategy("sweep", speeds=(0.0, 0.0, 40.0), move_duration=1.0, pause_duration=0.0, sweep_growth=2.0)
+    assert search.command(0.0) == (0.0, 0.0, 40.0)
+    # Half a sweep to one side, then full sweeps of growing duration: 0-0.5, 0.5-1.5, 1.5-3.5.
+    assert search.command(0.5) == (0.0, 0.0, -40.0)
+    assert search.command(1.4) == (0.0, 0.0, -40.0)
+    assert search.command(1.5) == (0.0, 0.0, 40.0)
+    assert search.command(3.4) == (0.0, 0.0, 40.0)
+    assert search.command(3.5) == (0.0, 0.0, -40.0)
+
+
+def test_spiral_slows_its_rotation():
+    search = SearchStrategy("spiral", speeds=(0.0, 20.0, 100.0), move_duration=1.0, pause_duration=0.0,
+                            spiral_decay=0.5)
+    assert search.command(0.0) == (0.0, 20.0, 100.0)
+    assert search.command(1.0) == (0.0, 20.0, 50.0)
+    assert search.command(2.0) == (0.0, 20.0, 25.0)
+
+
+def test_stop_records_the_search_duration_and_restarts_from_the_first_phase():
+    search = SearchStrategy("pulse", speeds=(0.0, 50.0, 0.0), move_duration=0.5, pause_duration=0.5)
+    search.command(1.0)
+    search.command(1.6)
+    search.stop(2.25)
+    assert not search.searching
+    assert search.last_search_duration == pytest.approx(1.25)
+    # Stopping again does not change the duration.
+    search.stop(5.0)
+    assert search.last_search_duration == pytest.approx(1.25)
+
+    assert search.command(7.0) == (0.0, 50.0, 0.0)
+    assert search.searches == 2
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        SearchStrategy("zigzag")
+    with pytest.raises(ValueError):
+        SearchStrategy(move_duration=0.0)
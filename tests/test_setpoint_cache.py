@@ -0,0 +1,49 @@
+from cvbot.communication.setpoint_cache import SetpointCache
+
+
+def test_unchanged_setpoint_is_skipped_until_keep_alive():
+    cache = SetpointCache(keep_alive_interval=1.0)
+    assert cache.needs_update("M1", 50, now=0.0)
+    cache.acknowledge("M1", 50, now=0.0)
+    assert not cache.needs_update("M1", 50, now=0.5)
+    assert cache.skipped == 1
+    assert cache.needs_update("M1", 60, now=0.5)
+    assert cache.needs_update("M1", 50, now=1.0)
+
+
+def test_keep_alive_disabled():
+    cache = SetpointCache(keep_alive_interval=None)
+    cache.acknowledge("M1", 50, now=0.0)
+    assert not cache.needs_update("M1", 50, now=100.0)
+
+
+def test_pending_setpoint_is_compared_instead_of_acknowledged():
+    cache = SetpointCache()
+    cache.acknowledge("M1", 50, now=0.0)
+    cache.submit("M1", 0)
+    # 0 is in flight, so 50 has to be sent again, and 0 not.
+    assert cache.needs_update("M1", 50, now=0.1)
+    assert not cache.needs_update("M1", 0, now=0.1)
+
+
+def test_acknowledge_keeps_newer_pending_setpoint():
+    cache = SetpointCache()
+    cache.submit("M1", 10)
+    cache.submit("M1", 20)
+    cache.acknowledge("M1", 10, now=0.0)
+    assert not cache.needs_update("M1", 20, now=0.0)
+    assert cache.needs_update("M1", 10, now=0.0)
+    cache.acknowledge("M1", 20, now=0.0)
+    assert not cache.needs_update("M1", 20, now=0.0)
+
+
+def test_invalidate():
+    cache = SetpointCache()
+    cache.acknowledge("M1", 50, now=0.0)
+    cache.acknowledge("M2", 50, now=0.0)
+    cache.submit("M1", 60)
+    cache.invalidate("M1")
+    assert cache.needs_update("M1", 60, now=0.0)
+    assert not cache.needs_update("M2", 50, now=0.0)
+    cache.invalidate()
+    assert cache.needs_update("M2", 50, now=0.0)
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from cvbot.communication.telemetry_poller import TelemetryPoller
+from cvbot.concurrency.periodic_poller import PeriodicPoller
+from cvbot.model.counter_motor import CounterMotor
+from cvbot.simulation.robot_simulator import RobotSimulator
+
+
+async def create_simulator() -> RobotSimulator:
+    simulator = RobotSimulator()
+    await simulator.initialize()
+    return simulator
+
+
+def test_poll_publishes_read_only_snapshots():
+    async def run():
+        simulator = await create_simulator()
+        motor = simulator.get_device_by_name("M2")
+        motor.count = 42
+        await simulator.update_counters(motor)
+        poller = TelemetryPoller(simulator)
+        assert poller.latest is None
+
+        snapshot = await poller.poll()
+        assert poller.latest is snapshot
+        assert snapshot.sequence == 1
+        assert snapshot.names == tuple(motor.name for motor in simulator.get_devices_by_type(CounterMotor))
+        assert snapshot.counts[snapshot.names.index("M2")] == 42
+        with pytest.raises(ValueError):
+            snapshot.counts[0] = 1
+        assert (await poller.poll()).sequence == 2
+
+    asyncio.run(run())
+
+
+def test_poll_selected_motors():
+    async def run():
+        simulator = await create_simulator()
+        motors = [simulator.get_device_by_name("M3"), simulator.get_device_by_name("M1")]
+        snapshot = await TelemetryPoller(simulator, motors=motors).poll()
+        assert snapshot.names == ("M3", "M1")
+        assert snapshot.counts.shape == (2,)
+
+    asyncio.run(run())
+
+
+def test_subscribers_get_the_newest_snapshot():
+    async def run():
+        simulator = await create_simulator()
+        poller = TelemetryPoller(simulator)
+        subscription = poller.subscribe()
+        first = asyncio.ensure_future(subscription.__anext__())
+        await asyncio.sleep(0)
+        await poller.poll()
+        assert (await first).sequence == 1
+        # A slow subscriber skips the snapshots published meanwhile.
+        await poller.poll()
+        await poller.poll()
+        assert (await subscription.__anext__()).sequence == 3
+        await subscription.aclose()
+        assert not poller._subscribers
+
+    asyncio.run(run())
+
+
+class FailingPoller(PeriodicPoller):
+    polls: int = 0
+
+    async def poll(self) -> None:
+        self.polls += 1
+        raise RuntimeError("Read failed.")
+
+
+def test_periodic_poller_counts_errors_and_keeps_polling():
+    async def run():
+        poller = FailingPoller(rate=1000.0)
+        task = poller.start()
+        assert poller.start() is task
+        await asyncio.sleep(0.05)
+        await poller.stop()
+        assert task.cancelled()
+        assert poller.polls >= 2
+        assert poller.errors == poller.polls
+
+    asyncio.run(run())
@@ -0,0 +1,83 @@
+import math
+
+import pytest
+
+from cvbot.telemetry.tracing import LatencyHistogram, Tracer
+
+
+def bucket_of(histogram: LatencyHistogram) -> int:
+    """Index of the only non-empty bucket."""
+    (index,) = [index for index, count in enumerate(histogram.counts) if count > 0]
+    return index
+
+
+@pytest.mark.parametrize("duration", [2e-6, 1e-3, 0.0123, 0.25, 3.0])
+def test_durations_land_in_the_bucket_bounding_them(duration):
+    histogram = LatencyHistogram("stage")
+    histogram.record(duration)
+    index = bucket_of(histogram)
+    assert LatencyHistogram.bucket_upper_bound(index - 1) <= duration < LatencyHistogram.bucket_upper_bound(index)
+
+
+def test_bucket_bounds_grow_by_a_quarter_octave():
+    assert LatencyHistogram.bucket_upper_bound(0) == LatencyHistogram.MIN_DURATION
+    assert LatencyHistogram.bucket_upper_bound(4) == pytest.approx(2 * LatencyHistogram.MIN_DURATION)
+    assert LatencyHistogram.bucket_upper_bound(LatencyHistogram.NUM_BUCKETS - 1) == math.inf
+
+
+def test_extreme_durations_land_in_the_first_and_last_bucket():
+    histogram = LatencyHistogram("stage")
+    histogram.record(0.0)
+    histogram.record(1e-7)
+    histogram.record(1e6)
+    assert histogram.counts[0] == 2
+    assert histogram.counts[-1] == 1
+
+
+def test_percentiles_are_accurate_to_a_bucket():
+    histogram = LatencyHistogram("stage")
+    assert math.isnan(histogram.percentile(50))
+    for _ in range(90):
+        histogram.record(0.010)
+    for _ in range(10):
+        histogram.record(0.100, error=True)
+    ratio = 2.0 ** (1 / LatencyHistogram.BUCKETS_PER_OCTAVE)
+    assert 0.010 / ratio <= histogram.percentile(50) <= 0.010 * ratio
+    assert 0.010 / ratio <= histogram.percentile(90) <= 0.010 * ratio
+    assert 0.100 / ratio <= histogram.percentile(99) <= 0.100
+    # Percentiles never exceed the longest duration.
+    assert histogram.percentile(100) <= histogram.max == 0.100
+
+    summary = histogram.summary()
+    assert summary["count"] == 100
+    assert summary["errors"] == 10
+    assert summary["mean"] == pytest.approx(0.019)
+
+    histogram.reset()
+    assert histogram.count == 0
+    assert math.isnan(histogram.summary()["mean"])
+
+
+def test_spans_count_exceptions_as_errors():
+    tracer = Tracer()
+    with tracer.span("stage"):
+        pass
+    with pytest.raises(RuntimeError):
+        with tracer.span("stage"):
+            raise RuntimeError("Failed.")
+    histogram = tracer.histogram("stage")
+    assert (histogram.count, histogram.errors) == (2, 1)
+
+
+def test_record_since_uses_the_clock_of_the_tracer():
+    tracer = Tracer(clock=lambda: 10.5)
+    tracer.record_since("glass_to_motor", 10.0)
+    assert tracer.histogram("glass_to_motor").max == 0.5
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer(enabled=False)
+    with tracer.span("stage"):
+        pass
+    tracer.record("stage", 1.0)
+    assert tracer.summary() == {}
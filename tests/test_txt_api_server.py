@@ -0,0 +1,117 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+
+from cvbot.model.camera import Camera
+from cvbot.model.counter_motor import CounterMotor
+from cvbot.simulation.txt_api_server import TxtApiServer
+
+
+async def run_client(server: TxtApiServer) -> list:
+    from cvbot.communication.txtapiclient import TxtApiClient
+
+    await server.start()
+    client = TxtApiClient(server.host, server.port)
+    try:
+        await client.initialize()
+        motors = client.get_devices_by_type(CounterMotor)
+        assert len(motors) == 4
+        motor = client.get_device_by_name("M1")
+        motor.speed = 100
+        await client.update_motors(motor)
+
+        images = []
+        camera = client.get_devices_by_type(Camera)[0]
+        stream = client.open_camera(camera)
+        try:
+            async for image in stream:
+                images.append(image)
+                if len(images) == 3:
+                    break
+        finally:
+            await stream.aclose()
+        return images
+    finally:
+        await client.close()
+        await server.stop()
+
+
+def test_txt_api_client_against_server():
+    pytest.importorskip("cvtools")
+    pytest.importorskip("cvtxtclient")
+    server = TxtApiServer(camera_fps=60.0)
+    images = asyncio.run(run_client(server))
+
+    # Every call of the client reached a route of the server.
+    assert server.unmatched == []
+    assert server.requests["init_controller_by_id"] == 1
+    assert server.requests["get_controller_counter_by_id"] >= 4
+    assert server.requests["update_controller_motor_by_id"] >= 1
+    assert server.state.motors["M1"]["values"][0] != 0
+    assert server.requests["start_camera"] == 1
+    assert server.requests["stop_camera"] == 1
+
+    assert len(images) == 3
+    for image in images:
+        assert isinstance(image, np.ndarray)
+        assert image.shape == (240, 320, 3)
+        assert image.dtype == np.uint8
+
+
+async def request_routes(server: TxtApiServer) -> dict:
+    """Calls each route of the server with plain HTTP, like the client does."""
+    url = await server.start()
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.post(f"{url}/controller/0/init") as response:
+                assert response.status == 200
+            async with session.post(f"{url}/controller/0/motors/1", json=dict(values=[256], direction="CW")) as response:
+                assert (await response.json())["name"] == "M1"
+            async with session.post(f"{url}/controller/0/servomotors/S2", json=dict(value=100)) as response:
+                assert (await response.json())["name"] == "S2"
+            async with session.post(f"{url}/controller/0/counters/1", json=dict(count=10)) as response:
+                assert (await response.json())["count"] >= 10
+            await asyncio.sleep(0.05)
+            async with session.get(f"{url}/controller/0/counters/1") as response:
+                counter = await response.json()
+            async with session.post(f"{url}/camera/start", json=dict(fps=60)) as response:
+                assert response.status == 200
+            async with session.get(f"{url}/camera/stream") as response:
+                assert response.headers["Content-Type"].startswith("multipart/x-mixed-replace")
+                chunk = await response.content.readuntil(b"\xff\xd9")
+            async with session.post(f"{url}/camera/stop") as response:
+                assert response.status == 200
+            async with session.get(f"{url}/controller/0/inputs/1") as response:
+                assert response.status == 404
+        return dict(counter=counter, chunk=chunk)
+    finally:
+        await server.stop()
+
+
+def test_routes_serve_the_api():
+    server = TxtApiServer(camera_fps=60.0, seed=0)
+    result = asyncio.run(request_routes(server))
+
+    assert set(server.requests) == {name for _, _, name in TxtApiServer.ROUTES}
+    # The counter advanced with the motor speed since it was set.
+    assert result["counter"]["count"] > 10
+    assert server.state.servomotors["S2"]["value"] == 100
+    assert b"Content-Type: image/jpeg" in result["chunk"]
+    assert server.unmatched == [("GET", "/api/v1/controller/0/inputs/1")]
+
+
+def test_injected_failures():
+    async def run() -> int:
+        server = TxtApiServer(error_rate=1.0)
+        url = await server.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(f"{url}/controller/0/init") as response:
+                    return response.status
+        finally:
+            await server.stop()
+
+    assert asyncio.run(run()) == 500
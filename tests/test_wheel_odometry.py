@@ -0,0 +1,77 @@
+import asyncio
+import math
+
+import numpy as np
+import pytest
+
+from cvbot.controller.easy_drive_controller import EasyDriveController
+from cvbot.controller.wheel_odometry import WheelOdometry
+from cvbot.simulation.robot_simulator import RobotSimulator
+
+
+def create_odometry(**kwargs) -> WheelOdometry:
+    async def create():
+        simulator = RobotSimulator()
+        drive = EasyDriveController(simulator, simulator.config)
+        await drive.initialize()
+        return WheelOdometry(drive, **kwargs)
+
+    return asyncio.run(create())
+
+
+def wheel_counts(odometry: WheelOdometry, velocity) -> tuple:
+    """Counts and directions of the drive motors after moving by the vehicle displacement (x, z, heading)."""
+    config = odometry.drive.config
+    angles = config.kinematic_matrix.astype(np.float64) @ np.asarray(velocity, dtype=np.float64)
+    counts = np.abs(angles) / (2 * math.pi) * config.encoder_counts_per_revolution
+    return counts, np.sign(angles)
+
+
+def test_straight_motion():
+    odometry = create_odometry()
+    odometry.reset(timestamp=0.0)
+    odometry.update(np.zeros(4), np.zeros(4), 0.0)
+    counts, directions = wheel_counts(odometry, (0.0, 0.2, 0.0))
+    pose = odometry.update(counts, directions, 1.0)
+    assert pose.timestamp == 1.0
+    assert pose.z == pytest.approx(0.2)
+    assert pose.x == pytest.approx(0.0, abs=1e-9)
+    assert pose.heading == pytest.approx(0.0, abs=1e-9)
+
+
+def test_rotation_turns_the_displacement():
+    odometry = create_odometry()
+    odometry.reset(timestamp=0.0)
+    odometry.update(np.zeros(4), np.zeros(4), 0.0)
+    counts, directions = wheel_counts(odometry, (0.0, 0.0, math.pi / 2))
+    odometry.update(counts, directions, 1.0)
+    assert odometry.pose.heading == pytest.approx(math.pi / 2)
+    # Forward in the rotated frame is to the right of the start pose.
+    step, directions = wheel_counts(odometry, (0.0, 0.1, 0.0))
+    pose = odometry.update(counts + step, directions, 2.0)
+    assert pose.x == pytest.approx(0.1)
+    assert pose.z == pytest.approx(0.0, abs=1e-9)
+
+
+def test_counter_reset_counts_from_zero():
+    odometry = create_odometry()
+    odometry.reset(timestamp=0.0)
+    odometry.update(np.full(4, 1000.0), np.zeros(4), 0.0)
+    counts, directions = wheel_counts(odometry, (0.0, 0.1, 0.0))
+    pose = odometry.update(counts, directions, 1.0)
+    assert pose.z == pytest.approx(0.1)
+
+
+def test_pose_at_interpolates_and_clamps():
+    odometry = create_odometry(history=4)
+    odometry.reset(timestamp=0.0)
+    odometry.update(np.zeros(4), np.zeros(4), 0.0)
+    total = np.zeros(4)
+    for step in range(1, 6):
+        counts, directions = wheel_counts(odometry, (0.0, 0.1, 0.0))
+        total += counts
+        odometry.update(total, directions, float(step))
+    # Only the last 4 poses (t = 2 .. 5) are kept.
+    assert odometry.pose_at(3.5).z == pytest.approx(0.35)
+    assert odometry.pose_at(0.0).z == pytest.approx(0.2)
+    assert odometry.pose_at(10.0).z == pytest.approx(0.5)